@@ -1,22 +1,130 @@
-import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import time
+from typing import Optional
+
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, Engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 from dotenv import load_dotenv
 
+from app.database.metricas import PoolAsyncInstrumentado, PoolInstrumentado, metricas_pool
+from config.settings import settings
+
 load_dotenv()
 
-DB_URL = f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@" \
-         f"{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
+DB_URL = URL.create(
+    "postgresql",
+    username=settings.DB_USER,
+    password=settings.DB_PASSWORD,
+    host=settings.DB_HOST,
+    port=settings.DB_PORT,
+    database=settings.DB_NAME,
+)
 
-engine = create_engine(DB_URL)
+POOL_KWARGS = dict(
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_POOL_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+    pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+)
+
+engine = create_engine(DB_URL, poolclass=PoolInstrumentado, **POOL_KWARGS)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# engine assíncrono (asyncpg) para as rotas de leitura async: a consulta não
+# bloqueia o event loop. Pool próprio, com o mesmo tamanho do síncrono.
+async_engine = create_async_engine(
+    DB_URL.set(drivername="postgresql+asyncpg"),
+    poolclass=PoolAsyncInstrumentado,
+    **POOL_KWARGS,
+)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
-def get_db():
+ROTA_SEM_REQUEST = "(interno)"
+
+
+def statement_timeout_ms(rota: str) -> int:
+    """statement_timeout da rota (DB_STATEMENT_TIMEOUTS_MS) ou o padrão; 0 = sem limite."""
+    return int(settings.DB_STATEMENT_TIMEOUTS_MS.get(rota, settings.DB_STATEMENT_TIMEOUT_MS))
+
+
+@event.listens_for(Session, "after_begin")
+def _inicio_transacao(session: Session, transaction, connection) -> None:
+    rota = session.info.get("rota", ROTA_SEM_REQUEST)
+
+    espera_ms = connection.info.pop("espera_ms", None)
+    if espera_ms is not None:
+        metricas_pool.histograma(metricas_pool.espera, rota).registra(espera_ms)
+    # a posse é fechada no checkin, onde só a conexão está disponível
+    connection.info["rota"] = rota
+
+    timeout_ms = statement_timeout_ms(rota)
+    if timeout_ms > 0:
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {timeout_ms}")
+
+
+def _checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+    connection_record.info["checkout_em"] = time.perf_counter()
+
+
+def _checkin(dbapi_connection, connection_record) -> None:
+    inicio = connection_record.info.pop("checkout_em", None)
+    rota = connection_record.info.pop("rota", ROTA_SEM_REQUEST)
+    connection_record.info.pop("espera_ms", None)
+    if inicio is not None:
+        metricas_pool.histograma(metricas_pool.posse, rota).registra((time.perf_counter() - inicio) * 1000)
+
+
+def instrumentar(eng: Engine) -> None:
+    """Liga a medição de posse de conexão por rota (/metrics/db) ao engine."""
+    event.listen(eng, "checkout", _checkout)
+    event.listen(eng, "checkin", _checkin)
+
+
+instrumentar(engine)
+instrumentar(async_engine.sync_engine)
+
+
+def rota_da_request(request: Optional[Request]) -> str:
+    """Caminho da rota (template, não a URL) para rotular métricas e timeouts."""
+    if request is None:
+        return ROTA_SEM_REQUEST
+    rota = request.scope.get("route")
+    return getattr(rota, "path", None) or request.url.path
+
+
+def get_db(request: Request):
     db = SessionLocal()
+    db.info["rota"] = rota_da_request(request)
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db(request: Request):
+    async with AsyncSessionLocal() as db:
+        db.info["rota"] = rota_da_request(request)
+        yield db
+
+
+def _estado(eng: Engine) -> dict:
+    pool = eng.pool
+    return {
+        "tamanho": pool.size(),
+        "em_uso": pool.checkedout(),
+        "livres": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "max_overflow": settings.DB_POOL_MAX_OVERFLOW,
+        "timeout_s": settings.DB_POOL_TIMEOUT_SECONDS,
+    }
+
+
+def estado_pool() -> dict:
+    return {"sync": _estado(engine), "async": _estado(async_engine.sync_engine)}
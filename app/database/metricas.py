@@ -0,0 +1,132 @@
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+# limites dos baldes em milissegundos (o último balde é "acima do maior")
+BALDES_MS: Tuple[float, ...] = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class Histograma:
+    """Contagem por faixa de duração (ms), com total, soma e máximo. Seguro entre threads."""
+
+    def __init__(self, baldes: Tuple[float, ...] = BALDES_MS):
+        self.baldes = baldes
+        self._contagens = [0] * (len(baldes) + 1)
+        self._total = 0
+        self._soma = 0.0
+        self._maximo = 0.0
+        self._lock = threading.Lock()
+
+    def registra(self, ms: float) -> None:
+        i = 0
+        while i < len(self.baldes) and ms > self.baldes[i]:
+            i += 1
+        with self._lock:
+            self._contagens[i] += 1
+            self._total += 1
+            self._soma += ms
+            self._maximo = max(self._maximo, ms)
+
+    def _percentil_locked(self, p: float) -> Optional[float]:
+        """Limite superior do balde onde cai o percentil (estimativa, limitada ao máximo visto)."""
+        if not self._total:
+            return None
+        alvo = p / 100 * self._total
+        acumulado = 0
+        for i, n in enumerate(self._contagens):
+            acumulado += n
+            if acumulado >= alvo:
+                return min(self.baldes[i], round(self._maximo, 2)) if i < len(self.baldes) else round(self._maximo, 2)
+        return self._maximo
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            rotulos = [f"<={b:g}ms" for b in self.baldes] + [f">{self.baldes[-1]:g}ms"]
+            return {
+                "total": self._total,
+                "media_ms": round(self._soma / self._total, 2) if self._total else None,
+                "max_ms": round(self._maximo, 2),
+                "p50_ms": self._percentil_locked(50),
+                "p95_ms": self._percentil_locked(95),
+                "p99_ms": self._percentil_locked(99),
+                "baldes": {r: n for r, n in zip(rotulos, self._contagens) if n},
+            }
+
+
+class MetricasPool:
+    """
+    Espera por conexão (checkout) e tempo de posse por rota.
+    A espera é medida no pool (_MedeEspera), guardada no registro da conexão e
+    atribuída à rota quando a sessão começa a transação; a posse vai do
+    checkout ao checkin da conexão.
+    """
+
+    def __init__(self):
+        self.espera: Dict[str, Histograma] = defaultdict(Histograma)
+        self.posse: Dict[str, Histograma] = defaultdict(Histograma)
+        self._lock = threading.Lock()
+        self.aguardando = 0
+        self.falhas = 0
+
+    def inicio_espera(self) -> None:
+        with self._lock:
+            self.aguardando += 1
+
+    def fim_espera(self, obtida: bool) -> None:
+        with self._lock:
+            self.aguardando -= 1
+            if not obtida:
+                self.falhas += 1
+
+    def histograma(self, tipo: Dict[str, Histograma], rota: str) -> Histograma:
+        with self._lock:
+            return tipo[rota]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            rotas = sorted(set(self.espera) | set(self.posse))
+            espera = dict(self.espera)
+            posse = dict(self.posse)
+            aguardando, falhas = self.aguardando, self.falhas
+        return {
+            "aguardando_conexao": aguardando,
+            "falhas_checkout": falhas,  # timeout do pool ou erro ao conectar
+            "rotas": {
+                rota: {
+                    "espera_checkout": espera[rota].snapshot() if rota in espera else None,
+                    "posse_conexao": posse[rota].snapshot() if rota in posse else None,
+                }
+                for rota in rotas
+            },
+        }
+
+
+metricas_pool = MetricasPool()
+
+
+class _MedeEspera:
+    """Mede quanto tempo cada checkout esperou por uma conexão livre (inclui abrir conexão nova)."""
+
+    def _do_get(self):
+        metricas_pool.inicio_espera()
+        inicio = time.perf_counter()
+        obtida = False
+        try:
+            registro = super()._do_get()
+            obtida = True
+            registro.info["espera_ms"] = (time.perf_counter() - inicio) * 1000
+            return registro
+        finally:
+            metricas_pool.fim_espera(obtida)
+
+
+class PoolInstrumentado(_MedeEspera, QueuePool):
+    pass
+
+
+class PoolAsyncInstrumentado(_MedeEspera, AsyncAdaptedQueuePool):
+    pass
@@ -0,0 +1,159 @@
+import threading
+import time
+from typing import Optional
+
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.database.connection import (
+    POOL_KWARGS,
+    AsyncSessionLocal,
+    SessionLocal,
+    instrumentar,
+    rota_da_request,
+)
+from app.database.metricas import PoolAsyncInstrumentado, PoolInstrumentado
+from config.settings import settings
+
+
+class SaudeReplica:
+    """
+    Disponibilidade da réplica de leitura: conecta e mede o atraso de
+    replicação (now() - pg_last_xact_replay_timestamp()), no máximo uma vez a
+    cada DB_REPLICA_CHECK_SECONDS. Erro de conexão em uso marca a réplica como
+    indisponível até a próxima checagem.
+    Com o primário sem escrita o atraso medido cresce mesmo sem atraso real;
+    DB_REPLICA_MAX_LAG_SECONDS deve considerar isso.
+    """
+
+    def __init__(self, engine: Engine, max_atraso: float, intervalo: float):
+        self.engine = engine
+        self.max_atraso = max_atraso
+        self.intervalo = intervalo
+        self.disponivel = False
+        self.atraso: Optional[float] = None
+        self.erro: Optional[str] = None
+        self._checada_em = 0.0
+        self._lock = threading.Lock()
+
+    def vencida(self) -> bool:
+        return time.monotonic() - self._checada_em >= self.intervalo
+
+    def checar(self) -> bool:
+        # só uma thread checa; as demais seguem com o último estado conhecido
+        if not self._lock.acquire(blocking=False):
+            return self.disponivel
+        try:
+            if not self.vencida():
+                return self.disponivel
+            try:
+                with self.engine.connect() as conn:
+                    atraso = conn.execute(text("""
+                        SELECT CASE WHEN pg_is_in_recovery()
+                                    THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+                                    ELSE 0
+                               END
+                    """)).scalar()
+                self.atraso = float(atraso or 0)
+                self.disponivel = self.atraso <= self.max_atraso
+                self.erro = None if self.disponivel else "atraso de replicação acima do limite"
+            except Exception as e:
+                self.disponivel = False
+                self.atraso = None
+                self.erro = type(e).__name__
+            self._checada_em = time.monotonic()
+            return self.disponivel
+        finally:
+            self._lock.release()
+
+    def marcar_falha(self, erro: str) -> None:
+        self.disponivel = False
+        self.erro = erro
+        self._checada_em = time.monotonic()
+
+    def snapshot(self) -> dict:
+        return {
+            "configurada": True,
+            "disponivel": self.disponivel,
+            "atraso_s": self.atraso,
+            "max_atraso_s": self.max_atraso,
+            "erro": self.erro,
+        }
+
+
+replica_engine: Optional[Engine] = None
+saude_replica: Optional[SaudeReplica] = None
+ReplicaSessionLocal = None
+AsyncReplicaSessionLocal = None
+
+if settings.DB_REPLICA_URL:
+    _url = make_url(settings.DB_REPLICA_URL)
+    replica_engine = create_engine(_url, poolclass=PoolInstrumentado, **POOL_KWARGS)
+    _replica_async = create_async_engine(
+        _url.set(drivername="postgresql+asyncpg"), poolclass=PoolAsyncInstrumentado, **POOL_KWARGS
+    )
+    ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+    AsyncReplicaSessionLocal = async_sessionmaker(_replica_async, autoflush=False, expire_on_commit=False)
+    saude_replica = SaudeReplica(
+        replica_engine, settings.DB_REPLICA_MAX_LAG_SECONDS, settings.DB_REPLICA_CHECK_SECONDS
+    )
+
+    def _erro_replica(ctx) -> None:
+        if ctx.is_disconnect:
+            saude_replica.marcar_falha(type(ctx.original_exception).__name__)
+
+    for _engine in (replica_engine, _replica_async.sync_engine):
+        instrumentar(_engine)
+        event.listen(_engine, "handle_error", _erro_replica)
+
+
+def sessao_leitura(rota: str) -> Session:
+    """Sessão na réplica se configurada e saudável; senão no primário."""
+    usar_replica = saude_replica is not None and saude_replica.checar()
+    db = ReplicaSessionLocal() if usar_replica else SessionLocal()
+    db.info["rota"] = rota
+    db.info["replica"] = usar_replica
+    return db
+
+
+async def sessao_leitura_async(rota: str):
+    usar_replica = False
+    if saude_replica is not None:
+        # a checagem é síncrona; só vai ao threadpool quando está vencida
+        if saude_replica.vencida():
+            usar_replica = await run_in_threadpool(saude_replica.checar)
+        else:
+            usar_replica = saude_replica.disponivel
+    db = AsyncReplicaSessionLocal() if usar_replica else AsyncSessionLocal()
+    db.info["rota"] = rota
+    db.info["replica"] = usar_replica
+    return db
+
+
+def get_read_db(request: Request):
+    """
+    Sessão somente leitura (réplica com fallback para o primário). Usar só em
+    rotas que não gravam e toleram o atraso de replicação.
+    """
+    db = sessao_leitura(rota_da_request(request))
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request):
+    """Versão assíncrona de get_read_db."""
+    db = await sessao_leitura_async(rota_da_request(request))
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+def estado_replica() -> dict:
+    return saude_replica.snapshot() if saude_replica is not None else {"configurada": False}
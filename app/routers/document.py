@@ -2,48 +2,64 @@ from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from sqlalchemy import text
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
+import asyncio
 import base64
 import binascii
-import requests
 import re
 import ipaddress
-from sqlalchemy import or_
+import httpx
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.connection import get_db
+from app.database.replica import get_async_read_db
 from app.models.user import Pessoa
 from app.schemas.document import TipoDocumentoResponse, StatusDocCreate, StatusDocOut, StatusDocOutWithFile, StatusDocQuery
 from app.models.document import TipoDocumento, StatusDocumento
-from config.settings import settings
+from app.routers.ged import invalidar_disponibilidade
+from app.utils.circuit_breaker import ServicoIndisponivel
+from app.utils.ged_client import GedClient, get_ged_client
+from app.utils.ged_templates import obter_template
 from app.utils.jwt_handler import verificar_token
 from app.schemas.document import DeletarDocumentosRequest, DeletarDocumentosResponse
+from config.settings import settings
 
 
 router = APIRouter()
 
-BASE_URL = "http://ged.byebyepaper.com.br:9090/idocs_bbpaper/api/v1"
-
-def login(conta: str, usuario: str, senha: str) -> str:
-    payload = {
-        "conta": conta,
-        "usuario": usuario,
-        "senha": senha,
-        "id_interface": "CLIENT_WEB"
-    }
-    headers = {
-        "Content-Type": "application/x-www-form-urlencoded; charset=ISO-8859-1"
-    }
-
-    response = requests.post(f"{BASE_URL}/login", data=payload, headers=headers)
-    if response.status_code != 200:
-        raise HTTPException(status_code=500, detail="Erro ao autenticar no GED")
-
-    data = response.json()
-    if data.get("error"):
-        raise HTTPException(status_code=401, detail="Login falhou")
-
-    return data["authorization_key"]
-
+async def _deletar_documento_ged(ged: GedClient, id_tipo: int, id_documento: str) -> Optional[Dict[str, Any]]:
+    """
+    Apaga um documento no GED, repetindo em falhas transitórias (rede, 429, 5xx)
+    com backoff exponencial. Retorna None em caso de sucesso ou o dict de falha.
+    """
+    tentativas = max(1, settings.GED_DELETE_RETRIES)
+    erro = ""
+    for tentativa in range(tentativas):
+        if tentativa:
+            await asyncio.sleep(0.5 * (2 ** (tentativa - 1)))
+        try:
+            resp = await ged.post(
+                "/documents/delete",
+                data={"id_tipo": id_tipo, "id_documento": id_documento},
+            )
+        except httpx.HTTPError as e:
+            erro = str(e)
+            continue
+        except ServicoIndisponivel as e:
+            # circuito aberto: não adianta insistir agora
+            return {"id_documento": id_documento, "erro": e.detail}
+
+        if resp.status_code == 429 or resp.status_code >= 500:
+            erro = resp.text
+            continue
+        try:
+            ok = resp.status_code == 200 and not (resp.json() or {}).get("error")
+        except ValueError:
+            ok = False
+        return None if ok else {"id_documento": id_documento, "erro": resp.text}
+
+    return {"id_documento": id_documento, "erro": erro}
 
 def _extract_base64(raw: str) -> str:
     """Suporta tanto 'AAAA...' quanto 'data:...;base64,AAAA...'."""
@@ -113,6 +129,10 @@ def listar_tipos_documentos(request: Request, db: Session = Depends(get_db)):
     if not pessoa:
         raise HTTPException(status_code=401, detail="Pessoa não encontrada")
 
+    return tipos_documentos_da_pessoa(db, pessoa)
+
+def tipos_documentos_da_pessoa(db: Session, pessoa: Pessoa) -> List[TipoDocumento]:
+    """Tipos de documento visíveis para a pessoa, conforme os clientes a que ela está vinculada."""
     cpf_pessoa = str(pessoa.cpf or "").strip()
     mat_pessoa = str(getattr(pessoa, "matricula", "") or "").strip()
 
@@ -122,22 +142,20 @@ def listar_tipos_documentos(request: Request, db: Session = Depends(get_db)):
         clientes_ids.add(str(pessoa.cliente).strip())
 
     sql_clientes = text("""
-        SELECT DISTINCT TRIM(c.cliente::text) AS cliente
+        SELECT DISTINCT c.cliente_norm AS cliente
         FROM tb_holerite_cabecalhos c
         WHERE
             (
-                regexp_replace(TRIM(c.cpf::text), '[^0-9]', '', 'g')
-                = regexp_replace(TRIM(:cpf), '[^0-9]', '', 'g')
+                c.cpf_digitos = :cpf
                 OR
-                (TRIM(:matricula) <> '' AND TRIM(c.matricula::text) = TRIM(:matricula))
+                (:matricula <> '' AND c.matricula_norm = :matricula)
             )
-          AND c.cliente IS NOT NULL
-          AND TRIM(c.cliente::text) <> ''
+          AND c.cliente_norm <> ''
     """)
 
     rows_cli = db.execute(
         sql_clientes,
-        {"cpf": cpf_pessoa, "matricula": mat_pessoa},
+        {"cpf": re.sub(r"\D", "", cpf_pessoa), "matricula": mat_pessoa},
     ).fetchall()
 
     for row in rows_cli:
@@ -171,35 +189,22 @@ def listar_tipos_documentos(request: Request, db: Session = Depends(get_db)):
     return documentos
 
 @router.post("/documents/delete", response_model=DeletarDocumentosResponse)
-def deletar_documentos_por_query(payload: DeletarDocumentosRequest):
-    auth_key = login(
-        conta=settings.GED_CONTA,
-        usuario=settings.GED_USUARIO,
-        senha=settings.GED_SENHA
-    )
-
-    headers = {
-        "Authorization": auth_key,
-        "Content-Type": "application/x-www-form-urlencoded; charset=ISO-8859-1"
-    }
-
-    # Buscar campos do template
-    response_fields = requests.post(
-        f"{BASE_URL}/templates/getfields",
-        data={"id_template": payload.id_template},
-        headers=headers
-    )
-    if response_fields.status_code != 200:
-        raise HTTPException(status_code=500, detail="Falha ao buscar campos do template")
-
-    campos_template = response_fields.json().get("fields", [])
-
-    # Montar lista cp[]
-    lista_cp = [""] * len(campos_template)
-    for idx, campo in enumerate(campos_template):
-        if campo.get("nomecampo") == payload.campo:
-            lista_cp[idx] = payload.valor
-            break
+async def deletar_documentos_por_query(payload: DeletarDocumentosRequest):
+    ged = get_ged_client()
+
+    # Campos do template (cache)
+    tpl = await obter_template(payload.id_template)
+
+    # Montar lista cp[]: sem filtro a busca abrangeria todos os documentos do template
+    campo = (payload.campo or "").strip()
+    valor = (payload.valor or "").strip()
+    if not campo or not valor:
+        raise HTTPException(status_code=400, detail="Informe 'campo' e 'valor' para apagar documentos")
+    idx = tpl.indice(campo)
+    if idx is None:
+        raise HTTPException(status_code=400, detail=f"Campo '{campo}' não encontrado no template")
+    lista_cp = tpl.cp_vazio()
+    lista_cp[idx] = payload.valor
 
     # Payload de busca
     payload_busca = [("id_tipo", str(payload.id_template))]
@@ -209,46 +214,43 @@ def deletar_documentos_por_query(payload: DeletarDocumentosRequest):
     payload_busca.extend([
         ("ordem", ""),
         ("dt_criacao", payload.dt_criacao or ""),
-        ("pagina", "1"),
         ("colecao", "S")
     ])
 
-    # Requisição de busca
-    response_busca = requests.post(
-        f"{BASE_URL}/documents/search",
-        data=payload_busca,
-        headers=headers
-    )
-
+    # 1) Percorre todas as páginas da busca coletando os ids.
+    #    Apagar durante a paginação deslocaria as páginas seguintes.
+    #    Sem cache: a lista precisa refletir o estado atual do GED.
+    ids: List[str] = []
+    vistos: set[str] = set()
     try:
-        data = response_busca.json()
-    except Exception:
-        raise HTTPException(status_code=500, detail=f"Erro na resposta da GED: {response_busca.text}")
-
-    if response_busca.status_code != 200 or data.get("error"):
-        raise HTTPException(
-            status_code=500,
-            detail=f"Erro {response_busca.status_code}: {data.get('message', 'Erro desconhecido')}\nRaw: {response_busca.text}"
-        )
-
-    documentos = data.get("documents", [])
-    total = len(documentos)
-    deletados = 0
-    erros = []
-
-    for doc in documentos:
-        delete_resp = requests.post(
-            f"{BASE_URL}/documents/delete",
-            data={
-                "id_tipo": payload.id_template,
-                "id_documento": doc["id_documento"]
-            },
-            headers=headers
-        )
-        if delete_resp.status_code == 200 and not delete_resp.json().get("error"):
-            deletados += 1
-        else:
-            erros.append({"id_documento": doc["id_documento"], "erro": delete_resp.text})
+        async for data in ged.search_pages(payload_busca, max_pages=None, cache=False):
+            if data.get("error"):
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Erro na busca da GED: {data.get('message', 'Erro desconhecido')}"
+                )
+            for doc in data.get("documents", []) or []:
+                id_documento = doc.get("id_documento")
+                if id_documento is not None and str(id_documento) not in vistos:
+                    vistos.add(str(id_documento))
+                    ids.append(id_documento)
+    except (httpx.HTTPError, ValueError) as e:
+        raise HTTPException(status_code=500, detail=f"Erro na resposta da GED: {e}")
+
+    # 2) Apaga com paralelismo limitado (GED_DELETE_MAX_WORKERS)
+    limite = asyncio.Semaphore(max(1, settings.GED_DELETE_MAX_WORKERS))
+
+    async def _deletar(id_documento: str) -> Optional[Dict[str, Any]]:
+        async with limite:
+            return await _deletar_documento_ged(ged, payload.id_template, id_documento)
+
+    resultados = await asyncio.gather(*(_deletar(i) for i in ids))
+    erros = [r for r in resultados if r is not None]
+    total = len(ids)
+    deletados = total - len(erros)
+    if deletados:
+        # um mês/ano pode ter deixado de existir para o template
+        invalidar_disponibilidade(payload.id_template)
 
     return {
         "total_encontrados": total,
@@ -323,55 +325,55 @@ def criar_status_doc(payload: StatusDocCreate, request: Request, db: Session = D
     response_model=StatusDocOut,
     summary="Consulta status do documento via payload (prioriza UUID + tipo_doc) — sem arquivo",
 )
-def consultar_status_doc(payload: StatusDocQuery, db: Session = Depends(get_db)):
+async def consultar_status_doc(payload: StatusDocQuery, db: AsyncSession = Depends(get_async_read_db)):
     # 1) Prioridade: UUID + tipo_doc
     if payload.uuid and payload.tipo_doc:
         sql = text("""
-            SELECT sd.*
+            SELECT sd.id
               FROM app_rh.tb_status_doc sd
              WHERE TRIM(sd.uuid::text) = TRIM(:uuid)
                AND LOWER(TRIM(sd.tipo_doc)) = LOWER(TRIM(:tipo_doc))
              ORDER BY sd.id DESC
              LIMIT 1
         """)
-        row = db.execute(sql, {"uuid": payload.uuid, "tipo_doc": payload.tipo_doc}).mappings().first()
-        if row:
-            obj = db.get(StatusDocumento, row["id"])
+        id_encontrado = (await db.execute(sql, {"uuid": payload.uuid, "tipo_doc": payload.tipo_doc})).scalar()
+        if id_encontrado is not None:
+            obj = await db.get(StatusDocumento, id_encontrado)
             if obj:
                 return _record_to_out(obj)
 
     # 2) Fallback: UUID isolado
     if payload.uuid:
-        obj = (
-            db.query(StatusDocumento)
-              .filter(StatusDocumento.uuid == payload.uuid)
+        obj = (await db.execute(
+            select(StatusDocumento)
+              .where(StatusDocumento.uuid == payload.uuid)
               .order_by(StatusDocumento.id.desc())
-              .first()
-        )
+              .limit(1)
+        )).scalars().first()
         if obj:
             return _record_to_out(obj)
 
     # 3) Fallback: ID_GED
     if payload.id_ged:
-        obj = (
-            db.query(StatusDocumento)
-              .filter(StatusDocumento.id_ged == payload.id_ged)
+        obj = (await db.execute(
+            select(StatusDocumento)
+              .where(StatusDocumento.id_ged == payload.id_ged)
               .order_by(StatusDocumento.id.desc())
-              .first()
-        )
+              .limit(1)
+        )).scalars().first()
         if obj:
             return _record_to_out(obj)
 
     # 4) Fallback: ID
     if payload.id is not None:
-        obj = db.get(StatusDocumento, payload.id)
+        obj = await db.get(StatusDocumento, payload.id)
         if obj:
             return _record_to_out(obj)
 
     # 5) Fallback: cpf/matricula/competencia
     if payload.cpf and payload.matricula and payload.competencia:
         sql = text("""
-            SELECT sd.*
+            SELECT sd.id
               FROM app_rh.tb_status_doc sd
              WHERE TRIM(sd.cpf::text) = TRIM(:cpf)
                AND TRIM(sd.matricula::text) = TRIM(:matricula)
@@ -380,14 +382,14 @@ def consultar_status_doc(payload: StatusDocQuery, db: Session = Depends(get_db))
              ORDER BY sd.id DESC
              LIMIT 1
         """)
-        row = db.execute(sql, {
+        id_encontrado = (await db.execute(sql, {
             "cpf": payload.cpf,
             "matricula": payload.matricula,
             "competencia": payload.competencia
-        }).mappings().first()
+        })).scalar()
 
-        if row:
-            obj = db.get(StatusDocumento, row["id"])
+        if id_encontrado is not None:
+            obj = await db.get(StatusDocumento, id_encontrado)
             if obj:
                 return _record_to_out(obj)
 
@@ -0,0 +1,318 @@
+import asyncio
+import csv
+import io
+import json
+import re
+import zipfile
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.database.connection import get_db, rota_da_request
+from app.database.replica import sessao_leitura
+from app.routers.ged import _competencia_num, dados_recibos_por_uuid, montar_holerites_por_uuid
+from app.utils.auth import exigir_rh
+from app.utils.recibo_pdf import descartar_pool_pdf, get_pool_pdf, renderizar_recibo, workers_pdf
+
+
+router = APIRouter()
+
+# holerites por página (uma transação curta cada) e por montagem (uma ida às três tabelas)
+PAGINA_EXPORTACAO = 1000
+LOTE_MONTAGEM = 200
+
+# colunas do CSV: uma linha por evento, com cabeçalho e rodapé repetidos
+COLUNAS_CABECALHO = ["empresa", "filial", "cliente", "cliente_nome", "matricula", "cpf", "nome",
+                     "funcao_nome", "competencia", "lote"]
+COLUNAS_RODAPE = ["total_vencimentos", "total_descontos", "valor_liquido", "salario_base",
+                  "sal_contr_inss", "base_calc_fgts", "fgts_mes", "base_calc_irrf", "dep_sf", "dep_irf"]
+COLUNAS_EVENTO = ["evento", "evento_nome", "referencia", "valor", "tipo"]
+COLUNAS_CSV = ["uuid", "tipo_calculo"] + COLUNAS_CABECALHO + COLUNAS_EVENTO + COLUNAS_RODAPE
+
+
+_SQL_PAGINA = """
+    SELECT h.uuid::text AS uuid
+      FROM tb_holerite_competencias h
+     WHERE h.cliente_norm    = :cliente
+       AND h.competencia_num = :competencia
+       AND coalesce(h.pagamento, '2999-12-31')::date < current_date - 1
+       {apos}
+     ORDER BY h.uuid
+     LIMIT :limite
+"""
+SQL_PRIMEIRA_PAGINA = text(_SQL_PAGINA.format(apos=""))
+SQL_PROXIMA_PAGINA = text(_SQL_PAGINA.format(apos="AND h.uuid > CAST(:apos AS uuid)"))
+
+
+def holerites_do_cliente(
+    rota: str, cliente: str, competencia: int, apos: Optional[str] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Todos os holerites completos e pagos de (cliente, competência), em ordem de
+    uuid, montados como em buscar_holerite. Paginação por chave (uuid > último),
+    cada página numa transação curta; dentro da página as chaves vêm por
+    cursor do servidor em lotes de LOTE_MONTAGEM. Memória constante.
+    """
+    ultimo = apos
+    while True:
+        db = sessao_leitura(rota)
+        try:
+            params = {"cliente": cliente, "competencia": competencia, "limite": PAGINA_EXPORTACAO}
+            if ultimo:
+                params["apos"] = ultimo
+            chaves = db.execute(
+                SQL_PROXIMA_PAGINA if ultimo else SQL_PRIMEIRA_PAGINA,
+                params,
+                execution_options={"stream_results": True, "yield_per": LOTE_MONTAGEM},
+            )
+            lidos = 0
+            for particao in chaves.partitions(LOTE_MONTAGEM):
+                uuids = [r[0] for r in particao]
+                lidos += len(uuids)
+                ultimo = uuids[-1]
+                montados = montar_holerites_por_uuid(db, uuids)
+                for uuid in uuids:
+                    if uuid in montados:
+                        yield montados[uuid]
+        finally:
+            db.close()
+        if lidos < PAGINA_EXPORTACAO:
+            return
+
+
+def _ndjson(holerites: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+    for h in holerites:
+        yield (json.dumps(jsonable_encoder(h), ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _linhas_csv(h: Dict[str, Any]) -> List[List[Any]]:
+    cab = h.get("cabecalho") or {}
+    rod = h.get("rodape") or {}
+    base = [h.get("uuid"), h.get("tipo_calculo")] + [cab.get(c) for c in COLUNAS_CABECALHO]
+    fim = [rod.get(c) for c in COLUNAS_RODAPE]
+    linhas = []
+    for doc in h.get("documentos") or []:
+        for evt in doc.get("eventos") or []:
+            linhas.append(base + [evt.get(c) for c in COLUNAS_EVENTO] + fim)
+    return linhas
+
+
+def _csv(holerites: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, delimiter=";")
+    escritor.writerow(COLUNAS_CSV)
+    for h in holerites:
+        escritor.writerows(_linhas_csv(h))
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    resto = buffer.getvalue()
+    if resto:
+        yield resto.encode("utf-8")
+
+
+def _autorizar_exportacao(request: Request, db: Session, cliente: str, competencia: str) -> Tuple[str, int]:
+    """RH (ou interno) e, para o RH, só o próprio cliente. Devolve (cliente, competência YYYYMM)."""
+    pessoa = exigir_rh(request, db)
+    cliente = cliente.strip()
+    if not bool(getattr(pessoa, "interno", False)):
+        # RH sem cliente cadastrado não exporta nada
+        cliente_pessoa = str(getattr(pessoa, "cliente", "") or "").strip()
+        if not cliente_pessoa or cliente_pessoa != cliente:
+            raise HTTPException(status_code=403, detail="O RH só pode exportar holerites do próprio cliente.")
+
+    comp = _competencia_num(competencia)
+    if comp is None:
+        raise HTTPException(status_code=422, detail="Competência inválida.")
+    return cliente, comp
+
+
+@router.get("/documents/holerite/exportar")
+def exportar_holerites(
+    request: Request,
+    cliente: str = Query(..., description="Código do cliente"),
+    competencia: str = Query(..., description="Competência (YYYYMM, YYYY-MM ou MM/YYYY)"),
+    formato: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    apos: Optional[str] = Query(None, description="Retoma a exportação depois deste uuid"),
+    db: Session = Depends(get_db),
+):
+    """
+    Exporta todos os holerites completos de (cliente, competência) em NDJSON
+    (um holerite por linha) ou CSV (uma linha por evento, separador ';').
+    A resposta é gerada em streaming; `apos` retoma uma exportação
+    interrompida a partir do último uuid recebido. Restrito ao RH (e a
+    pessoas internas); o RH só exporta o próprio cliente.
+    """
+    cliente, comp = _autorizar_exportacao(request, db, cliente, competencia)
+
+    holerites = holerites_do_cliente(rota_da_request(request), cliente, comp, (apos or "").strip() or None)
+    nome = f"holerites_{re.sub(r'[^0-9A-Za-z_-]', '_', cliente)}_{comp}.{formato}"
+    if formato == "csv":
+        corpo, mimetype = _csv(holerites), "text/csv; charset=utf-8"
+    else:
+        corpo, mimetype = _ndjson(holerites), "application/x-ndjson"
+    return StreamingResponse(corpo, media_type=mimetype, headers={"Content-Disposition": f'attachment; filename="{nome}"'})
+
+
+# -------------------------------------------------
+# Recibos em PDF de um lote inteiro (ZIP)
+# -------------------------------------------------
+_SQL_PAGINA_LOTE = """
+    SELECT h.uuid::text AS uuid
+      FROM tb_holerite_competencias h
+     WHERE h.cliente_norm    = :cliente
+       AND h.competencia_num = :competencia
+       AND h.lote            = :lote
+       AND coalesce(h.pagamento, '2999-12-31')::date < current_date - 1
+       {apos}
+     ORDER BY h.uuid
+     LIMIT :limite
+"""
+SQL_PRIMEIRA_PAGINA_LOTE = text(_SQL_PAGINA_LOTE.format(apos=""))
+SQL_PROXIMA_PAGINA_LOTE = text(_SQL_PAGINA_LOTE.format(apos="AND h.uuid > CAST(:apos AS uuid)"))
+
+
+def _pagina_recibos(
+    rota: str, cliente: str, competencia: int, lote: str, apos: Optional[str]
+) -> Tuple[List[str], Dict[str, tuple]]:
+    """Próximos LOTE_MONTAGEM uuids do lote e os dados dos recibos, numa transação curta."""
+    db = sessao_leitura(rota)
+    try:
+        params = {"cliente": cliente, "competencia": competencia, "lote": lote, "limite": LOTE_MONTAGEM}
+        if apos:
+            params["apos"] = apos
+        uuids = [r[0] for r in db.execute(SQL_PROXIMA_PAGINA_LOTE if apos else SQL_PRIMEIRA_PAGINA_LOTE, params)]
+        return uuids, (dados_recibos_por_uuid(db, uuids) if uuids else {})
+    finally:
+        db.close()
+
+
+def _nome_recibo(cabecalho: Dict[str, Any], uuid: str) -> str:
+    matricula = re.sub(r"[^0-9A-Za-z_-]", "_", str(cabecalho.get("matricula") or "").strip())
+    return f"recibo_{matricula}_{uuid}.pdf"
+
+
+class _SaidaZip:
+    """Destino não pesquisável do ZipFile: acumula os bytes escritos até o próximo envio."""
+
+    def __init__(self):
+        self._partes: List[bytes] = []
+
+    def write(self, dados) -> int:
+        self._partes.append(bytes(dados))
+        return len(dados)
+
+    def flush(self) -> None:
+        pass
+
+    def esvaziar(self) -> bytes:
+        dados = b"".join(self._partes)
+        self._partes.clear()
+        return dados
+
+
+async def _zip_recibos(
+    rota: str, cliente: str, competencia: int, lote: str, primeira: Tuple[List[str], Dict[str, tuple]]
+) -> AsyncIterator[bytes]:
+    """
+    Gera os recibos do lote no pool de processos e escreve cada PDF no ZIP
+    assim que fica pronto (ordem de conclusão). No máximo 2 × workers
+    recibos ficam em voo; a próxima submissão espera um terminar, e cada
+    PDF concluído é enviado antes de continuar, então um cliente lento
+    segura a geração e a memória fica limitada a uma página de dados mais
+    os PDFs em voo. Os PDFs já saem comprimidos do FPDF: o ZIP só armazena.
+    Recibos com problema vão listados em erros.txt no fim do arquivo.
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_pool_pdf()
+    limite = 2 * workers_pdf()
+    saida = _SaidaZip()
+    zf = zipfile.ZipFile(saida, "w", compression=zipfile.ZIP_STORED)
+    pendentes: Dict[asyncio.Future, str] = {}
+    erros: List[str] = []
+
+    async def concluir_um() -> None:
+        feitos, _ = await asyncio.wait(pendentes, return_when=asyncio.FIRST_COMPLETED)
+        for futuro in feitos:
+            nome = pendentes.pop(futuro)
+            try:
+                _, pdf = futuro.result()
+            except BrokenProcessPool:
+                descartar_pool_pdf()
+                raise
+            except Exception as e:
+                erros.append(f"{nome}: {type(e).__name__}: {e}")
+                continue
+            zf.writestr(nome, pdf)
+
+    try:
+        uuids, dados = primeira
+        while True:
+            for uuid in uuids:
+                if uuid not in dados:
+                    erros.append(f"{uuid}: holerite incompleto (cabeçalho, eventos ou rodapé)")
+                    continue
+                cabecalho, eventos, rodape = dados.pop(uuid)
+                nome = _nome_recibo(cabecalho, uuid)
+                invalidos = sorted({e["tipo"] for e in eventos if e["tipo"] not in ("V", "D")})
+                if invalidos:
+                    erros.append(f"{nome}: tipo de evento inválido: {', '.join(invalidos)}")
+                    continue
+                while len(pendentes) >= limite:
+                    await concluir_um()
+                    yield saida.esvaziar()
+                futuro = loop.run_in_executor(pool, renderizar_recibo, nome, cabecalho, eventos, rodape)
+                pendentes[futuro] = nome
+            if len(uuids) < LOTE_MONTAGEM:
+                break
+            # a busca da próxima página corre enquanto os recibos em voo são gerados
+            uuids, dados = await run_in_threadpool(_pagina_recibos, rota, cliente, competencia, lote, uuids[-1])
+
+        while pendentes:
+            await concluir_um()
+            yield saida.esvaziar()
+        if erros:
+            zf.writestr("erros.txt", "\n".join(erros) + "\n")
+        zf.close()
+        yield saida.esvaziar()
+    finally:
+        # cliente desconectou ou falha no meio: não gera o que ainda não começou
+        for futuro in pendentes:
+            futuro.cancel()
+
+
+@router.get("/documents/holerite/exportar/recibos")
+def exportar_recibos_do_lote(
+    request: Request,
+    cliente: str = Query(..., description="Código do cliente"),
+    competencia: str = Query(..., description="Competência (YYYYMM, YYYY-MM ou MM/YYYY)"),
+    lote: str = Query(..., description="Lote da folha"),
+    db: Session = Depends(get_db),
+):
+    """
+    Recibos em PDF (o mesmo de /documents/holerite/montar) de todos os
+    holerites pagos de (cliente, competência, lote), gerados em paralelo
+    num pool de processos (HOLERITE_PDF_WORKERS; 0 = um por núcleo) e
+    enviados em um ZIP em streaming. Restrito ao RH (e a pessoas internas);
+    o RH só exporta o próprio cliente.
+    """
+    cliente, comp = _autorizar_exportacao(request, db, cliente, competencia)
+    lote = lote.strip()
+    rota = rota_da_request(request)
+
+    primeira = _pagina_recibos(rota, cliente, comp, lote, None)
+    if not primeira[0]:
+        raise HTTPException(status_code=404, detail="Nenhum holerite encontrado para o lote.")
+
+    nome = f"recibos_{re.sub(r'[^0-9A-Za-z_-]', '_', cliente)}_{comp}_{re.sub(r'[^0-9A-Za-z_-]', '_', lote)}.zip"
+    return StreamingResponse(
+        _zip_recibos(rota, cliente, comp, lote, primeira),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{nome}"'},
+    )
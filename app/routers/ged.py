@@ -1,15 +1,38 @@
-import unicodedata
+import asyncio
+import json
+import os
 import re
-from fastapi import APIRouter, HTTPException, Form, Depends, Request, Response, Body, Query
-from typing import Any, Dict, Optional, Set
-import requests
-from pydantic import BaseModel, Field, field_validator
+from fastapi import APIRouter, HTTPException, Form, Depends, Request, Response, Body, Query, File, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+import httpx
+from pydantic import BaseModel, Field, ValidationError, field_validator
 from pydantic import ConfigDict
 from datetime import datetime
-from babel.dates import format_date
 from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database.connection import get_db
+from app.database.connection import get_async_db, get_db
+from app.database.replica import get_async_read_db, get_read_db
+from app.utils.auth import exigir_interno
+from app.utils.cache import SWRCache
+from app.utils.circuit_breaker import ServicoIndisponivel
+from app.utils.ged_cache_disco import get_cache_documentos
+from app.utils.ged_client import get_ged_client
+from app.utils.ged_download import abrir_download
+from app.utils.ged_upload import CorpoUploadGed
+from app.utils.ged_templates import TemplateGed, invalidar_templates, listar_templates_ged, obter_template
+from app.utils.holerite_cache import (
+    GERACAO_TODOS,
+    avancar_geracao,
+    geracoes_dos_lotes,
+    get_cache_holerites,
+    separar_hits,
+)
+from app.utils.recibo_pdf import gerar_recibo
+from app.utils.status_doc import get_consulta_aceite, recarregar_consulta_aceite
 from config.settings import settings
 from typing import List
 import base64
@@ -19,6 +42,13 @@ from decimal import Decimal, InvalidOperation
 
 router = APIRouter()
 
+# meses/anos disponíveis por (template, campo, cp[] normalizado) — recibos e informes
+_disponibilidade_cache = SWRCache(
+    maxsize=settings.GED_DISPONIBILIDADE_CACHE_MAXSIZE,
+    ttl=settings.GED_DISPONIBILIDADE_TTL_SECONDS,
+    stale_ttl=settings.GED_DISPONIBILIDADE_STALE_SECONDS,
+)
+
 class MontarBeneficio(BaseModel):
     matricula: str
     competencia: str
@@ -29,6 +59,11 @@ class MontarBeneficio(BaseModel):
 class TemplateFieldsRequest(BaseModel):
     id_template: int
 
+class InvalidarHolerites(BaseModel):
+    uuids: List[str] = []
+    lote: Optional[str] = None
+    tudo: bool = False
+
 class DocumentoGED(BaseModel):
     id_documento: str
     nomearquivo: str
@@ -116,6 +151,11 @@ def _only_yyyymm(s: str) -> str:
     """Mantém apenas dígitos e retorna os 6 primeiros (YYYYMM)."""
     return re.sub(r"\D", "", (s or ""))[:6]
 
+def _competencia_num(valor: str) -> Optional[int]:
+    """Competência em qualquer formato aceito por _normaliza_anomes → inteiro YYYYMM (coluna competencia_num)."""
+    digitos = _only_yyyymm(_normaliza_anomes(valor or "") or valor or "")
+    return int(digitos) if len(digitos) == 6 else None
+
 def _normaliza_anomes(valor: str) -> Optional[str]:
     v = (valor or "").strip()
     if not v:
@@ -151,50 +191,29 @@ def _to_ano_mes(yyyymm: str) -> Dict[str, int]:
     ano_str, mes_str = yyyymm.split("-", 1)
     return {"ano": int(ano_str), "mes": int(mes_str)}
 
-def _coleta_anomes_via_search(
-    headers: Dict[str, str],
+async def _coleta_anomes_via_search(
     id_template: int | str,
-    nomes_campos: List[str],
     lista_cp: List[str],
     campo_anomes: str,
     max_pages: int = 10
 ) -> List[str]:
     meses: Set[str] = set()
-    pagina = 1
-    total_paginas = 1
-    BASE_URL = "http://ged.byebyepaper.com.br:9090/idocs_bbpaper/api/v1"
-    while pagina <= total_paginas and pagina <= max_pages:
-        form = [("id_tipo", str(id_template))]
-        form += [("cp[]", v) for v in lista_cp]
-        form += [
-            ("ordem", "no_ordem"),
-            ("dt_criacao", ""),
-            ("pagina", str(pagina)),
-            ("colecao", "S"),
-        ]
-        r = requests.post(f"{BASE_URL}/documents/search", data=form, headers=headers, timeout=60)
-        r.raise_for_status()
-        data = r.json() or {}
+    form = [("id_tipo", str(id_template))]
+    form += [("cp[]", v) for v in lista_cp]
+    form += [
+        ("ordem", "no_ordem"),
+        ("dt_criacao", ""),
+        ("colecao", "S"),
+    ]
+    async for data in get_ged_client().search_pages(form, max_pages=max_pages):
         docs = [_flatten_attributes(doc) for doc in (data.get("documents") or [])]
         for d in docs:
             bruto = str(d.get(campo_anomes, "")).strip()
             n = _normaliza_anomes(bruto)
             if n:
                 meses.add(n)
-        vars_ = data.get("variables") or {}
-        try:
-            total_paginas = int(vars_.get("totalpaginas", total_paginas))
-        except Exception:
-            total_paginas = 1
-        pagina += 1
     return sorted(meses, reverse=True)
 
-def _norm(s: str) -> str:
-    s = s or ""
-    s = s.strip().lower().replace(" ", "").replace("-", "").replace(".", "").replace("__", "_").replace("_", "")
-    s = unicodedata.normalize("NFKD", s)
-    return "".join(ch for ch in s if not unicodedata.combining(ch))
-
 def _only_digits(s: str) -> str:
     return "".join(ch for ch in (s or "") if ch.isdigit())
 
@@ -204,95 +223,120 @@ def _cpf_from_any(value: str) -> Optional[str]:
         return None
     return digits[-11:]
 
-def _headers(auth_key: str) -> Dict[str, str]:
-    return {
-        "Authorization": auth_key,
-        "Content-Type": "application/x-www-form-urlencoded; charset=ISO-8859-1",
-    }
+def _padrao_mes(anomes_norm: str) -> str:
+    """'YYYY-MM' → padrão LIKE do cp[] que casa com 'YYYYMM', 'YYYY-MM' e 'YYYY/MM'."""
+    ano, mes = anomes_norm.split("-", 1)
+    return f"%{ano}%{mes}%"
 
-BASE_URL = "http://ged.byebyepaper.com.br:9090/idocs_bbpaper/api/v1"
+class GedSemDocumentos(HTTPException):
+    """Busca em que o GED respondeu error=true: nenhum documento para o cp[] informado."""
 
-def login(conta: str, usuario: str, senha: str) -> str:
-    payload = {
-        "conta": conta,
-        "usuario": usuario,
-        "senha": senha,
-        "id_interface": "CLIENT_WEB"
-    }
-    headers = {
-        "Content-Type": "application/x-www-form-urlencoded; charset=ISO-8859-1"
-    }
-    response = requests.post(f"{BASE_URL}/login", data=payload, headers=headers)
-    if response.status_code != 200:
-        raise HTTPException(status_code=500, detail="Erro ao autenticar no GED")
-    data = response.json()
-    if data.get("error"):
-        raise HTTPException(status_code=401, detail="Login falhou")
-    return data["authorization_key"]
+async def _busca_por_periodo(
+    do_search: Callable[[Optional[List[str]]], Awaitable[List[Dict[str, Any]]]],
+    lista_cp: List[str],
+    idx_periodo: Optional[int],
+    padroes: List[str],
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Coloca o período pedido no cp[] do campo de competência, para o GED devolver
+    só os documentos do período (uma consulta por valor, em paralelo).
+    Retorna None quando não dá para filtrar assim ou nenhuma consulta achou
+    nada — o campo pode estar gravado em outro formato (ex.: 'MM/YYYY') — e
+    quem chama faz a busca ampla de sempre. Só a resposta "sem documentos"
+    (GedSemDocumentos) conta como nada achado; qualquer outra falha do GED
+    (inclusive o 503 do disjuntor) é repassada sem a busca ampla.
+    """
+    if not settings.GED_FILTRA_PERIODO_NO_GED or idx_periodo is None or not padroes:
+        return None
+    if (lista_cp[idx_periodo] or "").strip():
+        return None
+
+    consultas = []
+    for padrao in padroes:
+        cp = list(lista_cp)
+        cp[idx_periodo] = padrao
+        consultas.append(do_search(cp))
+    resultados = await asyncio.gather(*consultas, return_exceptions=True)
+
+    documentos: List[Dict[str, Any]] = []
+    vistos: Set[str] = set()
+    for lote in resultados:
+        if isinstance(lote, GedSemDocumentos):
+            # nada no período com esse padrão; os demais padrões ainda valem
+            continue
+        if isinstance(lote, BaseException):
+            # GED fora (503 do disjuntor), timeout etc.: a busca ampla só aumentaria a carga
+            raise lote
+        for d in lote:
+            chave = str(d.get("id_documento") or id(d))
+            if chave not in vistos:
+                vistos.add(chave)
+                documentos.append(d)
+    return documentos or None
 
 @router.get("/searchdocuments/templates")
-def listar_templates() -> Any:
-    auth_key = login(
-        conta=settings.GED_CONTA,
-        usuario=settings.GED_USUARIO,
-        senha=settings.GED_SENHA
-    )
-    headers = {"Authorization": auth_key}
-    response = requests.get(f"{BASE_URL}/templates/getall", headers=headers)
-    if response.status_code != 200:
-        raise HTTPException(status_code=response.status_code, detail="Erro ao buscar templates")
-    data = response.json()
-    if data.get("error"):
-        raise HTTPException(status_code=400, detail="Erro na resposta da API GED")
-    return data.get("templates", [])
+async def listar_templates() -> Any:
+    return await listar_templates_ged()
 
 @router.post("/searchdocuments/templateFields")
-def get_template_fields(id_template: int = Form(...)):
-    auth_key = login(
-        conta=settings.GED_CONTA,
-        usuario=settings.GED_USUARIO,
-        senha=settings.GED_SENHA
-    )
-    headers = {
-        "Authorization": auth_key,
-        "Content-Type": "application/x-www-form-urlencoded; charset=ISO-8859-1"
-    }
-    payload = f"id_template={id_template}"
-    response = requests.post(
-        f"{BASE_URL}/templates/getfields",
-        headers=headers,
-        data=payload
-    )
-    if response.status_code != 200:
-        raise HTTPException(status_code=500, detail="Erro ao buscar campos do template")
-    return response.json()
+async def get_template_fields(id_template: int = Form(...)):
+    return (await obter_template(id_template)).resposta
 
-@router.post("/documents/upload_base64")
-def upload_documento_base64(payload: UploadBase64Payload):
-    auth_key = login(
-        conta=settings.GED_CONTA,
-        usuario=settings.GED_USUARIO,
-        senha=settings.GED_SENHA
-    )
-    headers = {
-        "Authorization": auth_key,
-        "Content-Type": "application/x-www-form-urlencoded; charset=ISO-8859-1"
-    }
-    response_fields = requests.post(
-        f"{BASE_URL}/templates/getfields",
-        data={"id_template": payload.id_tipo},
-        headers=headers
-    )
-    if response_fields.status_code != 200:
-        raise HTTPException(status_code=500, detail="Erro ao buscar campos do template")
-    campos_template = response_fields.json().get("fields", [])
-    nomes_campos = [campo["nomecampo"] for campo in campos_template]
-    lista_cp = ["" for _ in nomes_campos]
-    for campo in payload.campos:
-        if campo.nome not in nomes_campos:
+@router.post("/searchdocuments/templates/refresh")
+async def atualizar_cache_templates(
+    request: Request,
+    id_template: Optional[int] = Query(None, description="Template a recarregar; vazio recarrega todos"),
+    db: Session = Depends(get_db),
+):
+    """
+    Descarta o cache de templates do GED (getall + getfields) e recarrega.
+    Restrito a pessoas internas.
+    """
+    await run_in_threadpool(exigir_interno, request, db)
+
+    invalidar_templates(id_template)
+    if id_template is not None:
+        tpl = await obter_template(id_template, forcar=True)
+        return {"atualizados": [id_template], "campos": tpl.nomes}
+
+    templates = await listar_templates_ged(forcar=True)
+    return {"atualizados": "todos", "total_templates": len(templates)}
+
+@router.post("/documents/status/esquema/recarregar")
+def recarregar_esquema_status(request: Request, db: Session = Depends(get_db)):
+    """
+    Refaz a descoberta da tabela de status de aceite (nome e colunas) e
+    recompila o SQL do aceite. Usar depois de migrações nessa tabela.
+    Restrito a pessoas internas.
+    """
+    exigir_interno(request, db)
+    return recarregar_consulta_aceite(db).snapshot()
+
+def _cp_para_upload(tpl: TemplateGed, campos: List[CampoConsulta]) -> List[str]:
+    lista_cp = tpl.cp_vazio()
+    for campo in campos:
+        idx = tpl.indice(campo.nome)
+        if idx is None:
             raise HTTPException(status_code=400, detail=f"Campo '{campo.nome}' não encontrado no template")
-        idx = nomes_campos.index(campo.nome)
         lista_cp[idx] = campo.valor
+    return lista_cp
+
+def invalidar_disponibilidade(id_tipo: int) -> None:
+    """Descarta os meses/anos em cache do template (documentos publicados ou apagados)."""
+    _disponibilidade_cache.invalidate_where(lambda chave: chave[1] == str(id_tipo))
+
+def _resposta_upload(id_tipo: int, response: httpx.Response) -> Any:
+    # um documento novo pode publicar um mês/ano ainda não listado para o template
+    invalidar_disponibilidade(id_tipo)
+    try:
+        return response.json()
+    except Exception:
+        raise HTTPException(status_code=500, detail=f"Erro no upload: {response.text}")
+
+@router.post("/documents/upload_base64")
+async def upload_documento_base64(payload: UploadBase64Payload):
+    tpl = await obter_template(payload.id_tipo)
+    lista_cp = _cp_para_upload(tpl, payload.campos)
     data = {
         "id_tipo": str(payload.id_tipo),
         "formato": payload.formato,
@@ -301,20 +345,142 @@ def upload_documento_base64(payload: UploadBase64Payload):
     }
     for valor in lista_cp:
         data.setdefault("cp[]", []).append(valor)
-    response = requests.post(
-        f"{BASE_URL}/documents/uploadbase64",
-        headers=headers,
+    response = await get_ged_client().post(
+        "/documents/uploadbase64",
         data=data
     )
+    return _resposta_upload(payload.id_tipo, response)
+
+@router.post("/documents/upload")
+async def upload_documento(
+    id_tipo: int = Form(...),
+    campos: str = Form("[]", description='JSON com os campos do template: [{"nome": "...", "valor": "..."}]'),
+    arquivo: UploadFile = File(...),
+    formato: Optional[str] = Form(None),
+    documento_nome: Optional[str] = Form(None),
+):
+    """
+    Upload multipart: o arquivo fica em spool no disco e é enviado ao GED
+    codificado em base64 em partes, sem carregar o documento inteiro em memória.
+    """
+    try:
+        lista_campos = [CampoConsulta(**c) for c in json.loads(campos or "[]")]
+    except (ValueError, TypeError, ValidationError):
+        raise HTTPException(status_code=422, detail="'campos' deve ser um JSON: [{\"nome\": \"...\", \"valor\": \"...\"}]")
+
+    tpl = await obter_template(id_tipo)
+    lista_cp = _cp_para_upload(tpl, lista_campos)
+
+    nome = documento_nome or arquivo.filename or "documento"
+    if not formato:
+        formato = os.path.splitext(arquivo.filename or "")[1].lstrip(".").lower() or "pdf"
+
+    corpo = CorpoUploadGed(
+        arquivo,
+        antes=[("id_tipo", str(id_tipo)), ("formato", formato), ("documento_nome", nome)],
+        depois=[("cp[]", valor) for valor in lista_cp],
+    )
     try:
-        return response.json()
-    except Exception:
-        raise HTTPException(status_code=500, detail=f"Erro no upload: {response.text}")
+        tamanho = await corpo.medir()
+        response = await get_ged_client().post_corpo("/documents/uploadbase64", corpo.partes, tamanho)
+    finally:
+        corpo.fechar()
+    return _resposta_upload(id_tipo, response)
 
 # ============================
 # NOVA ROTA: listar competências
 # ============================
 
+async def competencias_holerite(db: AsyncSession, cpf: str, matricula: str, empresa: str) -> List[Dict[str, int]]:
+    """
+    Competências (ano, mes) onde há coerência entre eventos, cabeçalho e rodapé
+    para a chave (cpf, matricula, empresa), da mais recente para a mais antiga.
+    """
+    params: Dict[str, Any] = {
+        "cpf": _only_digits(str(cpf)),
+        "matricula": str(matricula).strip(),
+        "empresa": str(empresa).strip(),
+    }
+
+    # resumo mantido por trigger: migrations/003_holerite_competencias.sql
+    sql_lista_comp = text("""
+        SELECT DISTINCT
+               h.competencia_num / 100 AS ano,
+               h.competencia_num % 100 AS mes
+          FROM tb_holerite_competencias h
+         WHERE h.cpf_digitos    = :cpf
+           AND h.matricula_norm = :matricula
+           AND h.cliente_norm   = :empresa
+           AND coalesce(h.pagamento, '2999-12-31')::date < current_date - 1
+         ORDER BY ano DESC, mes DESC
+    """)
+
+    rows = (await db.execute(sql_lista_comp, params)).fetchall()
+    return [{"ano": r[0], "mes": r[1]} for r in rows if r[0] is not None and r[1] is not None]
+
+@router.post("/documents/holerite/competencias/recalcular")
+def recalcular_competencias_holerite(
+    request: Request,
+    lote: Optional[str] = Query(None, description="Recalcula só este lote; vazio recalcula tudo"),
+    db: Session = Depends(get_db),
+):
+    """
+    Reconstrói o resumo tb_holerite_competencias a partir das três tabelas.
+    Os triggers mantêm o resumo quando cada lote é carregado numa transação
+    (ou em sequência); cargas com transações concorrentes ou com triggers
+    desligados chamam esta rota com `lote` ao terminar. Restrito a pessoas
+    internas.
+    """
+    exigir_interno(request, db)
+    if lote:
+        total = db.execute(
+            text("SELECT fn_holerite_competencias_recalcular_lote(:lote)"), {"lote": lote.strip()}
+        ).scalar()
+    else:
+        total = db.execute(text("SELECT fn_holerite_competencias_recalcular()")).scalar()
+    db.commit()
+    return {"holerites": int(total or 0)}
+
+@router.post("/documents/holerite/cache/invalidar")
+def invalidar_cache_holerites(payload: InvalidarHolerites, request: Request, db: Session = Depends(get_db)):
+    """
+    Descarta holerites montados do cache (memória e disco) por uuid, por lote
+    ou todos. Usar quando um lote é reprocessado. Restrito a pessoas internas.
+    Este worker limpa na hora; nos demais, a geração do lote avança
+    (tb_holerite_cache_geracao) e as entradas antigas deixam de valer na
+    próxima leitura. Por uuid, avança a geração do lote inteiro do uuid.
+    """
+    exigir_interno(request, db)
+    if not payload.tudo and not payload.uuids and payload.lote is None:
+        raise HTTPException(status_code=422, detail="Informe uuids, lote ou tudo=true.")
+
+    cache = get_cache_holerites()
+    if payload.tudo:
+        avancar_geracao(db, [GERACAO_TODOS])
+        cache.limpar()
+        return {"invalidados": "todos"}
+
+    lotes = set()
+    if payload.uuids:
+        lotes.update(r[0] for r in db.execute(
+            text("""
+                SELECT DISTINCT h.lote::text
+                  FROM tb_holerite_competencias h
+                 WHERE h.uuid = ANY(CAST(:uuids AS uuid[]))
+            """),
+            {"uuids": payload.uuids},
+        ).fetchall())
+    if payload.lote is not None:
+        lotes.add(payload.lote)
+    avancar_geracao(db, lotes)
+
+    total = 0
+    if payload.uuids:
+        total += cache.invalidar(payload.uuids)
+    if payload.lote is not None:
+        total += cache.invalidar_lote(payload.lote)
+    return {"invalidados": total, "lotes": sorted(lotes)}
+
 @router.post("/documents/holerite/competencias")
 async def listar_competencias_holerite(
     request: Request,
@@ -322,7 +488,7 @@ async def listar_competencias_holerite(
     matricula: Optional[str] = Query(None, description="Matrícula exata"),
     empresa: Optional[str] = Query(None, description="Código da empresa/cliente"),
     cliente: Optional[str] = Query(None, description="Alias antigo do código do cliente"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
     """
     Lista competências (ano, mes) onde há coerência entre eventos, cabeçalho e rodapé
@@ -347,62 +513,7 @@ async def listar_competencias_holerite(
             detail="Informe 'cpf', 'matricula' e 'empresa' (na querystring ou no body JSON).",
         )
 
-    params: Dict[str, Any] = {
-        "cpf": str(cpf).strip(),
-        "matricula": str(matricula).strip(),
-        "empresa": str(empresa).strip(),
-    }
-
-    sql_lista_comp = text(f"""
-        WITH norm_evt AS (
-            SELECT DISTINCT
-                   regexp_replace(TRIM(e.competencia), '[^0-9]', '', 'g') AS comp,
-                   e.lote
-            FROM tb_holerite_eventos e
-            WHERE TRIM(e.cpf::text) = TRIM(:cpf)
-              AND TRIM(e.matricula::text) = TRIM(:matricula)
-              AND TRIM(e.cliente::text)   = TRIM(:empresa)
-              AND e.competencia IS NOT NULL
-        ),
-        norm_cab AS (
-            SELECT DISTINCT
-                   regexp_replace(TRIM(c.competencia), '[^0-9]', '', 'g') AS comp,
-                   c.lote
-            FROM tb_holerite_cabecalhos c
-            WHERE TRIM(c.cpf::text) = TRIM(:cpf)
-              AND TRIM(c.matricula::text) = TRIM(:matricula)
-              AND TRIM(c.cliente::text)   = TRIM(:empresa)
-              AND coalesce(c.pagamento, '2999-12-31')::date < current_date - 1
-              AND c.competencia IS NOT NULL
-        ),
-        norm_rod AS (
-            SELECT DISTINCT
-                   regexp_replace(TRIM(r.competencia), '[^0-9]', '', 'g') AS comp,
-                   r.lote
-            FROM tb_holerite_rodapes r
-            WHERE TRIM(r.cpf::text) = TRIM(:cpf)
-              AND TRIM(r.matricula::text) = TRIM(:matricula)
-              AND TRIM(r.cliente::text)   = TRIM(:empresa)
-              AND r.competencia IS NOT NULL
-        ),
-        valid AS (
-            SELECT e.comp
-            FROM norm_evt e
-            JOIN norm_cab c ON c.comp = e.comp AND c.lote = e.lote
-            JOIN norm_rod r ON r.comp = e.comp AND r.lote = e.lote
-            GROUP BY e.comp
-        )
-        SELECT
-          CAST(SUBSTRING(comp, 1, 4) AS int) AS ano,
-          CAST(SUBSTRING(comp, 5, 2) AS int) AS mes
-        FROM valid
-        WHERE comp ~ '^[0-9]{{6}}$'
-        ORDER BY ano DESC, mes DESC
-    """)
-
-    rows = db.execute(sql_lista_comp, params).fetchall()
-    competencias = [{"ano": r[0], "mes": r[1]} for r in rows if r[0] is not None and r[1] is not None]
-
+    competencias = await competencias_holerite(db, cpf, matricula, empresa)
     if not competencias:
         raise HTTPException(status_code=404, detail="Nenhuma competência encontrada para os parâmetros informados.")
 
@@ -412,196 +523,77 @@ async def listar_competencias_holerite(
 # ROTA SIMPLIFICADA: buscar holerite direto
 # ==========================================
 
-@router.post("/documents/holerite/buscar")
-def buscar_holerite(payload: BuscarHolerite = Body(...), db: Session = Depends(get_db)):
-    cpf = (payload.cpf or "").strip()
-    matricula = (payload.matricula or "").strip()
-    competencia = (payload.competencia or "").strip()
-    empresa = (payload.empresa or "").strip()
-
-    if not cpf or not matricula or not competencia or not empresa:
-        raise HTTPException(status_code=422, detail="Informe cpf, matricula, competencia e empresa.")
-
-    filtro_comp_evt = """
-      regexp_replace(TRIM(e.competencia), '[^0-9]', '', 'g') =
-      regexp_replace(TRIM(:competencia),  '[^0-9]', '', 'g')
+def montar_holerites_por_uuid(db: Session, uuids: List[str]) -> Dict[str, Dict[str, Any]]:
     """
-    filtro_comp_cab = filtro_comp_evt.replace("e.", "c.")
-    filtro_comp_rod = filtro_comp_evt.replace("e.", "r.")
-
-    params_base = {
-        "cpf": cpf,
-        "matricula": matricula,
-        "competencia": competencia,
-        "empresa": empresa,
-    }
-
-    # 1) UUIDs válidos (interseção cab+rod+evt)
-    sql_uuids = text(f"""
-        WITH cab AS (
-            SELECT DISTINCT c.uuid::text AS uuid
-              FROM tb_holerite_cabecalhos c
-             WHERE TRIM(c.cpf::text)       = TRIM(:cpf)
-               AND TRIM(c.matricula::text) = TRIM(:matricula)
-               AND TRIM(c.cliente::text)   = TRIM(:empresa)
-               AND coalesce(c.pagamento, '2999-12-31')::date < current_date - 1
-               AND {filtro_comp_cab}
-        ),
-        rod AS (
-            SELECT DISTINCT r.uuid::text AS uuid
-              FROM tb_holerite_rodapes r
-             WHERE TRIM(r.cpf::text)       = TRIM(:cpf)
-               AND TRIM(r.matricula::text) = TRIM(:matricula)
-               AND TRIM(r.cliente::text)   = TRIM(:empresa)
-               AND {filtro_comp_rod}
-        ),
-        evt AS (
-            SELECT DISTINCT e.uuid::text AS uuid
-              FROM tb_holerite_eventos e
-             WHERE TRIM(e.cpf::text)       = TRIM(:cpf)
-               AND TRIM(e.matricula::text) = TRIM(:matricula)
-               AND TRIM(e.cliente::text)   = TRIM(:empresa)
-               AND {filtro_comp_evt}
-        )
-        SELECT cab.uuid
-          FROM cab
-          JOIN rod USING (uuid)
-          JOIN evt USING (uuid)
-         ORDER BY cab.uuid DESC
+    Holerites completos (cabeçalho, rodapé e eventos agrupados A/P) por uuid,
+    com uma consulta por tabela para todos os UUIDs (uuid = ANY no tipo nativo
+    usa o índice da coluna). UUID sem alguma das partes fica de fora.
+    """
+    params_uuids = {"uuids": uuids}
+
+    sql_cab = text("""
+        SELECT DISTINCT ON (c.uuid)
+            c.*,
+            c.uuid::text AS uuid,
+            UPPER(TRIM(c.tipo_calculo::text)) AS tipo_calculo
+        FROM tb_holerite_cabecalhos c
+        WHERE c.uuid = ANY(CAST(:uuids AS uuid[]))
+        ORDER BY c.uuid
     """)
+    cab_res = db.execute(sql_cab, params_uuids)
+    cab_keys = list(cab_res.keys())
+    cabecalhos: Dict[str, Dict[str, Any]] = {}
+    for row in cab_res.fetchall():
+        cab = dict(zip(cab_keys, row))
+        cabecalhos[cab["uuid"]] = cab
+
+    sql_rod = text("""
+        SELECT DISTINCT ON (r.uuid)
+            r.*,
+            r.uuid::text AS uuid_txt
+          FROM tb_holerite_rodapes r
+         WHERE r.uuid = ANY(CAST(:uuids AS uuid[]))
+         ORDER BY r.uuid
+    """)
+    rod_res = db.execute(sql_rod, params_uuids)
+    rod_keys = list(rod_res.keys())
+    rodapes: Dict[str, Dict[str, Any]] = {}
+    for row in rod_res.fetchall():
+        rod = dict(zip(rod_keys, row))
+        rodapes[rod.pop("uuid_txt")] = rod
+
+    sql_evt = text("""
+        SELECT
+            e.*,
+            e.uuid::text AS uuid_txt
+          FROM tb_holerite_eventos e
+         WHERE e.uuid = ANY(CAST(:uuids AS uuid[]))
+         ORDER BY e.uuid, e.tipo_calculo, e.evento
+    """)
+    evt_res = db.execute(sql_evt, params_uuids)
+    evt_keys = list(evt_res.keys())
+    eventos_por_uuid: Dict[str, List[Dict[str, Any]]] = {}
+    for row in evt_res.fetchall():
+        evt = dict(zip(evt_keys, row))
+        eventos_por_uuid.setdefault(evt.pop("uuid_txt"), []).append(evt)
 
-    uuid_rows = db.execute(sql_uuids, params_base).fetchall()
-    uuids = [r[0] for r in uuid_rows if r and r[0]]
-
-    if not uuids:
-        raise HTTPException(
-            status_code=404,
-            detail="Nenhum holerite completo encontrado (cabecalho+rodape+eventos) para os critérios informados."
-        )
-
-    # 2) Aceite (por competência). Se quiser por UUID, precisa armazenar UUID na tabela status.
-    comp_norm_input = _only_yyyymm(_normaliza_anomes(competencia) or competencia)
-
-    def _table_exists(schema: str, table: str) -> bool:
-        q = text("""SELECT 1 FROM information_schema.tables
-                    WHERE table_schema=:schema AND table_name=:table LIMIT 1""")
-        return db.execute(q, {"schema": schema, "table": table}).first() is not None
-
-    def _column_exists(schema: str, table: str, column: str) -> bool:
-        q = text("""SELECT 1 FROM information_schema.columns
-                    WHERE table_schema=:schema AND table_name=:table AND column_name=:column LIMIT 1""")
-        return db.execute(q, {"schema": schema, "table": table, "column": column}).first() is not None
-
-    schema_status = "public"
-    table_try = "tb_satus_doc"
-    table_fbk = "tb_status_doc"
-
-    table_name = None
-    if _table_exists(schema_status, table_try):
-        table_name = f"{schema_status}.{table_try}"
-    elif _table_exists(schema_status, table_fbk):
-        table_name = f"{schema_status}.{table_fbk}"
-
-    aceito_bool = False
-    if table_name:
-        raw_table = table_name.split(".")[1]
-        has_comp = _column_exists(schema_status, raw_table, "competencia")
-        has_data = _column_exists(schema_status, raw_table, "data")
-        has_hora = _column_exists(schema_status, raw_table, "hora")
-
-        if has_comp:
-            comp_norm_expr = "regexp_replace(TRIM(sd.competencia), '[^0-9]', '', 'g')"
-        elif has_data:
-            comp_norm_expr = """
-                COALESCE(
-                    to_char(
-                        CASE
-                            WHEN sd.data ~ '^[0-9]{4}-[0-9]{2}-[0-9]{2}$'
-                            THEN to_date(sd.data, 'YYYY-MM-DD')
-                            ELSE NULL
-                        END,
-                        'YYYYMM'
-                    ),
-                    substr(regexp_replace(TRIM(sd.data), '[^0-9]', '', 'g'), 1, 6)
-                )
-            """
-        else:
-            comp_norm_expr = "NULL"
-
-        order_parts = ["sd.id DESC NULLS LAST"]
-        if has_data:
-            order_parts.append("sd.data DESC NULLS LAST")
-        if has_hora:
-            order_parts.append("sd.hora DESC NULLS LAST")
-        order_by_sql = ", ".join(order_parts)
-
-        sql_aceite = text(f"""
-            SELECT (ARRAY_AGG(sd.aceito ORDER BY {order_by_sql}))[1] AS aceito
-              FROM {table_name} sd
-             WHERE TRIM(sd.cpf::text)       = TRIM(:cpf)
-               AND TRIM(sd.matricula::text) = TRIM(:matricula)
-               AND {comp_norm_expr}         = :comp_norm
-        """)
-        try:
-            val = db.execute(sql_aceite, {"cpf": cpf, "matricula": matricula, "comp_norm": comp_norm_input}).scalar()
-            aceito_bool = bool(val) if val is not None else False
-        except Exception:
-            db.rollback()
-            aceito_bool = False
+    # agrupar A/P como antes
+    def _ord_tc(tc: str) -> int:
+        tc = (tc or "").upper()
+        return 1 if tc == "A" else (2 if tc == "P" else 99)
 
-    # 3) Monta holerites completos por UUID
-    holerites = []
+    montados: Dict[str, Dict[str, Any]] = {}
 
     for uuid in uuids:
-        # cabecalho
-        sql_cab = text("""
-            SELECT
-                c.*,
-                c.uuid::text AS uuid,
-                UPPER(TRIM(c.tipo_calculo::text)) AS tipo_calculo
-            FROM tb_holerite_cabecalhos c
-            WHERE c.uuid::text = :uuid
-            LIMIT 1
-        """)
-        cab_res = db.execute(sql_cab, {"uuid": uuid})
-        cab_row = cab_res.first()
-        if not cab_row:
+        cabecalho = cabecalhos.get(uuid)
+        rodape = rodapes.get(uuid)
+        eventos = eventos_por_uuid.get(uuid)
+        if not cabecalho or not rodape or not eventos:
             continue
-        cabecalho = dict(zip(cab_res.keys(), cab_row))
 
         tc = (cabecalho.get("tipo_calculo") or "").strip().upper()
         cabecalho["tipo_calculo"] = tc if tc in ("A", "P") else tc
 
-        # rodape
-        sql_rod = text("""
-            SELECT *
-              FROM tb_holerite_rodapes r
-             WHERE r.uuid::text = :uuid
-             LIMIT 1
-        """)
-        rod_res = db.execute(sql_rod, {"uuid": uuid})
-        rod_row = rod_res.first()
-        if not rod_row:
-            continue
-        rodape = dict(zip(rod_res.keys(), rod_row))
-
-        # eventos
-        sql_evt = text("""
-            SELECT *
-              FROM tb_holerite_eventos e
-             WHERE e.uuid::text = :uuid
-             ORDER BY tipo_calculo, evento
-        """)
-        evt_res = db.execute(sql_evt, {"uuid": uuid})
-        eventos = [dict(zip(evt_res.keys(), row)) for row in evt_res.fetchall()]
-        if not eventos:
-            continue
-
-        # agrupar A/P como antes
-        def _ord_tc(tc: str) -> int:
-            tc = (tc or "").upper()
-            return 1 if tc == "A" else (2 if tc == "P" else 99)
-
         try:
             eventos_sorted = sorted(eventos, key=lambda e: (_ord_tc(e.get("tipo_calculo")), e.get("evento")))
         except Exception:
@@ -621,193 +613,231 @@ def buscar_holerite(payload: BuscarHolerite = Body(...), db: Session = Depends(g
 
         tc = (cabecalho.get("tipo_calculo") or "").strip().upper()
 
-        holerites.append({
+        montados[uuid] = {
             "uuid": uuid,
-            "aceito": aceito_bool,  # por competência
             "tipo_calculo": tc,      # <<< NOVO (root)
             "descricao": "Adiantamento" if tc == "A" else ("Pagamento" if tc == "P" else None),
             "cabecalho": cabecalho,
             "rodape": rodape,
             "documentos": documentos,
-        })
+        }
+
+    return montados
+
+@router.post("/documents/holerite/buscar")
+async def buscar_holerite(
+    payload: BuscarHolerite = Body(...),
+    db: AsyncSession = Depends(get_async_read_db),
+    primario: AsyncSession = Depends(get_async_db),
+):
+    # as consultas são síncronas (compartilhadas com as rotas sync) e rodam
+    # pelo asyncpg via run_sync; o cache (leitura de disco, JSON) vai para o
+    # threadpool para não ocupar o event loop
+    busca = await db.run_sync(_chaves_holerite, payload)
+    lotes, lidas = busca["lotes"], busca["geracoes"]
+    # a geração que vale é a do primário: a réplica atrasada ainda não viu a invalidação
+    geracoes = await primario.run_sync(geracoes_dos_lotes, lotes.values()) if db.info.get("replica") else lidas
+
+    # 3) Holerites já montados vêm do cache (não mudam depois do pagamento);
+    #    só os que faltam são montados no banco. O aceite fica fora do cache.
+    montados, faltando = await run_in_threadpool(
+        separar_hits, "buscar", [(u, lotes[u]) for u in busca["uuids"]], geracoes
+    )
+    if faltando:
+        novos = await db.run_sync(montar_holerites_por_uuid, faltando)
+        montados.update(await run_in_threadpool(_grava_holerites, novos, lotes, geracoes, lidas))
+
+    holerites = [
+        {"uuid": u, "aceito": busca["aceito"], **{k: v for k, v in montados[u].items() if k != "uuid"}}
+        for u in busca["uuids"] if u in montados
+    ]
 
     if not holerites:
         raise HTTPException(status_code=404, detail="UUIDs encontrados, mas não foi possível montar holerites completos.")
 
     return {
         "tipo": "holerite",
-        "competencia_utilizada": competencia,
-        "empresa_utilizada": empresa,
-        "cpf": cpf,
-        "matricula": matricula,
+        "competencia_utilizada": busca["competencia"],
+        "empresa_utilizada": busca["empresa"],
+        "cpf": busca["cpf"],
+        "matricula": busca["matricula"],
         "total": len(holerites),
         "holerites": holerites,
     }
 
-def pad_left(valor: str, width: int) -> str:
-    return str(valor).strip().zfill(width)
-
-def fmt_num(valor: float) -> str:
-    s = f"{valor:,.2f}"
-    s = s.replace(",", "X").replace(".", ",")
-    return s.replace("X", ".")
-
-def truncate(text: str, max_len: int) -> str:
-    text = text or ""
-    return text if len(text) <= max_len else text[: max_len - 3] + "..."
-
-def gerar_recibo(cabecalho: dict, eventos: list[dict], rodape: dict, page_number: int = 1) -> bytes:
-    cabecalho["matricula"] = pad_left(cabecalho["matricula"], 6)
-    cabecalho["cliente"]   = pad_left(cabecalho["cliente"],   5)
-    cabecalho["empresa"]   = pad_left(cabecalho["empresa"],   3)
-    cabecalho["filial"]    = pad_left(cabecalho["filial"],    3)
-
-    adm = datetime.fromisoformat(cabecalho["admissao"])
-    cabecalho["admissao"]   = format_date(adm, "dd/MM/yyyy", locale="pt_BR")
-    comp = datetime.strptime(cabecalho["competencia"], "%Y%m")
-    cabecalho["competencia"] = format_date(comp, "LLLL/yyyy", locale="pt_BR").capitalize()
-
-    empresa_nome = truncate(cabecalho.get("empresa_nome", ""), 50)
-    cliente_nome = truncate(cabecalho.get("cliente_nome", ""), 50)
-    funcionario  = truncate(cabecalho.get("nome", ""), 30)
-    funcao       = truncate(cabecalho.get("funcao_nome", ""), 16)
-
-    pdf = FPDF(format='A4', unit='mm')
-    pdf.add_page()
-    pdf.set_auto_page_break(auto=True, margin=15)
-
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(0, 6, "Recibo de Pagamento de Salário", ln=0)
-    pdf.ln(6)
-
-    pdf.set_font("Arial", '', 9)
-    pdf.cell(120, 5, f"Empresa: {cabecalho['empresa']} - {cabecalho['filial']} {empresa_nome}", ln=0)
-    pdf.cell(0,   5, f"Nº Inscrição: {cabecalho['empresa_cnpj']}", ln=1, align='R')
-    pdf.cell(120, 5, f"Cliente: {cabecalho['cliente']} {cliente_nome}",       ln=0)
-    pdf.cell(0,   5, f"Nº Inscrição: {cabecalho['cliente_cnpj']}", ln=1, align='R')
-    pdf.ln(3)
-
-    col_widths = [20, 60, 40, 30, 30]
-    headers    = ["Código", "Nome do Funcionário", "Função", "Admissão", "Competência"]
-    pdf.set_font("Arial", 'B', 9)
-    for w, h in zip(col_widths, headers):
-        pdf.cell(w, 6, h)
-    pdf.ln(6)
-
-    pdf.set_font("Arial", '', 7)
-    vals = [cabecalho["matricula"], funcionario, funcao,
-            cabecalho["admissao"], cabecalho["competencia"]]
-    for w, v in zip(col_widths, vals):
-        pdf.cell(w, 6, v)
-    pdf.ln(6)
+def _grava_holerites(
+    novos: Dict[str, Dict[str, Any]], lotes: Dict[str, Any], geracoes: Dict[str, int], lidas: Dict[str, int]
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Grava no cache os holerites montados. `lidas` são as gerações vistas pela
+    sessão que leu os holerites: se ficaram atrás das do primário, a réplica
+    ainda não tem o lote reprocessado e o holerite é devolvido sem ir ao cache.
+    """
+    cache = get_cache_holerites()
+    gravados: Dict[str, Dict[str, Any]] = {}
+    for uuid, doc in novos.items():
+        lote = str(lotes[uuid])
+        geracao = geracoes.get(lote, 0)
+        if lidas.get(lote, 0) != geracao:
+            gravados[uuid] = doc
+            continue
+        gravados[uuid] = cache.gravar("buscar", uuid, lotes[uuid], doc, geracao)
+    return gravados
 
-    y_sep = pdf.get_y()
-    pdf.set_draw_color(0, 0, 0)
-    pdf.set_line_width(0.2)
-    pdf.line(pdf.l_margin, y_sep, pdf.w - pdf.r_margin, y_sep)
-    pdf.ln(3)
+def _chaves_holerite(db: Session, payload: BuscarHolerite) -> Dict[str, Any]:
+    """UUIDs (e lotes) dos holerites pagos da chave, aceite e gerações do cache."""
+    cpf = (payload.cpf or "").strip()
+    matricula = (payload.matricula or "").strip()
+    competencia = (payload.competencia or "").strip()
+    empresa = (payload.empresa or "").strip()
 
-    evt_headers = ["Cód.", "Descrição", "Referência", "Vencimentos", "Descontos"]
-    pdf.set_font("Arial", 'B', 9)
-    for i, (w, h) in enumerate(zip(col_widths, evt_headers)):
-        align = 'C' if i >= 2 else ''
-        pdf.cell(w, 6, h, align=align)
-    pdf.ln(6)
+    if not cpf or not matricula or not competencia or not empresa:
+        raise HTTPException(status_code=422, detail="Informe cpf, matricula, competencia e empresa.")
 
-    y_start = pdf.get_y()
-    pdf.set_font("Arial", '', 9)
-    for evt in eventos:
-        nome_evt = truncate(evt.get("evento_nome", ""), 30).upper()
-        row = [
-            str(evt['evento']),
-            nome_evt,
-            fmt_num(evt['referencia']),
-            fmt_num(evt['valor']) if evt['tipo'] == 'V' else "",
-            fmt_num(evt['valor']) if evt['tipo'] == 'D' else ""
-        ]
-        for i, (w, v) in enumerate(zip(col_widths, row)):
-            align = 'R' if i >= 2 else ''
-            pdf.cell(w, 6, v, align=align)
-        pdf.ln(6)
-    y_end = pdf.get_y()
-
-    x0 = pdf.l_margin + col_widths[0] + col_widths[1]
-    x1 = x0 + col_widths[2]
-    x2 = x1 + col_widths[3]
-    pdf.set_line_width(0.2)
-    for x in (x0, x1, x2):
-        pdf.line(x, y_start, x, y_end)
-    pdf.ln(2)
+    params_base = {
+        "cpf": _only_digits(cpf),
+        "matricula": matricula,
+        "competencia": _competencia_num(competencia),
+        "empresa": empresa,
+    }
 
-    y = pdf.get_y()
-    pdf.line(pdf.l_margin, y, pdf.w - pdf.r_margin, y)
-    pdf.ln(3)
+    # 1) UUIDs de holerites completos (cab+rod+evt), pelo resumo tb_holerite_competencias
+    sql_uuids = text("""
+        SELECT h.uuid::text AS uuid, h.lote
+          FROM tb_holerite_competencias h
+         WHERE h.cpf_digitos     = :cpf
+           AND h.matricula_norm  = :matricula
+           AND h.cliente_norm    = :empresa
+           AND h.competencia_num = :competencia
+           AND coalesce(h.pagamento, '2999-12-31')::date < current_date - 1
+         ORDER BY h.uuid DESC
+    """)
 
-    usable = pdf.w - pdf.l_margin - pdf.r_margin
-    half   = (usable - 10) / 2
-    pdf.set_font("Arial", 'B', 9)
-    pdf.cell(half, 6, "Total Vencimentos", ln=0, align='R')
-    pdf.cell(10,   6, "", ln=0)
-    pdf.cell(half, 6, "Total Descontos",    ln=1, align='R')
-    pdf.set_font("Arial", '', 9)
-    pdf.cell(half, 6, fmt_num(rodape['total_vencimentos']), ln=0, align='R')
-    pdf.cell(10,   6, "", ln=0)
-    pdf.cell(half, 6, fmt_num(rodape['total_descontos']),    ln=1, align='R')
-    pdf.ln(3)
+    uuid_rows = db.execute(sql_uuids, params_base).fetchall()
+    lotes = {r[0]: r[1] for r in uuid_rows if r and r[0]}
+    uuids = list(lotes)
 
-    pdf.set_font("Arial", 'B', 9)
-    pdf.cell(0, 6, f"Valor Líquido »» {fmt_num(rodape['valor_liquido'])}", ln=1, align='R')
-    pdf.ln(4)
+    if not uuids:
+        raise HTTPException(
+            status_code=404,
+            detail="Nenhum holerite completo encontrado (cabecalho+rodape+eventos) para os critérios informados."
+        )
 
-    y = pdf.get_y()
-    pdf.line(pdf.l_margin, y, pdf.w - pdf.r_margin, y)
-    pdf.ln(3)
+    # 2) Aceite (por competência). Se quiser por UUID, precisa armazenar UUID na tabela status.
+    comp_norm_input = _only_yyyymm(_normaliza_anomes(competencia) or competencia)
 
-    detalhes = ["Salário Base", "Sal. Contr. INSS", "Base Cálc FGTS",
-               "F.G.T.S. do Mês", "Base Cálc IRRF", "DEP SF", "DEP IRF"]
-    pdf.set_font("Arial", 'B', 8)
-    for d in detalhes:
-        pdf.cell(28, 5, d)
-    pdf.ln(5)
-
-    pdf.set_font("Arial", '', 8)
-    footer_vals = [
-        f"{fmt_num(rodape['salario_base'])}/M",
-        fmt_num(rodape['sal_contr_inss']),
-        fmt_num(rodape['base_calc_fgts']),
-        fmt_num(rodape['fgts_mes']),
-        fmt_num(rodape['base_calc_irrf']),
-        pad_left(rodape['dep_sf'], 2),
-        pad_left(rodape['dep_irf'], 2),
-    ]
-    for v in footer_vals:
-        pdf.cell(28, 6, v)
-    pdf.ln(10)
+    aceito_bool = get_consulta_aceite(db).aceito(db, cpf, matricula, comp_norm_input)
 
-    pdf.ln(10)
-    y_sig = pdf.get_y()
-    pdf.set_line_width(0.2)
-    pdf.line(pdf.l_margin, y_sig, pdf.l_margin + 80, y_sig)
-    pdf.ln(2)
-    pdf.set_font("Arial", '', 9)
-    pdf.cell(80, 6, funcionario, ln=0)
-    pdf.cell(0, 6, "Data: ____/____/____", ln=1, align='R')
+    return {
+        "cpf": cpf,
+        "matricula": matricula,
+        "competencia": competencia,
+        "empresa": empresa,
+        "uuids": uuids,
+        "lotes": lotes,
+        "geracoes": geracoes_dos_lotes(db, lotes.values()),
+        "aceito": aceito_bool,
+    }
 
-    return pdf.output(dest='S').encode('latin-1')
+def dados_recibos_por_uuid(db: Session, uuids: List[str]) -> Dict[str, tuple]:
+    """
+    (cabecalho, eventos, rodape) de cada uuid com as colunas que gerar_recibo
+    usa (as mesmas de montar_holerite), uma consulta por tabela. UUID sem
+    alguma das partes fica de fora; o tipo do evento volta em maiúsculas e a
+    validação (V/D) fica com quem chama.
+    """
+    params_uuids = {"uuids": uuids}
+
+    cab_res = db.execute(text("""
+        SELECT DISTINCT ON (c.uuid)
+               c.empresa, c.filial, c.empresa_nome, c.empresa_cnpj,
+               c.cliente, c.cliente_nome, c.cliente_cnpj,
+               c.matricula, c.nome, c.funcao_nome, c.admissao,
+               c.competencia, c.lote,
+               c.uuid::text AS uuid
+          FROM tb_holerite_cabecalhos c
+         WHERE c.uuid = ANY(CAST(:uuids AS uuid[]))
+         ORDER BY c.uuid
+    """), params_uuids)
+    cab_keys = list(cab_res.keys())
+    cabecalhos = {row.uuid: dict(zip(cab_keys, row)) for row in cab_res.fetchall()}
+
+    evt_res = db.execute(text("""
+        SELECT e.uuid::text AS uuid_txt,
+               e.evento, e.evento_nome, e.referencia, e.valor, e.tipo
+          FROM tb_holerite_eventos e
+         WHERE e.uuid = ANY(CAST(:uuids AS uuid[]))
+         ORDER BY e.uuid, e.evento
+    """), params_uuids)
+    evt_keys = list(evt_res.keys())
+    eventos_por_uuid: Dict[str, List[Dict[str, Any]]] = {}
+    for row in evt_res.fetchall():
+        evt = dict(zip(evt_keys, row))
+        evt["tipo"] = (evt.get("tipo") or "").upper()
+        eventos_por_uuid.setdefault(evt.pop("uuid_txt"), []).append(evt)
+
+    rod_res = db.execute(text("""
+        SELECT DISTINCT ON (r.uuid)
+               r.uuid::text AS uuid_txt,
+               r.total_vencimentos, r.total_descontos,
+               r.valor_liquido, r.salario_base,
+               r.sal_contr_inss, r.base_calc_fgts,
+               r.fgts_mes, r.base_calc_irrf,
+               r.dep_sf, r.dep_irf
+          FROM tb_holerite_rodapes r
+         WHERE r.uuid = ANY(CAST(:uuids AS uuid[]))
+         ORDER BY r.uuid
+    """), params_uuids)
+    rod_keys = list(rod_res.keys())
+    rodapes: Dict[str, Dict[str, Any]] = {}
+    for row in rod_res.fetchall():
+        rod = dict(zip(rod_keys, row))
+        rodapes[rod.pop("uuid_txt")] = rod
 
+    return {
+        uuid: (cabecalhos[uuid], eventos_por_uuid[uuid], rodapes[uuid])
+        for uuid in uuids
+        if uuid in cabecalhos and uuid in eventos_por_uuid and uuid in rodapes
+    }
 
 @router.post("/documents/holerite/montar")
 def montar_holerite(
     payload: MontarHolerite,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db),
+    primario: Session = Depends(get_db),
 ):
     params = {
-        "matricula": payload.matricula,
-        "competencia": payload.competencia,
+        "matricula": (payload.matricula or "").strip(),
+        "competencia": _competencia_num(payload.competencia),
         "lote": payload.lote,
-        "cpf": payload.cpf
+        "cpf": _only_digits(payload.cpf)
     }
 
+    # holerite já pago e sem ambiguidade na chave: usa o montado (com PDF) do cache
+    sql_uuid = text("""
+        SELECT h.uuid::text
+          FROM tb_holerite_competencias h
+         WHERE h.cpf_digitos     = :cpf
+           AND h.matricula_norm  = :matricula
+           AND h.competencia_num = :competencia
+           AND h.lote            = :lote
+           AND coalesce(h.pagamento, '2999-12-31')::date < current_date - 1
+         LIMIT 2
+    """)
+    candidatos = [r[0] for r in db.execute(sql_uuid, params).fetchall()]
+    uuid_cache = candidatos[0] if len(candidatos) == 1 else None
+    geracao = geracao_lida = 0
+    if uuid_cache:
+        # a geração vale pelo primário; a lida na réplica só diz se ela já viu a última invalidação
+        geracao_lida = geracoes_dos_lotes(db, [payload.lote]).get(str(payload.lote), 0)
+        if db.info.get("replica"):
+            geracao = geracoes_dos_lotes(primario, [payload.lote]).get(str(payload.lote), 0)
+        else:
+            geracao = geracao_lida
+        cacheado = get_cache_holerites().obter("montar", uuid_cache, payload.lote, geracao)
+        if cacheado is not None:
+            return cacheado
+
     # >>> ALTERAÇÃO: inclui uuid como texto <<<
     sql_cabecalho = text("""
         SELECT empresa, filial, empresa_nome, empresa_cnpj,
@@ -816,10 +846,10 @@ def montar_holerite(
                competencia, lote,
                uuid::text AS uuid
         FROM tb_holerite_cabecalhos
-        WHERE matricula   = :matricula
-          AND competencia = :competencia
-          AND lote        = :lote
-          AND cpf         = :cpf
+        WHERE matricula_norm  = :matricula
+          AND competencia_num = :competencia
+          AND lote            = :lote
+          AND cpf_digitos     = :cpf
     """)
     cab_res = db.execute(sql_cabecalho, params)
     cab_row = cab_res.first()
@@ -830,10 +860,10 @@ def montar_holerite(
     sql_eventos = text("""
         SELECT evento, evento_nome, referencia, valor, tipo
         FROM tb_holerite_eventos
-        WHERE matricula   = :matricula
-          AND competencia = :competencia
-          AND lote        = :lote
-          AND cpf         = :cpf
+        WHERE matricula_norm  = :matricula
+          AND competencia_num = :competencia
+          AND lote            = :lote
+          AND cpf_digitos     = :cpf
         ORDER BY evento
     """)
     evt_res = db.execute(sql_eventos, params)
@@ -855,10 +885,10 @@ def montar_holerite(
                fgts_mes, base_calc_irrf,
                dep_sf, dep_irf
         FROM tb_holerite_rodapes
-        WHERE matricula   = :matricula
-          AND competencia = :competencia
-          AND lote        = :lote
-          AND cpf         = :cpf
+        WHERE matricula_norm  = :matricula
+          AND competencia_num = :competencia
+          AND lote            = :lote
+          AND cpf_digitos     = :cpf
     """)
     rod_res = db.execute(sql_rodape, params)
     rod_row = rod_res.first()
@@ -869,32 +899,25 @@ def montar_holerite(
     raw_pdf = gerar_recibo(cabecalho, eventos, rodape)
     pdf_base64 = base64.b64encode(raw_pdf).decode("utf-8")
 
-    return {
+    resultado = {
         "uuid": cabecalho.get("uuid"),  # >>> AGORA VEM NO ROOT <<<
         "cabecalho": cabecalho,         # (inclui uuid também aqui)
         "eventos": eventos,
         "rodape": rodape,
         "pdf_base64": pdf_base64
     }
+    if uuid_cache and cabecalho.get("uuid") == uuid_cache and geracao_lida == geracao:
+        return get_cache_holerites().gravar("montar", uuid_cache, payload.lote, resultado, geracao)
+    return resultado
 
 @router.post("/searchdocuments/download")
-def baixar_documento(payload: DownloadDocumentoPayload):
-    auth_key = login(
-        conta=settings.GED_CONTA,
-        usuario=settings.GED_USUARIO,
-        senha=settings.GED_SENHA
-    )
-    headers = {
-        "Authorization": auth_key,
-        "Content-Type": "application/x-www-form-urlencoded; charset=ISO-8859-1"
-    }
+async def baixar_documento(payload: DownloadDocumentoPayload):
     data = {
         "id_tipo": payload.id_tipo,
         "id_documento": payload.id_documento
     }
-    response = requests.post(
-        f"{BASE_URL}/documents/download",
-        headers=headers,
+    response = await get_ged_client().post(
+        "/documents/download",
         data=data
     )
     if response.status_code != 200:
@@ -907,8 +930,49 @@ def baixar_documento(payload: DownloadDocumentoPayload):
             "base64_raw": response.text
         }
 
+@router.get("/searchdocuments/download/stream")
+async def baixar_documento_stream(
+    id_tipo: int = Query(...),
+    id_documento: int = Query(...),
+    nome: Optional[str] = Query(None, description="Nome do arquivo no Content-Disposition"),
+    download: bool = Query(False, description="true = attachment; false = inline"),
+):
+    """
+    Repassa o documento do GED em partes, já como binário (PDF ou o tipo
+    original), sem montar JSON nem base64 na resposta. Documentos já baixados
+    saem do cache em disco (FileResponse, com sendfile quando o servidor
+    suporta) sem passar pelo GED.
+    """
+    disposicao = "attachment" if download else "inline"
+    nome_arquivo = re.sub(r'["\r\n\\]', "", nome or "").encode("latin-1", "ignore").decode("latin-1")
+
+    cache = get_cache_documentos()
+    entrada = cache.obter(id_tipo, id_documento) if cache is not None else None
+    if entrada is not None:
+        nome_arquivo = nome_arquivo or f"documento_{id_documento}{entrada.extensao}"
+        return FileResponse(
+            entrada.caminho,
+            media_type=entrada.mimetype,
+            headers={"Content-Disposition": f'{disposicao}; filename="{nome_arquivo}"'},
+        )
+
+    doc = await abrir_download(id_tipo, id_documento)
+
+    nome_arquivo = nome_arquivo or f"documento_{id_documento}{doc.extensao}"
+    headers = {"Content-Disposition": f'{disposicao}; filename="{nome_arquivo}"'}
+    if doc.tamanho is not None:
+        headers["Content-Length"] = str(doc.tamanho)
+
+    corpo = cache.gravando(id_tipo, id_documento, doc) if cache is not None else doc.chunks()
+    return StreamingResponse(
+        corpo,
+        media_type=doc.mimetype,
+        headers=headers,
+        background=BackgroundTask(doc.aclose),
+    )
+
 @router.post("/documents/search/informetrct")
-def buscar_search_documentos_ano(
+async def buscar_search_documentos_ano(
     payload: dict = Body(...),
     db: Session = Depends(get_db),
 ):
@@ -942,34 +1006,21 @@ def buscar_search_documentos_ano(
         m = re.search(r"\d{4}", v)
         return m.group(0) if m else None
 
-    def _coleta_anos_via_search(
-        headers: Dict[str, str],
+    async def _coleta_anos_via_search(
         id_template: int | str,
-        nomes_campos: List[str],
         lista_cp: List[str],
         campo_ano: str,
         max_pages: int = 10,
     ) -> List[str]:
         anos: Set[str] = set()
-        pagina = 1
-        total_paginas = 1
-        while pagina <= total_paginas and pagina <= max_pages:
-            form = [("id_tipo", str(id_template))]
-            form += [("cp[]", v) for v in lista_cp]
-            form += [
-                ("ordem", "no_ordem"),
-                ("dt_criacao", ""),
-                ("pagina", str(pagina)),
-                ("colecao", "S"),
-            ]
-            r = requests.post(
-                f"{BASE_URL}/documents/search",
-                data=form,
-                headers=headers,
-                timeout=60,
-            )
-            r.raise_for_status()
-            data = r.json() or {}
+        form = [("id_tipo", str(id_template))]
+        form += [("cp[]", v) for v in lista_cp]
+        form += [
+            ("ordem", "no_ordem"),
+            ("dt_criacao", ""),
+            ("colecao", "S"),
+        ]
+        async for data in ged.search_pages(form, max_pages=max_pages):
             docs = [_flatten_attributes(doc) for doc in (data.get("documents") or [])]
             for d in docs:
                 bruto = str(d.get(campo_ano, "")).strip()
@@ -977,13 +1028,6 @@ def buscar_search_documentos_ano(
                 if n:
                     anos.add(n)
 
-            vars_ = data.get("variables") or {}
-            try:
-                total_paginas = int(vars_.get("totalpaginas", total_paginas))
-            except Exception:
-                total_paginas = 1
-            pagina += 1
-
         return sorted(anos, reverse=True)
 
     # ---- 0) lê payload no MESMO formato da /documents/search ----
@@ -997,54 +1041,42 @@ def buscar_search_documentos_ano(
         raise HTTPException(422, detail="Informe 'id_template' no payload.")
 
     # ---- 1) autenticação GED ----
+    ged = get_ged_client()
     try:
-        auth_key = login(
-            conta=settings.GED_CONTA,
-            usuario=settings.GED_USUARIO,
-            senha=settings.GED_SENHA,
-        )
+        await ged.authorization_key()
+    except ServicoIndisponivel:
+        # circuito aberto: mantém o 503 com Retry-After
+        raise
     except Exception as e:
         raise HTTPException(502, f"Falha na autenticação no GED: {e}")
-    headers = _headers(auth_key)
 
     # ---- 2) campos do template ----
-    r_fields = requests.post(
-        f"{BASE_URL}/templates/getfields",
-        data={"id_template": id_template},
-        headers=headers,
-        timeout=30,
-    )
-    r_fields.raise_for_status()
-    fields_json = r_fields.json() or {}
-    nomes_campos = [f.get("nomecampo") for f in fields_json.get("fields", []) if f.get("nomecampo")]
+    tpl = (await obter_template(id_template)).para_busca()
 
-    if not nomes_campos:
+    if not tpl.nomes:
         raise HTTPException(400, "Template sem campos ou inválido")
-    if campo_anomes not in nomes_campos:
+    if tpl.indice(campo_anomes) is None:
         raise HTTPException(400, f"Campo '{campo_anomes}' não existe no template")
 
-    def _campos_template_txt() -> str:
-        return ", ".join(nomes_campos) if nomes_campos else "(vazio)"
-
     # ---- 3) monta cp[] na ordem do template (igual /documents/search) ----
-    lista_cp = ["" for _ in nomes_campos]
+    lista_cp = tpl.cp_vazio()
     for item in cp_items:
         nome = (item.get("nome") or "").strip()
         valor = (item.get("valor") or "").strip()
         if not nome:
             continue
-        if nome not in nomes_campos:
+        idx = tpl.indice(nome)
+        if idx is None:
             raise HTTPException(400, f"Campo '{nome}' não existe no template")
-        lista_cp[nomes_campos.index(nome)] = valor
+        lista_cp[idx] = valor
 
     # ---- 4) chave composta: tipodedoc + cpf ----
-    if "tipodedoc" not in nomes_campos:
-        raise HTTPException(400, f"Template precisa ter 'tipodedoc'. Campos: [{_campos_template_txt()}]")
-    if "cpf" not in nomes_campos:
-        raise HTTPException(400, f"Template precisa ter 'cpf'. Campos: [{_campos_template_txt()}]")
-
-    idx_tipodedoc = nomes_campos.index("tipodedoc")
-    idx_cpf = nomes_campos.index("cpf")
+    idx_tipodedoc = tpl.indice("tipodedoc")
+    if idx_tipodedoc is None:
+        raise HTTPException(400, f"Template precisa ter 'tipodedoc'. Campos: [{tpl.nomes_txt()}]")
+    idx_cpf = tpl.indice("cpf")
+    if idx_cpf is None:
+        raise HTTPException(400, f"Template precisa ter 'cpf'. Campos: [{tpl.nomes_txt()}]")
 
     tipodedoc_val = (lista_cp[idx_tipodedoc] or "").strip()
     if not tipodedoc_val:
@@ -1064,51 +1096,50 @@ def buscar_search_documentos_ano(
     # ------------------------------------------------------------------
     alvo: Set[str] = set()
     if not anomes_raw and not anomes_in_raw:
-        form_filter = [
-            ("id_tipo", str(id_template)),
-            ("filtro", campo_anomes),
-            ("filtro1", "tipodedoc"),
-            ("filtro1_valor", tipodedoc_val),
-            ("filtro2", "cpf"),
-            ("filtro2_valor", f"%{cpf_digits}%"),
-        ]
-        try:
-            rf = requests.post(
-                f"{BASE_URL}/documents/filter",
-                data=form_filter,
-                headers=headers,
-                timeout=60,
-            )
-            rf.raise_for_status()
-            fdata = rf.json() or {}
-            if fdata.get("error"):
-                raise RuntimeError(f"GED error: {fdata.get('message')}")
-            grupos = fdata.get("groups") or []
-
-            anos_set: Set[str] = set()
-            for g in grupos:
-                bruto = str(g.get(campo_anomes, "")).strip()
-                n = _normaliza_ano_local(bruto)
-                if n:
-                    anos_set.add(n)
-
-            if anos_set:
-                anos_sorted = sorted({int(a) for a in anos_set}, reverse=True)
-                return {"anos": [{"ano": a} for a in anos_sorted]}
-
-        except (requests.HTTPError, requests.RequestException, RuntimeError):
-            # === Fallback padrão igual /documents/search → via /documents/search paginado ===
-            anos_norm = _coleta_anos_via_search(
-                headers=headers,
-                id_template=id_template,
-                nomes_campos=nomes_campos,
-                lista_cp=lista_cp,
-                campo_ano=campo_anomes,
-            )
-            if anos_norm:
-                anos_sorted = sorted({int(a) for a in anos_norm}, reverse=True)
-                return {"anos": [{"ano": a} for a in anos_sorted]}
-            raise HTTPException(404, "Nenhum ano disponível para os parâmetros enviados.")
+        async def _carrega_anos() -> List[str]:
+            form_filter = [
+                ("id_tipo", str(id_template)),
+                ("filtro", campo_anomes),
+                ("filtro1", "tipodedoc"),
+                ("filtro1_valor", tipodedoc_val),
+                ("filtro2", "cpf"),
+                ("filtro2_valor", f"%{cpf_digits}%"),
+            ]
+            try:
+                rf = await ged.post(
+                    "/documents/filter",
+                    data=form_filter,
+                )
+                rf.raise_for_status()
+                fdata = rf.json() or {}
+                if fdata.get("error"):
+                    raise RuntimeError(f"GED error: {fdata.get('message')}")
+                grupos = fdata.get("groups") or []
+
+                anos_set: Set[str] = set()
+                for g in grupos:
+                    bruto = str(g.get(campo_anomes, "")).strip()
+                    n = _normaliza_ano_local(bruto)
+                    if n:
+                        anos_set.add(n)
+                return sorted(anos_set)
+
+            except (httpx.HTTPError, RuntimeError):
+                # === Fallback padrão igual /documents/search → via /documents/search paginado ===
+                anos_norm = await _coleta_anos_via_search(
+                    id_template=id_template,
+                    lista_cp=lista_cp,
+                    campo_ano=campo_anomes,
+                )
+                if anos_norm:
+                    return anos_norm
+                raise HTTPException(404, "Nenhum ano disponível para os parâmetros enviados.")
+
+        chave = ("informetrct", str(id_template), campo_anomes, tuple(lista_cp))
+        anos = await _disponibilidade_cache.get_or_load(chave, _carrega_anos)
+        if anos:
+            anos_sorted = sorted({int(a) for a in anos}, reverse=True)
+            return {"anos": [{"ano": a} for a in anos_sorted]}
 
     # ------------------------------------------------------------------
     # 6) Temos anomes/anomes_in → tratar como lista de ANOS (YYYY)
@@ -1138,7 +1169,7 @@ def buscar_search_documentos_ano(
     # ------------------------------------------------------------------
     # 7) executa a busca (idêntico à /documents/search, mas filtra por ANO)
     # ------------------------------------------------------------------
-    def _do_search(cp_override: Optional[List[str]] = None):
+    async def _do_search(cp_override: Optional[List[str]] = None):
         form = [("id_tipo", str(id_template))]
         form += [("cp[]", v) for v in (cp_override if cp_override is not None else lista_cp)]
         form += [
@@ -1147,16 +1178,20 @@ def buscar_search_documentos_ano(
             ("pagina", "1"),
             ("colecao", "S"),
         ]
-        r = requests.post(f"{BASE_URL}/documents/search", data=form, headers=headers, timeout=60)
+        r = await ged.post("/documents/search", data=form)
         r.raise_for_status()
         data = r.json() or {}
         if data.get("error"):
-            raise HTTPException(400, f"Documento não encontrardo para crietérios informados")
+            raise GedSemDocumentos(400, f"Documento não encontrardo para crietérios informados")
         return [_flatten_attributes(doc) for doc in (data.get("documents") or [])]
 
     try:
-        documentos_total = _do_search()
-    except requests.HTTPError as err:
+        documentos_total = await _busca_por_periodo(
+            _do_search, lista_cp, tpl.indice(campo_anomes), [f"%{a}%" for a in sorted(alvo)]
+        )
+        if documentos_total is None:
+            documentos_total = await _do_search()
+    except httpx.HTTPStatusError as err:
         try:
             raise HTTPException(err.response.status_code, f"GED erro: {err.response.json()}")
         except Exception:
@@ -1164,7 +1199,7 @@ def buscar_search_documentos_ano(
                 getattr(err.response, "status_code", 502),
                 f"GED erro: {getattr(err.response, 'text', err)}",
             )
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(502, f"Falha ao consultar GED (search): {e}")
 
     # ------------------------------------------------------------------
@@ -1191,53 +1226,43 @@ def buscar_search_documentos_ano(
     }
 
 @router.post("/documents/search/recibos")
-def buscar_search_documentos(payload: SearchDocumentosRequest, db: Session = Depends(get_db)):
+async def buscar_search_documentos(payload: SearchDocumentosRequest, db: Session = Depends(get_db)):
+    ged = get_ged_client()
     try:
-        auth_key = login(
-            conta=settings.GED_CONTA, usuario=settings.GED_USUARIO, senha=settings.GED_SENHA
-        )
+        await ged.authorization_key()
+    except ServicoIndisponivel:
+        # circuito aberto: mantém o 503 com Retry-After
+        raise
     except Exception as e:
         raise HTTPException(502, f"Falha na autenticação no GED: {e}")
-    headers = _headers(auth_key)
 
-    r_fields = requests.post(
-        f"{BASE_URL}/templates/getfields",
-        data={"id_template": payload.id_template},
-        headers=headers,
-        timeout=30,
-    )
-    r_fields.raise_for_status()
-    fields_json = r_fields.json() or {}
-    nomes_campos = [f.get("nomecampo") for f in fields_json.get("fields", []) if f.get("nomecampo")]
+    tpl = (await obter_template(payload.id_template)).para_busca()
 
-    if not nomes_campos:
+    if not tpl.nomes:
         raise HTTPException(400, "Template sem campos ou inválido")
-    if payload.campo_anomes not in nomes_campos:
+    if tpl.indice(payload.campo_anomes) is None:
         raise HTTPException(400, f"Campo '{payload.campo_anomes}' não existe no template")
 
-    lista_cp = ["" for _ in nomes_campos]
+    lista_cp = tpl.cp_vazio()
     for item in payload.cp:
-        if item.nome not in nomes_campos:
+        idx = tpl.indice(item.nome)
+        if idx is None:
             raise HTTPException(400, f"Campo '{item.nome}' não existe no template")
-        lista_cp[nomes_campos.index(item.nome)] = (item.valor or "").strip()
+        lista_cp[idx] = (item.valor or "").strip()
 
-    def _campos_template_txt() -> str:
-        return ", ".join(nomes_campos) if nomes_campos else "(vazio)"
-
-    if "matricula" not in nomes_campos:
-        raise HTTPException(400, f"Template precisa ter 'matricula'. Campos: [{_campos_template_txt()}]")
-    idx_matricula = nomes_campos.index("matricula")
+    idx_matricula = tpl.indice("matricula")
+    if idx_matricula is None:
+        raise HTTPException(400, f"Template precisa ter 'matricula'. Campos: [{tpl.nomes_txt()}]")
     matricula_val = (lista_cp[idx_matricula] or "").strip()
     if not matricula_val:
         raise HTTPException(422, "Informe 'matricula' em cp[] para a chave composta.")
 
-    norm_map = {_norm(n): i for i, n in enumerate(nomes_campos)}
-    idx_colaborador = norm_map.get(_norm("colaborador"))
+    idx_colaborador = tpl.indice_norm("colaborador")
     if idx_colaborador is None:
         raise HTTPException(
             422,
             f"O template não possui o campo 'colaborador' necessário para busca aproximada por CPF. "
-            f"Campos do template: [{_campos_template_txt()}]."
+            f"Campos do template: [{tpl.nomes_txt()}]."
         )
 
     colaborador_original = (lista_cp[idx_colaborador] or "").strip()
@@ -1253,7 +1278,7 @@ def buscar_search_documentos(payload: SearchDocumentosRequest, db: Session = Dep
     # <<< NOVO: empresa como busca aproximada >>>
     idx_empresa = None
     for key in ("empresa", "cliente"):
-        idx_empresa = norm_map.get(_norm(key))
+        idx_empresa = tpl.indice_norm(key)
         if idx_empresa is not None:
             break
 
@@ -1263,59 +1288,57 @@ def buscar_search_documentos(payload: SearchDocumentosRequest, db: Session = Dep
             lista_cp[idx_empresa] = f"%{empresa_val}%"
 
     if not payload.anomes and not payload.anomes_in:
-        if "tipodedoc" not in nomes_campos:
+        idx_tipodedoc = tpl.indice("tipodedoc")
+        if idx_tipodedoc is None:
             raise HTTPException(400, "Campo 'tipodedoc' não existe no template")
-        tipodedoc_val = (lista_cp[nomes_campos.index("tipodedoc")] or "").strip()
+        tipodedoc_val = (lista_cp[idx_tipodedoc] or "").strip()
         if not tipodedoc_val:
             raise HTTPException(400, "Para listar anomes, informe 'tipodedoc' em cp[].")
 
-        form_filter = [
-            ("id_tipo", str(payload.id_template)),
-            ("filtro", payload.campo_anomes),
-            ("filtro1", "tipodedoc"),
-            ("filtro1_valor", tipodedoc_val),
-            ("filtro2", "matricula"),
-            ("filtro2_valor", matricula_val),
-        ]
-        try:
-            rf = requests.post(f"{BASE_URL}/documents/filter", data=form_filter, headers=headers, timeout=60)
-            rf.raise_for_status()
-            fdata = rf.json() or {}
-            if fdata.get("error"):
-                raise RuntimeError(f"GED error: {fdata.get('message')}")
-            grupos = fdata.get("groups") or []
-
-            meses_set: Set[str] = set()
-            for g in grupos:
-                bruto = str(g.get(payload.campo_anomes, "")).strip()
-                n = _normaliza_anomes(bruto)
-                if n:
-                    meses_set.add(n)
-
-            if meses_set:
-                meses_sorted_objs = sorted(
-                    (_to_ano_mes(m) for m in meses_set),
-                    key=lambda x: (x["ano"], x["mes"]),
-                    reverse=True
+        async def _carrega_meses() -> List[str]:
+            form_filter = [
+                ("id_tipo", str(payload.id_template)),
+                ("filtro", payload.campo_anomes),
+                ("filtro1", "tipodedoc"),
+                ("filtro1_valor", tipodedoc_val),
+                ("filtro2", "matricula"),
+                ("filtro2_valor", matricula_val),
+            ]
+            try:
+                rf = await ged.post("/documents/filter", data=form_filter)
+                rf.raise_for_status()
+                fdata = rf.json() or {}
+                if fdata.get("error"):
+                    raise RuntimeError(f"GED error: {fdata.get('message')}")
+                grupos = fdata.get("groups") or []
+
+                meses_set: Set[str] = set()
+                for g in grupos:
+                    bruto = str(g.get(payload.campo_anomes, "")).strip()
+                    n = _normaliza_anomes(bruto)
+                    if n:
+                        meses_set.add(n)
+                return sorted(meses_set)
+
+            except (httpx.HTTPError, RuntimeError):
+                meses_norm = await _coleta_anomes_via_search(
+                    id_template=payload.id_template,
+                    lista_cp=lista_cp,
+                    campo_anomes=payload.campo_anomes,
                 )
-                return {"anomes": meses_sorted_objs}
-
-        except (requests.HTTPError, requests.RequestException, RuntimeError):
-            meses_norm = _coleta_anomes_via_search(
-                headers=headers,
-                id_template=payload.id_template,
-                nomes_campos=nomes_campos,
-                lista_cp=lista_cp,
-                campo_anomes=payload.campo_anomes,
+                if meses_norm:
+                    return meses_norm
+                raise HTTPException(404, "Nenhum mês disponível para os parâmetros enviados.")
+
+        chave = ("recibos", str(payload.id_template), payload.campo_anomes, tuple(lista_cp))
+        meses = await _disponibilidade_cache.get_or_load(chave, _carrega_meses)
+        if meses:
+            meses_sorted_objs = sorted(
+                (_to_ano_mes(m) for m in meses),
+                key=lambda x: (x["ano"], x["mes"]),
+                reverse=True
             )
-            if meses_norm:
-                meses_sorted_objs = sorted(
-                    (_to_ano_mes(m) for m in meses_norm),
-                    key=lambda x: (x["ano"], x["mes"]),
-                    reverse=True
-                )
-                return {"anomes": meses_sorted_objs}
-            raise HTTPException(404, "Nenhum mês disponível para os parâmetros enviados.")
+            return {"anomes": meses_sorted_objs}
 
     alvo: Set[str] = set()
     if payload.anomes:
@@ -1330,7 +1353,7 @@ def buscar_search_documentos(payload: SearchDocumentosRequest, db: Session = Dep
                 raise HTTPException(400, f"Valor inválido em anomes_in: '{val}'")
             alvo.add(n)
 
-    def _do_search(cp_override: Optional[List[str]] = None):
+    async def _do_search(cp_override: Optional[List[str]] = None):
         form = [("id_tipo", str(payload.id_template))]
         form += [("cp[]", v) for v in (cp_override if cp_override is not None else lista_cp)]
         form += [
@@ -1339,21 +1362,25 @@ def buscar_search_documentos(payload: SearchDocumentosRequest, db: Session = Dep
             ("pagina", "1"),
             ("colecao", "S"),
         ]
-        r = requests.post(f"{BASE_URL}/documents/search", data=form, headers=headers, timeout=60)
+        r = await ged.post("/documents/search", data=form)
         r.raise_for_status()
         data = r.json() or {}
         if data.get("error"):
-            raise HTTPException(500, f"GED erro (search): {data.get('message')}")
+            raise GedSemDocumentos(500, f"GED erro (search): {data.get('message')}")
         return [_flatten_attributes(doc) for doc in (data.get("documents") or [])]
 
     try:
-        documentos_total = _do_search()
-    except requests.HTTPError as err:
+        documentos_total = await _busca_por_periodo(
+            _do_search, lista_cp, tpl.indice(payload.campo_anomes), [_padrao_mes(m) for m in sorted(alvo)]
+        )
+        if documentos_total is None:
+            documentos_total = await _do_search()
+    except httpx.HTTPStatusError as err:
         try:
             raise HTTPException(err.response.status_code, f"GED erro: {err.response.json()}")
         except Exception:
             raise HTTPException(getattr(err.response, "status_code", 502), f"GED erro: {getattr(err.response, 'text', err)}")
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(502, f"Falha ao consultar GED (search): {e}")
 
     filtrados: List[Dict[str, Any]] = []
@@ -1369,86 +1396,16 @@ def buscar_search_documentos(payload: SearchDocumentosRequest, db: Session = Dep
 
     filtrados.sort(key=lambda x: x["_norm_anomes"], reverse=True)
 
-    def __table_exists(schema: str, table: str) -> bool:
-        q = text("""
-            SELECT 1 FROM information_schema.tables
-             WHERE table_schema = :schema AND table_name = :table
-            LIMIT 1
-        """)
-        return db.execute(q, {"schema": schema, "table": table}).first() is not None
-
-    def __column_exists(schema: str, table: str, column: str) -> bool:
-        q = text("""
-            SELECT 1 FROM information_schema.columns
-             WHERE table_schema = :schema AND table_name = :table AND column_name = :column
-            LIMIT 1
-        """)
-        return db.execute(q, {"schema": schema, "table": table, "column": column}).first() is not None
-
-    schema_status = "public"
-    table_try = "tb_satus_doc"
-    table_fbk = "tb_status_doc"
-    table_name: Optional[str] = None
-    if __table_exists(schema_status, table_try):
-        table_name = f"{schema_status}.{table_try}"
-    elif __table_exists(schema_status, table_fbk):
-        table_name = f"{schema_status}.{table_fbk}"
-
-    aceito_cache: Dict[str, bool] = {}
-
-    def _aceito_for_comp(comp_norm_input: str) -> bool:
-        if not table_name:
-            return False
-        raw_table = table_name.split(".")[1]
-        has_comp = __column_exists(schema_status, raw_table, "competencia")
-        has_data = __column_exists(schema_status, raw_table, "data")
-        has_hora = __column_exists(schema_status, raw_table, "hora")
-
-        if has_comp:
-            comp_norm_expr = "regexp_replace(TRIM(sd.competencia), '[^0-9]', '', 'g')"
-        elif has_data:
-            comp_norm_expr = """
-                COALESCE(
-                    to_char(CASE
-                                WHEN sd.data ~ '^[0-9]{4}-[0-9]{2}-[0-9]{2}$'
-                                THEN to_date(sd.data, 'YYYY-MM-DD')
-                                ELSE NULL
-                            END, 'YYYYMM'),
-                    substr(regexp_replace(TRIM(sd.data), '[^0-9]', '', 'g'), 1, 6)
-                )
-            """
-        else:
-            comp_norm_expr = "NULL"
-
-        order_parts = ["sd.id DESC NULLS LAST"]
-        if has_data:
-            order_parts.append("sd.data DESC NULLS LAST")
-        if has_hora:
-            order_parts.append("sd.hora DESC NULLS LAST")
-        order_by_sql = ", ".join(order_parts)
-
-        sql_aceite = text(f"""
-            SELECT (ARRAY_AGG(sd.aceito ORDER BY {order_by_sql}))[1] AS aceito
-              FROM {table_name} sd
-             WHERE TRIM(sd.cpf::text) = TRIM(:cpf)
-               AND TRIM(sd.matricula::text) = TRIM(:matricula)
-               AND {comp_norm_expr} = :comp_norm
-        """)
-
-        try:
-            val = db.execute(sql_aceite, {
-                "cpf": cpf_extraido,
-                "matricula": matricula_val,
-                "comp_norm": comp_norm_input,
-            }).scalar()
-            return bool(val) if val is not None else False
-        except Exception:
-            db.rollback()
-            return False
+    # consultas ao banco (síncronas) rodam no threadpool para não travar o event loop
+    def _consulta_aceites() -> Dict[str, bool]:
+        # _norm_anomes é YYYY-MM; a tabela de status compara YYYYMM
+        meses_unicos = {d["_norm_anomes"] for d in filtrados}
+        por_comp = get_consulta_aceite(db).aceites(
+            db, cpf_extraido, matricula_val, (_only_yyyymm(m) for m in meses_unicos)
+        )
+        return {m: por_comp.get(_only_yyyymm(m), False) for m in meses_unicos}
 
-    meses_unicos = {d["_norm_anomes"] for d in filtrados}
-    for m in meses_unicos:
-        aceito_cache[m] = _aceito_for_comp(m)
+    aceito_cache = await run_in_threadpool(_consulta_aceites)
 
     for d in filtrados:
         d["aceito"] = bool(aceito_cache.get(d["_norm_anomes"], False))
@@ -1461,7 +1418,7 @@ def buscar_search_documentos(payload: SearchDocumentosRequest, db: Session = Dep
     }
 
 @router.post("/documents/beneficios/buscar")
-def buscar_beneficios(payload: dict = Body(...), db: Session = Depends(get_db)):
+async def buscar_beneficios(payload: dict = Body(...), db: AsyncSession = Depends(get_async_read_db)):
     cpf = (payload.get("cpf") or "").strip()
     matricula = (payload.get("matricula") or "").strip()
     competencia = (payload.get("competencia") or "").strip()
@@ -1500,10 +1457,10 @@ def buscar_beneficios(payload: dict = Body(...), db: Session = Depends(get_db)):
             regexp_replace(TRIM(:competencia),  '[^0-9]', '', 'g')
         ORDER BY tipo_beneficio, codigo_beneficio
     """)
-    benef_rows = db.execute(
+    benef_rows = (await db.execute(
         sql_benef,
         {"cpf": cpf, "matricula": matricula, "competencia": competencia, "empresa": empresa},
-    ).fetchall()
+    )).fetchall()
 
     if not benef_rows:
         raise HTTPException(status_code=404, detail="Nenhum benefício encontrado para os critérios informados.")
@@ -1520,6 +1477,32 @@ def buscar_beneficios(payload: dict = Body(...), db: Session = Depends(get_db)):
         "beneficios": beneficios
     }
 
+async def competencias_beneficios(db: AsyncSession, cpf: str, matricula: str, empresa: str) -> List[Dict[str, int]]:
+    """Competências (ano, mes) em tb_beneficio_detalhes para a chave (cpf, matricula, empresa)."""
+    params: Dict[str, Any] = {
+        "cpf": str(cpf).strip(),
+        "matricula": str(matricula).strip(),
+        "empresa": str(empresa).strip(),
+    }
+
+    sql_lista_comp = text("""
+        SELECT DISTINCT
+            regexp_replace(TRIM(competencia), '[^0-9]', '', 'g') AS comp
+        FROM public.tb_beneficio_detalhes
+        WHERE TRIM(cpf::text)       = TRIM(:cpf)
+        AND TRIM(matricula::text) = TRIM(:matricula)
+        AND TRIM(cliente::text)   = TRIM(:empresa)
+        AND competencia IS NOT NULL
+        AND regexp_replace(TRIM(competencia), '[^0-9]', '', 'g') ~ '^[0-9]{6}$'
+        ORDER BY comp DESC
+    """)
+
+    rows = (await db.execute(sql_lista_comp, params)).fetchall()
+    return [
+        {"ano": int(r[0][:4]), "mes": int(r[0][4:6])}
+        for r in rows if r[0] and len(r[0]) == 6
+    ]
+
 @router.post("/documents/beneficios/competencias")
 async def listar_competencias_beneficios(
     request: Request,
@@ -1527,7 +1510,7 @@ async def listar_competencias_beneficios(
     matricula: Optional[str] = Query(None),
     empresa: Optional[str] = Query(None),
     cliente: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Lista competências (ano, mes) disponíveis em tb_beneficio_eventos
@@ -1552,30 +1535,7 @@ async def listar_competencias_beneficios(
             detail="Informe 'cpf', 'matricula' e 'empresa' (na querystring ou no body JSON)."
         )
 
-    params: Dict[str, Any] = {
-        "cpf": str(cpf).strip(),
-        "matricula": str(matricula).strip(),
-        "empresa": str(empresa).strip(),
-    }
-
-    sql_lista_comp = text("""
-        SELECT DISTINCT
-            regexp_replace(TRIM(competencia), '[^0-9]', '', 'g') AS comp
-        FROM public.tb_beneficio_detalhes
-        WHERE TRIM(cpf::text)       = TRIM(:cpf)
-        AND TRIM(matricula::text) = TRIM(:matricula)
-        AND TRIM(cliente::text)   = TRIM(:empresa)
-        AND competencia IS NOT NULL
-        AND regexp_replace(TRIM(competencia), '[^0-9]', '', 'g') ~ '^[0-9]{6}$'
-        ORDER BY comp DESC
-    """)
-
-    rows = db.execute(sql_lista_comp, params).fetchall()
-    competencias = [
-        {"ano": int(r[0][:4]), "mes": int(r[0][4:6])}
-        for r in rows if r[0] and len(r[0]) == 6
-    ]
-
+    competencias = await competencias_beneficios(db, cpf, matricula, empresa)
     if not competencias:
         raise HTTPException(status_code=404, detail="Nenhuma competência encontrada para os parâmetros informados.")
 
@@ -1584,7 +1544,7 @@ async def listar_competencias_beneficios(
 @router.post("/documents/beneficios/montar")
 def montar_beneficio(
     payload: dict = Body(...),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     def as_str(v) -> str:
         if v is None:
@@ -0,0 +1,43 @@
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.orm import Session
+
+from app.database.connection import estado_pool, get_db
+from app.database.metricas import metricas_pool
+from app.database.replica import estado_replica
+from app.utils.auth import exigir_interno
+from app.utils.ged_cache_disco import get_cache_documentos
+from app.utils.ged_client import get_ged_client
+
+
+router = APIRouter()
+
+
+@router.get("/metrics/ged")
+def metricas_ged(request: Request, db: Session = Depends(get_db)) -> Dict[str, Any]:
+    """Estado do circuit breaker e contadores do cliente GED deste processo. Restrito a pessoas internas."""
+    exigir_interno(request, db)
+    ged = get_ged_client()
+    cache = get_cache_documentos()
+    return {
+        "circuit_breaker": ged.disjuntor.snapshot(),
+        "chamadas": dict(ged.estatisticas),
+        "em_voo": len(ged._em_voo),
+        "timeouts": ged.timeouts,
+        "cache_downloads": cache.snapshot() if cache is not None else None,
+    }
+
+
+@router.get("/metrics/db")
+def metricas_db(request: Request, db: Session = Depends(get_db)) -> Dict[str, Any]:
+    """
+    Ocupação do pool de conexões e histogramas de espera/posse por rota deste
+    processo. Restrito a pessoas internas.
+    """
+    exigir_interno(request, db)
+    return {
+        "pool": estado_pool(),
+        "replica": estado_replica(),
+        **metricas_pool.snapshot(),
+    }
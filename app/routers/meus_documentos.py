@@ -0,0 +1,121 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+from fastapi import APIRouter, Body, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from app.database.connection import get_db, rota_da_request
+from app.database.replica import sessao_leitura, sessao_leitura_async
+from app.routers.document import tipos_documentos_da_pessoa
+from app.routers.ged import (
+    SearchDocumentosRequest,
+    buscar_search_documentos,
+    buscar_search_documentos_ano,
+    competencias_beneficios,
+    competencias_holerite,
+)
+from app.routers.user import dados_pessoa
+from app.schemas.document import TipoDocumentoResponse
+from app.utils.auth import pessoa_autenticada
+
+
+router = APIRouter()
+
+
+class MeusDocumentosRequest(BaseModel):
+    # vínculo a consultar; sem eles usa a matrícula/cliente do cadastro da pessoa
+    matricula: Optional[str] = None
+    empresa: Optional[str] = None
+    # payloads das buscas no GED em modo listagem (mesmo formato das rotas de origem)
+    recibos: Optional[SearchDocumentosRequest] = None
+    informetrct: Optional[Dict[str, Any]] = None
+
+
+def _em_sessao(rota: str, fn: Callable[..., Any], *args: Any) -> Any:
+    """
+    Roda `fn(db, *args)` numa sessão de leitura própria (réplica, se houver;
+    cada seção corre em paralelo no threadpool).
+    """
+    db = sessao_leitura(rota)
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+
+async def _em_sessao_async(rota: str, fn: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+    """Como _em_sessao, para as consultas que já usam o engine assíncrono."""
+    db = await sessao_leitura_async(rota)
+    try:
+        return await fn(db, *args)
+    finally:
+        await db.close()
+
+
+async def _secao(coro: Awaitable[Any]) -> Dict[str, Any]:
+    """Resultado de uma fonte; falhas viram status/erro da seção sem derrubar as demais."""
+    try:
+        return {"status": 200, "dados": jsonable_encoder(await coro)}
+    except HTTPException as e:
+        return {"status": e.status_code, "erro": e.detail}
+    except httpx.HTTPError:
+        return {"status": 502, "erro": "Falha ao consultar o GED"}
+    except Exception:
+        return {"status": 500, "erro": "Erro interno ao carregar esta seção"}
+
+
+async def _pendente(status: int, erro: str) -> Any:
+    raise HTTPException(status_code=status, detail=erro)
+
+
+@router.post("/user/me/documentos")
+async def meus_documentos(
+    request: Request,
+    payload: Optional[MeusDocumentosRequest] = Body(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Tela inicial em uma chamada: dados da /user/me, tipos de documento,
+    competências de holerite e benefícios e, se os payloads vierem, a listagem
+    de meses de recibos e de anos de informes/TRCT.
+    A pessoa é resolvida uma vez; as consultas ao banco (cada uma em sua
+    sessão) e ao GED rodam em paralelo. Cada seção traz `status` e `dados`
+    ou `erro`, então uma fonte fora do ar não impede as outras.
+    """
+    payload = payload or MeusDocumentosRequest()
+    pessoa = await run_in_threadpool(pessoa_autenticada, request, db)
+
+    cpf = str(pessoa.cpf or "").strip()
+    matricula = (payload.matricula or str(getattr(pessoa, "matricula", "") or "")).strip()
+    empresa = (payload.empresa or str(getattr(pessoa, "cliente", "") or "")).strip()
+    rota = rota_da_request(request)
+
+    def _tipos(sessao: Session):
+        return [TipoDocumentoResponse.model_validate(t) for t in tipos_documentos_da_pessoa(sessao, pessoa)]
+
+    secoes: Dict[str, Awaitable[Any]] = {
+        "pessoa": run_in_threadpool(_em_sessao, rota, dados_pessoa, pessoa),
+        "tipos_documentos": run_in_threadpool(_em_sessao, rota, _tipos),
+    }
+
+    if cpf and matricula and empresa:
+        secoes["holerite_competencias"] = _em_sessao_async(rota, competencias_holerite, cpf, matricula, empresa)
+        secoes["beneficios_competencias"] = _em_sessao_async(rota, competencias_beneficios, cpf, matricula, empresa)
+    else:
+        faltando = "Informe 'matricula' e 'empresa' (ou complete o cadastro da pessoa)."
+        secoes["holerite_competencias"] = _pendente(422, faltando)
+        secoes["beneficios_competencias"] = _pendente(422, faltando)
+
+    if payload.recibos is not None:
+        listagem = payload.recibos.model_copy(update={"anomes": None, "anomes_in": None})
+        secoes["recibos"] = buscar_search_documentos(listagem, db)
+    if payload.informetrct is not None:
+        listagem_anos = {k: v for k, v in payload.informetrct.items() if k not in ("anomes", "anomes_in")}
+        secoes["informetrct"] = buscar_search_documentos_ano(listagem_anos, db)
+
+    resultados = await asyncio.gather(*(_secao(c) for c in secoes.values()))
+    return dict(zip(secoes.keys(), resultados))
@@ -12,6 +12,7 @@ from sqlalchemy import text
 from sqlalchemy.orm import Session
 
 from app.database.connection import get_db
+from app.database.replica import get_read_db
 from app.models.blacklist import TokenBlacklist
 from app.models.token_interno import TokenInterno
 from app.models.user import Pessoa, Usuario
@@ -25,6 +26,7 @@ from app.schemas.user import (
     InternalValidateTokenRequest,
     InternalValidateTokenResponse,
 )
+from app.utils.auth import pessoa_autenticada
 from app.utils.email_sender import send_email_smtp
 from app.utils.jwt_handler import criar_token, decode_token, verificar_token
 from app.utils.password import gerar_hash_senha, verificar_senha
@@ -319,27 +321,13 @@ def login_user(
         raise HTTPException(status_code=500, detail="Erro interno no login")
 
 @router.get("/user/me", response_model=PessoaResponse)
-def get_me(request: Request, db: Session = Depends(get_db)):
-    access_token = request.cookies.get("access_token")
-    if not access_token:
-        raise HTTPException(status_code=401, detail="Token de autenticação ausente")
-
-    payload = verificar_token(access_token)
-    if not payload:
-        raise HTTPException(status_code=401, detail="Token inválido")
-
-    jti = payload.get("jti")
-    if not jti:
-        raise HTTPException(status_code=401, detail="Token sem identificador único (jti)")
-
-    if db.query(TokenBlacklist).filter_by(jti=jti).first():
-        raise HTTPException(status_code=401, detail="Token expirado ou inválido")
-
-    pessoa_id = payload.get("id")
-    pessoa = db.query(Pessoa).filter(Pessoa.id == pessoa_id).first()
-    if not pessoa:
-        raise HTTPException(status_code=401, detail="Pessoa não encontrada")
+def get_me(request: Request, db: Session = Depends(get_db), leitura: Session = Depends(get_read_db)):
+    # token/blacklist no primário (logout precisa valer na hora); o resto na réplica
+    pessoa = pessoa_autenticada(request, db)
+    return dados_pessoa(leitura, pessoa)
 
+def dados_pessoa(db: Session, pessoa: Pessoa) -> PessoaResponse:
+    """Monta o payload da /user/me (usuário + vínculos cliente/matrícula) para uma pessoa já autenticada."""
     usuario = db.query(Usuario).filter(Usuario.id_pessoa == pessoa.id).first()
     if not usuario:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
@@ -349,24 +337,23 @@ def get_me(request: Request, db: Session = Depends(get_db)):
 
     sql_dados = text("""
         SELECT DISTINCT
-               TRIM(c.cliente::text)   AS id,
+               c.cliente_norm          AS id,
                TRIM(c.cliente_nome)    AS nome,
-               TRIM(c.matricula::text) AS mat
+               c.matricula_norm        AS mat
         FROM tb_holerite_cabecalhos c
         WHERE
             (
-                regexp_replace(TRIM(c.cpf::text), '[^0-9]', '', 'g')
-                = regexp_replace(TRIM(:cpf), '[^0-9]', '', 'g')
+                c.cpf_digitos = :cpf
                 OR
-                (TRIM(:matricula) <> '' AND TRIM(c.matricula::text) = TRIM(:matricula))
+                (:matricula <> '' AND c.matricula_norm = :matricula)
             )
-          AND c.matricula IS NOT NULL AND TRIM(c.matricula::text) <> ''
-          AND c.cliente  IS NOT NULL AND TRIM(c.cliente::text)  <> ''
+          AND c.matricula_norm <> ''
+          AND c.cliente_norm   <> ''
           AND c.cliente_nome IS NOT NULL AND TRIM(c.cliente_nome) <> ''   -- <<< NOVO
         ORDER BY nome, id, mat
     """)
 
-    rows = db.execute(sql_dados, {"cpf": cpf_pessoa, "matricula": mat_pessoa}).fetchall()
+    rows = db.execute(sql_dados, {"cpf": _norm_digits(cpf_pessoa), "matricula": mat_pessoa}).fetchall()
 
     # Só entra em dados se tiver nome válido
     dados: List[DadoItem] = [
@@ -396,7 +383,7 @@ def get_me(request: Request, db: Session = Depends(get_db)):
                 sql_nome_cliente = text("""
                     SELECT TRIM(c.cliente_nome) AS nome
                     FROM tb_holerite_cabecalhos c
-                    WHERE TRIM(c.cliente::text) = TRIM(:cliente)
+                    WHERE c.cliente_norm = TRIM(:cliente)
                       AND c.cliente_nome IS NOT NULL
                       AND TRIM(c.cliente_nome) <> ''
                     ORDER BY c.cliente_nome
@@ -0,0 +1,43 @@
+from fastapi import HTTPException, Request
+from sqlalchemy.orm import Session
+
+from app.models.blacklist import TokenBlacklist
+from app.models.user import Pessoa
+from app.utils.jwt_handler import verificar_token
+
+
+def pessoa_autenticada(request: Request, db: Session) -> Pessoa:
+    """Resolve a Pessoa do cookie access_token (mesmas checagens da /user/me)."""
+    access_token = request.cookies.get("access_token")
+    if not access_token:
+        raise HTTPException(status_code=401, detail="Token de autenticação ausente")
+
+    payload = verificar_token(access_token)
+    if not payload:
+        raise HTTPException(status_code=401, detail="Token inválido")
+
+    jti = payload.get("jti")
+    if not jti:
+        raise HTTPException(status_code=401, detail="Token sem identificador único (jti)")
+
+    if db.query(TokenBlacklist).filter_by(jti=jti).first():
+        raise HTTPException(status_code=401, detail="Token expirado ou inválido")
+
+    pessoa = db.query(Pessoa).filter(Pessoa.id == payload.get("id")).first()
+    if not pessoa:
+        raise HTTPException(status_code=401, detail="Pessoa não encontrada")
+    return pessoa
+
+
+def exigir_interno(request: Request, db: Session) -> Pessoa:
+    pessoa = pessoa_autenticada(request, db)
+    if not bool(getattr(pessoa, "interno", False)):
+        raise HTTPException(status_code=403, detail="Pessoa não é interna")
+    return pessoa
+
+
+def exigir_rh(request: Request, db: Session) -> Pessoa:
+    pessoa = pessoa_autenticada(request, db)
+    if not (bool(getattr(pessoa, "rh", False)) or bool(getattr(pessoa, "interno", False))):
+        raise HTTPException(status_code=403, detail="Pessoa não é do RH")
+    return pessoa
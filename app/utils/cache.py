@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    Cache em memória com expiração por item (TTL) e limite de itens (LRU).
+    Seguro para uso entre threads.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._dados: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._dados.get(key)
+            if item is None:
+                return default
+            expira_em, valor = item
+            if time.monotonic() >= expira_em:
+                del self._dados[key]
+                return default
+            self._dados.move_to_end(key)
+            return valor
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expira_em = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._dados[key] = (expira_em, value)
+            self._dados.move_to_end(key)
+            while len(self._dados) > self.maxsize:
+                self._dados.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._dados.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._dados.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._dados)
+
+
+class SWRCache:
+    """
+    Cache assíncrono stale-while-revalidate com limite de itens (LRU).
+    - até `ttl` segundos o valor é fresco e devolvido direto;
+    - entre `ttl` e `ttl + stale_ttl` o valor antigo é devolvido na hora e
+      recarregado em background (uma recarga por chave);
+    - depois disso a chamada espera o carregamento.
+    Feito para uso dentro do event loop (sem locks entre threads).
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0, stale_ttl: float = 3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._dados: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._recargas: Dict[Hashable, asyncio.Task] = {}
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        should_cache: Callable[[Any], bool] = bool,
+    ) -> Any:
+        """
+        Retorna o valor da chave, chamando `loader()` quando não há valor
+        utilizável. Só guarda resultados aceitos por `should_cache` (por
+        padrão, não vazios); exceções do loader não são guardadas.
+        """
+        item = self._dados.get(key)
+        if item is not None:
+            carregado_em, valor = item
+            idade = time.monotonic() - carregado_em
+            if idade < self.ttl:
+                self._dados.move_to_end(key)
+                return valor
+            if idade < self.ttl + self.stale_ttl:
+                self._dados.move_to_end(key)
+                self._revalida(key, loader, should_cache)
+                return valor
+            del self._dados[key]
+
+        valor = await loader()
+        if should_cache(valor):
+            self._guarda(key, valor)
+        return valor
+
+    def _guarda(self, key: Hashable, value: Any) -> None:
+        self._dados[key] = (time.monotonic(), value)
+        self._dados.move_to_end(key)
+        while len(self._dados) > self.maxsize:
+            self._dados.popitem(last=False)
+
+    def _revalida(self, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                  should_cache: Callable[[Any], bool]) -> None:
+        if key in self._recargas:
+            return
+
+        async def _recarrega() -> None:
+            try:
+                valor = await loader()
+                if should_cache(valor) and key in self._dados:
+                    self._guarda(key, valor)
+            except Exception:
+                # mantém o valor antigo; a próxima leitura vencida tenta de novo
+                pass
+            finally:
+                self._recargas.pop(key, None)
+
+        self._recargas[key] = asyncio.get_running_loop().create_task(_recarrega())
+
+    def invalidate(self, key: Hashable) -> None:
+        self._dados.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        for key in [k for k in self._dados if predicate(k)]:
+            del self._dados[key]
+
+    def clear(self) -> None:
+        self._dados.clear()
+
+    def __len__(self) -> int:
+        return len(self._dados)
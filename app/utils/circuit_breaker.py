@@ -0,0 +1,108 @@
+import math
+import time
+from typing import Any, Dict
+
+from fastapi import HTTPException
+
+
+class ServicoIndisponivel(HTTPException):
+    """503 devolvido na hora enquanto o circuito está aberto."""
+
+    def __init__(self, servico: str, retry_after: float):
+        super().__init__(
+            status_code=503,
+            detail=f"{servico} indisponível no momento. Tente novamente em instantes.",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+
+class CircuitBreaker:
+    """
+    Disjuntor para um serviço externo.
+    - fechado: chamadas passam; `limite_falhas` falhas seguidas abrem o circuito;
+    - aberto: chamadas falham na hora com 503 por `tempo_aberto` segundos;
+    - meio_aberto: uma única chamada de sonda passa; sucesso fecha o circuito,
+      falha abre de novo.
+    Usado dentro do event loop (sem locks entre threads).
+    """
+
+    FECHADO = "fechado"
+    ABERTO = "aberto"
+    MEIO_ABERTO = "meio_aberto"
+
+    def __init__(self, servico: str, limite_falhas: int = 5, tempo_aberto: float = 30.0):
+        self.servico = servico
+        self.limite_falhas = max(1, limite_falhas)
+        self.tempo_aberto = tempo_aberto
+        self.estado = self.FECHADO
+        self.falhas_seguidas = 0
+        self._aberto_em = 0.0
+        self._mudou_em = time.monotonic()
+        self._sondando = False
+        self.contadores: Dict[str, int] = {"sucessos": 0, "falhas": 0, "rejeitadas": 0, "aberturas": 0}
+
+    def _muda(self, estado: str) -> None:
+        self.estado = estado
+        self._mudou_em = time.monotonic()
+        if estado == self.ABERTO:
+            self._aberto_em = self._mudou_em
+            self.contadores["aberturas"] += 1
+
+    def _rejeita(self, retry_after: float) -> None:
+        self.contadores["rejeitadas"] += 1
+        raise ServicoIndisponivel(self.servico, retry_after)
+
+    def antes(self) -> bool:
+        """
+        Chamado antes de cada chamada ao serviço. Levanta ServicoIndisponivel
+        se o circuito não deixa passar; retorna True se a chamada é a sonda.
+        """
+        if self.estado == self.ABERTO:
+            restante = self._aberto_em + self.tempo_aberto - time.monotonic()
+            if restante > 0:
+                self._rejeita(restante)
+            self._muda(self.MEIO_ABERTO)
+        if self.estado == self.MEIO_ABERTO:
+            if self._sondando:
+                self._rejeita(1)
+            self._sondando = True
+            return True
+        return False
+
+    def sucesso(self, sonda: bool = False) -> None:
+        self.contadores["sucessos"] += 1
+        self.falhas_seguidas = 0
+        if sonda:
+            self._sondando = False
+        if self.estado != self.FECHADO:
+            self._muda(self.FECHADO)
+
+    def falha(self, sonda: bool = False) -> None:
+        self.contadores["falhas"] += 1
+        self.falhas_seguidas += 1
+        if sonda:
+            self._sondando = False
+        if self.estado == self.MEIO_ABERTO or (
+            self.estado == self.FECHADO and self.falhas_seguidas >= self.limite_falhas
+        ):
+            self._muda(self.ABERTO)
+
+    def liberar(self, sonda: bool = False) -> None:
+        """Chamada interrompida sem resultado (ex.: cancelada): só libera a sonda."""
+        if sonda:
+            self._sondando = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        agora = time.monotonic()
+        dados: Dict[str, Any] = {
+            "servico": self.servico,
+            "estado": self.estado,
+            "falhas_seguidas": self.falhas_seguidas,
+            "limite_falhas": self.limite_falhas,
+            "tempo_aberto": self.tempo_aberto,
+            "segundos_no_estado": round(agora - self._mudou_em, 3),
+            **self.contadores,
+        }
+        if self.estado == self.ABERTO:
+            dados["proxima_sonda_em"] = round(max(0.0, self._aberto_em + self.tempo_aberto - agora), 3)
+        return dados
@@ -0,0 +1,238 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, NamedTuple, Optional
+
+from app.utils.ged_download import DownloadGed
+from config.settings import settings
+
+
+class EntradaCache(NamedTuple):
+    sha256: str
+    tamanho: int
+    mimetype: str
+    extensao: str
+    caminho: str
+
+
+class CacheDocumentos:
+    """
+    Cache em disco dos documentos baixados do GED, endereçado por conteúdo.
+    - objetos/<sha256[:2]>/<sha256>: o arquivo (um por conteúdo, mesmo que
+      mais de um documento aponte para ele);
+    - chaves/<id_tipo>_<id_documento>.json: sha256, tamanho e mimetype;
+    - tmp/: downloads em andamento, renomeados atomicamente ao terminar.
+    Remoção LRU pelo total de bytes dos objetos; a ordem de uso sobrevive ao
+    restart pelo mtime dos arquivos de chave. Documento publicado no GED não
+    muda, então não há expiração por tempo.
+    """
+
+    def __init__(self, diretorio: str, max_bytes: int):
+        self.diretorio = diretorio
+        self.max_bytes = max_bytes
+        self._objetos = os.path.join(diretorio, "objetos")
+        self._chaves = os.path.join(diretorio, "chaves")
+        self._tmp = os.path.join(diretorio, "tmp")
+        for d in (self._objetos, self._chaves, self._tmp):
+            os.makedirs(d, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._indice: "OrderedDict[str, EntradaCache]" = OrderedDict()
+        self._refs: Dict[str, int] = {}
+        self.total_bytes = 0
+        self.estatisticas: Dict[str, int] = {"hits": 0, "misses": 0, "gravados": 0, "removidos": 0}
+        self._carregar()
+
+    # -------------------------------------------------
+    # Caminhos
+    # -------------------------------------------------
+    @staticmethod
+    def _chave(id_tipo: int, id_documento: int) -> str:
+        return f"{int(id_tipo)}_{int(id_documento)}"
+
+    def _caminho_objeto(self, sha256: str) -> str:
+        return os.path.join(self._objetos, sha256[:2], sha256)
+
+    def _caminho_chave(self, chave: str) -> str:
+        return os.path.join(self._chaves, f"{chave}.json")
+
+    # -------------------------------------------------
+    # Índice
+    # -------------------------------------------------
+    def _carregar(self) -> None:
+        """Reconstrói o índice a partir dos arquivos de chave, do menos para o mais usado."""
+        limite_tmp = time.time() - 3600
+        for nome in os.listdir(self._tmp):
+            caminho = os.path.join(self._tmp, nome)
+            try:
+                if os.path.getmtime(caminho) < limite_tmp:
+                    os.unlink(caminho)
+            except OSError:
+                pass
+
+        encontrados = []
+        for nome in os.listdir(self._chaves):
+            if not nome.endswith(".json"):
+                continue
+            caminho = os.path.join(self._chaves, nome)
+            try:
+                with open(caminho, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                encontrados.append((os.path.getmtime(caminho), nome[:-5], meta))
+            except (OSError, ValueError):
+                continue
+
+        with self._lock:
+            for _, chave, meta in sorted(encontrados, key=lambda x: x[0]):
+                objeto = self._caminho_objeto(meta["sha256"])
+                if not os.path.isfile(objeto):
+                    continue
+                self._adiciona_locked(chave, EntradaCache(
+                    meta["sha256"], int(meta["tamanho"]), meta["mimetype"], meta.get("extensao", ""), objeto,
+                ))
+            self._remove_excesso_locked()
+
+    def _adiciona_locked(self, chave: str, entrada: EntradaCache) -> None:
+        anterior = self._indice.pop(chave, None)
+        if anterior is not None:
+            self._solta_locked(anterior)
+        self._indice[chave] = entrada
+        if self._refs.get(entrada.sha256, 0) == 0:
+            self.total_bytes += entrada.tamanho
+        self._refs[entrada.sha256] = self._refs.get(entrada.sha256, 0) + 1
+
+    def _solta_locked(self, entrada: EntradaCache) -> None:
+        refs = self._refs.get(entrada.sha256, 0) - 1
+        if refs > 0:
+            self._refs[entrada.sha256] = refs
+            return
+        self._refs.pop(entrada.sha256, None)
+        self.total_bytes -= entrada.tamanho
+        try:
+            os.unlink(entrada.caminho)
+        except OSError:
+            pass
+
+    def _remove_locked(self, chave: str) -> None:
+        entrada = self._indice.pop(chave, None)
+        if entrada is None:
+            return
+        self._solta_locked(entrada)
+        self.estatisticas["removidos"] += 1
+        try:
+            os.unlink(self._caminho_chave(chave))
+        except OSError:
+            pass
+
+    def _remove_excesso_locked(self) -> None:
+        while self.total_bytes > self.max_bytes and self._indice:
+            self._remove_locked(next(iter(self._indice)))
+
+    # -------------------------------------------------
+    # API
+    # -------------------------------------------------
+    def obter(self, id_tipo: int, id_documento: int) -> Optional[EntradaCache]:
+        chave = self._chave(id_tipo, id_documento)
+        with self._lock:
+            entrada = self._indice.get(chave)
+            # outro worker pode ter removido o objeto do disco
+            if entrada is not None and not os.path.isfile(entrada.caminho):
+                self._indice.pop(chave, None)
+                self._refs.pop(entrada.sha256, None)
+                self.total_bytes -= entrada.tamanho
+                entrada = None
+            if entrada is None:
+                self.estatisticas["misses"] += 1
+                return None
+            self._indice.move_to_end(chave)
+            self.estatisticas["hits"] += 1
+        try:
+            os.utime(self._caminho_chave(chave))
+        except OSError:
+            pass
+        return entrada
+
+    def invalidar(self, id_tipo: int, id_documento: int) -> None:
+        with self._lock:
+            self._remove_locked(self._chave(id_tipo, id_documento))
+
+    async def gravando(self, id_tipo: int, id_documento: int, doc: DownloadGed) -> AsyncIterator[bytes]:
+        """
+        Repassa os chunks do download e grava uma cópia em tmp/. Só entra no
+        cache se o download terminar inteiro (cliente que desconecta no meio
+        descarta o arquivo parcial).
+        """
+        fd, tmp = tempfile.mkstemp(dir=self._tmp)
+        sha = hashlib.sha256()
+        tamanho = 0
+        completo = False
+        try:
+            with os.fdopen(fd, "wb") as f:
+                async for chunk in doc.chunks():
+                    f.write(chunk)
+                    sha.update(chunk)
+                    tamanho += len(chunk)
+                    yield chunk
+            completo = tamanho > 0 and (doc.tamanho is None or doc.tamanho == tamanho)
+        finally:
+            if completo:
+                self._registra(self._chave(id_tipo, id_documento), tmp, sha.hexdigest(), tamanho, doc)
+            else:
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+
+    def _registra(self, chave: str, tmp: str, sha256: str, tamanho: int, doc: DownloadGed) -> None:
+        if tamanho > self.max_bytes:
+            os.unlink(tmp)
+            return
+        objeto = self._caminho_objeto(sha256)
+        os.makedirs(os.path.dirname(objeto), exist_ok=True)
+        if os.path.isfile(objeto):
+            os.unlink(tmp)
+        else:
+            os.replace(tmp, objeto)
+
+        meta = {"sha256": sha256, "tamanho": tamanho, "mimetype": doc.mimetype, "extensao": doc.extensao}
+        fd, tmp_meta = tempfile.mkstemp(dir=self._tmp)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta, self._caminho_chave(chave))
+
+        with self._lock:
+            self._adiciona_locked(chave, EntradaCache(sha256, tamanho, doc.mimetype, doc.extensao, objeto))
+            self.estatisticas["gravados"] += 1
+            self._remove_excesso_locked()
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "diretorio": self.diretorio,
+                "documentos": len(self._indice),
+                "objetos": len(self._refs),
+                "total_bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                **self.estatisticas,
+            }
+
+
+_cache: Optional[CacheDocumentos] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache_documentos() -> Optional[CacheDocumentos]:
+    """Cache de downloads do processo; None se GED_DOWNLOAD_CACHE_MAX_BYTES for 0."""
+    global _cache
+    if settings.GED_DOWNLOAD_CACHE_MAX_BYTES <= 0:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                diretorio = settings.GED_DOWNLOAD_CACHE_DIR or os.path.join(tempfile.gettempdir(), "ged_documentos")
+                _cache = CacheDocumentos(diretorio, settings.GED_DOWNLOAD_CACHE_MAX_BYTES)
+    return _cache
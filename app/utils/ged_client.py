@@ -0,0 +1,495 @@
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+import httpx
+from fastapi import HTTPException
+
+from app.utils.cache import TTLCache
+from app.utils.circuit_breaker import CircuitBreaker
+from config.settings import settings
+
+
+FORM_CONTENT_TYPE = "application/x-www-form-urlencoded; charset=ISO-8859-1"
+
+# consultas somente-leitura que podem ser compartilhadas entre requisições idênticas
+ROTAS_COALESCIDAS = frozenset({"/documents/search", "/documents/filter"})
+# rotas que alteram documentos: descartam as respostas de busca em cache
+ROTAS_QUE_ALTERAM = frozenset({"/documents/uploadbase64", "/documents/delete"})
+
+
+def encode_form(data: Any) -> bytes:
+    """
+    Codifica dict ou lista de tuplas como x-www-form-urlencoded, preservando a
+    ordem e repetindo chaves com lista (cp[]). Valores None são omitidos, como
+    o requests fazia.
+    """
+    if isinstance(data, (bytes, str)):
+        return data.encode("utf-8") if isinstance(data, str) else data
+    itens = data.items() if isinstance(data, dict) else data
+    pares: List[Tuple[str, Any]] = []
+    for chave, valor in itens:
+        valores = valor if isinstance(valor, (list, tuple)) else [valor]
+        pares.extend((chave, v) for v in valores if v is not None)
+    return urlencode(pares).encode("utf-8")
+
+
+def timeouts_from_settings() -> Dict[str, float]:
+    """Orçamento de tempo (segundos) por rota do GED; "padrao" vale para as demais."""
+    busca = settings.GED_TIMEOUT_SEARCH_SECONDS
+    templates = settings.GED_TIMEOUT_TEMPLATES_SECONDS
+    return {
+        "padrao": settings.GED_TIMEOUT_DEFAULT_SECONDS,
+        "/login": settings.GED_TIMEOUT_LOGIN_SECONDS,
+        "/templates/getall": templates,
+        "/templates/getfields": templates,
+        "/documents/search": busca,
+        "/documents/filter": busca,
+        "/documents/download": settings.GED_TIMEOUT_DOWNLOAD_SECONDS,
+        "/documents/uploadbase64": settings.GED_TIMEOUT_UPLOAD_SECONDS,
+        "/documents/delete": settings.GED_TIMEOUT_DELETE_SECONDS,
+    }
+
+
+class _TransporteComDisjuntor(httpx.AsyncBaseTransport):
+    """
+    Transporte httpx que passa toda chamada ao GED (login inclusive) pelo
+    circuit breaker: erro de rede/timeout e 5xx contam como falha.
+    """
+
+    def __init__(self, disjuntor: CircuitBreaker, **kwargs: Any):
+        self.disjuntor = disjuntor
+        self._interno = httpx.AsyncHTTPTransport(**kwargs)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        sonda = self.disjuntor.antes()
+        try:
+            response = await self._interno.handle_async_request(request)
+        except httpx.TransportError:
+            self.disjuntor.falha(sonda)
+            raise
+        except BaseException:
+            self.disjuntor.liberar(sonda)
+            raise
+        if response.status_code >= 500:
+            self.disjuntor.falha(sonda)
+        else:
+            self.disjuntor.sucesso(sonda)
+        return response
+
+    async def aclose(self) -> None:
+        await self._interno.aclose()
+
+
+class GedClient:
+    """
+    Cliente assíncrono do GED compartilhado pelo processo.
+    - Um único httpx.AsyncClient com pool de conexões (keep-alive); requisições
+      em espera não ocupam threads do servidor.
+    - authorization_key em cache com TTL, renovada em background antes de expirar.
+    - 401 do GED invalida a chave, refaz o login e repete a requisição uma vez.
+    - Buscas idênticas em andamento (/documents/search e /documents/filter)
+      compartilham uma única chamada ao GED (singleflight); respostas 200
+      ficam alguns segundos em cache para os pedidos que chegam logo depois.
+      Upload e exclusão descartam esse cache, e quem precisa do estado atual
+      (ex.: buscar para apagar) passa `cache=False`.
+    - Cada rota tem um orçamento de tempo (`timeouts`) e todas as chamadas
+      passam por um circuit breaker: com o GED fora, as requisições recebem
+      503 na hora em vez de esperar o timeout.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        conta: str,
+        usuario: str,
+        senha: str,
+        auth_ttl: int = 1800,
+        refresh_margin: int = 120,
+        pool_maxsize: int = 20,
+        search_workers: int = 4,
+        coalesce_ttl: float = 5,
+        timeouts: Optional[Dict[str, float]] = None,
+        connect_timeout: float = 5,
+        disjuntor: Optional[CircuitBreaker] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.conta = conta
+        self.usuario = usuario
+        self.senha = senha
+        self.auth_ttl = auth_ttl
+        self.refresh_margin = refresh_margin
+        self.search_workers = max(1, search_workers)
+
+        self.timeouts: Dict[str, float] = {"padrao": 30.0, **(timeouts or {})}
+        self.connect_timeout = connect_timeout
+        self.disjuntor = disjuntor or CircuitBreaker("GED")
+
+        self.http = httpx.AsyncClient(
+            timeout=None,
+            transport=_TransporteComDisjuntor(
+                self.disjuntor,
+                limits=httpx.Limits(
+                    max_connections=pool_maxsize,
+                    max_keepalive_connections=pool_maxsize,
+                ),
+            ),
+        )
+
+        self._lock = asyncio.Lock()
+        self._auth_key: Optional[str] = None
+        self._expira_em = 0.0
+        self._usada_desde_login = False
+        self._renovacao: Optional[asyncio.Task] = None
+
+        self.coalesce_ttl = coalesce_ttl
+        self._em_voo: Dict[Tuple[str, bytes], asyncio.Task] = {}
+        self._resultados = TTLCache(maxsize=1024, ttl=coalesce_ttl)
+        # muda a cada upload/exclusão: resposta de busca iniciada antes não entra no cache
+        self._geracao = 0
+        self.estatisticas: Dict[str, int] = {"upstream": 0, "coalescidas": 0, "cache": 0}
+
+    @classmethod
+    def from_settings(cls) -> "GedClient":
+        return cls(
+            base_url=settings.GED_BASE_URL,
+            conta=settings.GED_CONTA,
+            usuario=settings.GED_USUARIO,
+            senha=settings.GED_SENHA,
+            auth_ttl=settings.GED_AUTH_TTL_SECONDS,
+            refresh_margin=settings.GED_AUTH_REFRESH_MARGIN_SECONDS,
+            pool_maxsize=settings.GED_POOL_MAXSIZE,
+            search_workers=settings.GED_SEARCH_MAX_WORKERS,
+            coalesce_ttl=settings.GED_COALESCE_CACHE_SECONDS,
+            timeouts=timeouts_from_settings(),
+            connect_timeout=settings.GED_TIMEOUT_CONNECT_SECONDS,
+            disjuntor=CircuitBreaker(
+                "GED",
+                limite_falhas=settings.GED_BREAKER_FAILURES,
+                tempo_aberto=settings.GED_BREAKER_OPEN_SECONDS,
+            ),
+        )
+
+    @staticmethod
+    def _agora() -> float:
+        return asyncio.get_running_loop().time()
+
+    def orcamento(self, path: str, timeout: Optional[float] = None) -> float:
+        """Timeout explícito de quem chama ou o orçamento configurado para a rota."""
+        return timeout if timeout is not None else self.timeouts.get(path, self.timeouts["padrao"])
+
+    def _httpx_timeout(self, segundos: float) -> httpx.Timeout:
+        return httpx.Timeout(segundos, connect=min(segundos, self.connect_timeout))
+
+    # -------------------------------------------------
+    # Autenticação
+    # -------------------------------------------------
+    async def authorization_key(self, invalida: Optional[str] = None) -> str:
+        """
+        Retorna a authorization_key em cache, fazendo login se ela não existir
+        ou tiver expirado. Se `invalida` for a chave atual (ex.: recebeu 401),
+        força um novo login; se outra requisição já renovou, reaproveita a nova.
+        """
+        async with self._lock:
+            valida = self._auth_key is not None and self._agora() < self._expira_em
+            if not valida or (invalida is not None and invalida == self._auth_key):
+                await self._login_locked()
+            self._usada_desde_login = True
+            return self._auth_key
+
+    async def _login_locked(self) -> None:
+        payload = {
+            "conta": self.conta,
+            "usuario": self.usuario,
+            "senha": self.senha,
+            "id_interface": "CLIENT_WEB",
+        }
+        response = await self.http.post(
+            f"{self.base_url}/login",
+            content=encode_form(payload),
+            headers={"Content-Type": FORM_CONTENT_TYPE},
+            timeout=self._httpx_timeout(self.orcamento("/login")),
+        )
+        if response.status_code != 200:
+            raise HTTPException(status_code=500, detail="Erro ao autenticar no GED")
+        data = response.json()
+        if data.get("error"):
+            raise HTTPException(status_code=401, detail="Login falhou")
+
+        self._auth_key = data["authorization_key"]
+        self._expira_em = self._agora() + self.auth_ttl
+        self._usada_desde_login = False
+        self._agenda_renovacao()
+
+    def _agenda_renovacao(self) -> None:
+        atual = asyncio.current_task()
+        if self._renovacao is not None and self._renovacao is not atual:
+            self._renovacao.cancel()
+        atraso = max(self.auth_ttl - self.refresh_margin, 1)
+        self._renovacao = asyncio.get_running_loop().create_task(self._renova_em_background(atraso))
+
+    async def _renova_em_background(self, atraso: float) -> None:
+        await asyncio.sleep(atraso)
+        async with self._lock:
+            # processo ocioso: deixa expirar e o próximo uso faz login sob demanda
+            if not self._usada_desde_login:
+                self._renovacao = None
+                return
+            try:
+                await self._login_locked()
+            except Exception:
+                # mantém a chave atual até expirar; a próxima requisição tenta de novo
+                self._renovacao = None
+
+    # -------------------------------------------------
+    # HTTP
+    # -------------------------------------------------
+    async def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        data: Any = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        cache: bool = True,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """
+        `cache=False` ignora o cache de respostas e o singleflight: a busca vai
+        ao GED e reflete o estado atual.
+        """
+        content = encode_form(data) if data is not None else kwargs.pop("content", None)
+        if (cache and method == "POST" and path in ROTAS_COALESCIDAS
+                and data is not None and not headers and not kwargs):
+            return await self._coalescido(path, content, timeout)
+        try:
+            return await self._envia(method, path, content, data is not None, headers, timeout, **kwargs)
+        finally:
+            if path in ROTAS_QUE_ALTERAM:
+                self.limpar_resultados()
+
+    def limpar_resultados(self) -> None:
+        """Descarta as respostas de busca em cache (documentos mudaram no GED)."""
+        self._geracao += 1
+        self._resultados.clear()
+        # buscas já em voo podem ter lido o estado anterior: as próximas não entram nelas
+        self._em_voo.clear()
+
+    async def _envia(
+        self,
+        method: str,
+        path: str,
+        content: Optional[bytes],
+        form: bool,
+        headers: Optional[Dict[str, str]],
+        timeout: Optional[float],
+        **kwargs: Any,
+    ) -> httpx.Response:
+        url = f"{self.base_url}{path}"
+        orcamento = self.orcamento(path, timeout)
+        response: Optional[httpx.Response] = None
+        self.estatisticas["upstream"] += 1
+        # o orçamento cobre a chamada inteira: login, 401 + nova tentativa e leitura do corpo
+        try:
+            async with asyncio.timeout(orcamento):
+                auth_key = await self.authorization_key()
+                for _ in range(2):
+                    req_headers = {"Authorization": auth_key}
+                    if form:
+                        req_headers["Content-Type"] = FORM_CONTENT_TYPE
+                    if headers:
+                        req_headers.update(headers)
+                    response = await self.http.request(
+                        method, url, content=content, headers=req_headers,
+                        timeout=self._httpx_timeout(orcamento), **kwargs
+                    )
+                    if response.status_code != 401:
+                        break
+                    auth_key = await self.authorization_key(invalida=auth_key)
+        except TimeoutError:
+            # o cancelamento pelo orçamento não passa como falha pelo transporte
+            self.disjuntor.falha()
+            raise httpx.TimeoutException(f"GED não respondeu em {orcamento:g}s ({path})") from None
+        return response
+
+    async def _coalescido(self, path: str, content: bytes, timeout: Optional[float]) -> httpx.Response:
+        """
+        Singleflight: a primeira requisição de uma chave (rota + corpo) chama o
+        GED; as idênticas que chegam enquanto ela está em voo aguardam a mesma
+        resposta. A resposta já está lida, então cada `.json()` gera objetos
+        novos e quem chama pode alterá-los à vontade.
+        """
+        chave = (path, content)
+        if self.coalesce_ttl > 0:
+            response = self._resultados.get(chave)
+            if response is not None:
+                self.estatisticas["cache"] += 1
+                return response
+
+        tarefa = self._em_voo.get(chave)
+        if tarefa is None:
+            tarefa = asyncio.get_running_loop().create_task(
+                self._envia("POST", path, content, True, None, timeout)
+            )
+            self._em_voo[chave] = tarefa
+            geracao = self._geracao
+            tarefa.add_done_callback(lambda t: self._fim_do_voo(chave, t, geracao))
+        else:
+            self.estatisticas["coalescidas"] += 1
+        # shield: se quem disparou desistir, os demais continuam esperando a mesma chamada
+        return await asyncio.shield(tarefa)
+
+    def _fim_do_voo(self, chave: Tuple[str, bytes], tarefa: asyncio.Task, geracao: int) -> None:
+        if self._em_voo.get(chave) is tarefa:
+            self._em_voo.pop(chave)
+        if tarefa.cancelled() or tarefa.exception() is not None:
+            return
+        response = tarefa.result()
+        if self.coalesce_ttl > 0 and response.status_code == 200 and geracao == self._geracao:
+            self._resultados.set(chave, response)
+
+    async def open_stream(
+        self,
+        method: str,
+        path: str,
+        *,
+        data: Any = None,
+        timeout: Optional[float] = None,
+    ) -> httpx.Response:
+        """
+        Abre a requisição em modo streaming (corpo não lido). Quem chama é
+        responsável por `await response.aclose()`.
+        """
+        url = f"{self.base_url}{path}"
+        content = encode_form(data) if data is not None else None
+        # em streaming o orçamento vale por operação (conexão e cada leitura)
+        tempo = self._httpx_timeout(self.orcamento(path, timeout))
+        auth_key = await self.authorization_key()
+        self.estatisticas["upstream"] += 1
+        for tentativa in range(2):
+            req_headers = {"Authorization": auth_key}
+            if data is not None:
+                req_headers["Content-Type"] = FORM_CONTENT_TYPE
+            req = self.http.build_request(method, url, content=content, headers=req_headers, timeout=tempo)
+            response = await self.http.send(req, stream=True)
+            if response.status_code != 401 or tentativa:
+                return response
+            await response.aclose()
+            auth_key = await self.authorization_key(invalida=auth_key)
+        return response
+
+    async def post_corpo(
+        self,
+        path: str,
+        corpo: Callable[[], AsyncIterator[bytes]],
+        tamanho: int,
+        *,
+        timeout: Optional[float] = None,
+    ) -> httpx.Response:
+        """
+        POST x-www-form-urlencoded com o corpo gerado em partes, sem montá-lo
+        em memória. `corpo()` precisa devolver um iterador novo a cada chamada
+        (é chamado de novo se o GED responder 401); `tamanho` vai no
+        Content-Length, para não depender de corpo chunked no GED.
+        """
+        url = f"{self.base_url}{path}"
+        tempo = self._httpx_timeout(self.orcamento(path, timeout))
+        auth_key = await self.authorization_key()
+        self.estatisticas["upstream"] += 1
+        for tentativa in range(2):
+            req_headers = {
+                "Authorization": auth_key,
+                "Content-Type": FORM_CONTENT_TYPE,
+                "Content-Length": str(tamanho),
+            }
+            try:
+                response = await self.http.post(url, content=corpo(), headers=req_headers, timeout=tempo)
+            finally:
+                if path in ROTAS_QUE_ALTERAM:
+                    self.limpar_resultados()
+            if response.status_code != 401 or tentativa:
+                return response
+            auth_key = await self.authorization_key(invalida=auth_key)
+        return response
+
+    async def get(self, path: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", path, **kwargs)
+
+    async def search_pages(
+        self,
+        form: List[Tuple[str, str]],
+        max_pages: Optional[int] = 10,
+        timeout: Optional[float] = None,
+        cache: bool = True,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Percorre as páginas de /documents/search (`form` sem o campo `pagina`).
+        A página 1 vem primeiro e revela `totalpaginas`; as demais são buscadas
+        em paralelo (até `search_workers` por vez) e entregues conforme chegam,
+        fora de ordem. `max_pages=None` percorre todas as páginas; `cache=False`
+        repassa a `request`.
+        """
+        async def _pagina(numero: int) -> Dict[str, Any]:
+            r = await self.post("/documents/search", data=form + [("pagina", str(numero))], timeout=timeout, cache=cache)
+            r.raise_for_status()
+            return r.json() or {}
+
+        primeira = await _pagina(1)
+        yield primeira
+
+        try:
+            total_paginas = int((primeira.get("variables") or {}).get("totalpaginas", 1))
+        except Exception:
+            total_paginas = 1
+        ultima = total_paginas if max_pages is None else min(total_paginas, max_pages)
+        if ultima < 2:
+            return
+
+        limite = asyncio.Semaphore(self.search_workers)
+
+        async def _pagina_limitada(numero: int) -> Dict[str, Any]:
+            async with limite:
+                return await _pagina(numero)
+
+        tarefas = [asyncio.ensure_future(_pagina_limitada(n)) for n in range(2, ultima + 1)]
+        try:
+            for proxima in asyncio.as_completed(tarefas):
+                yield await proxima
+        finally:
+            for tarefa in tarefas:
+                tarefa.cancel()
+
+    async def aclose(self) -> None:
+        if self._renovacao is not None:
+            self._renovacao.cancel()
+            self._renovacao = None
+        await self.http.aclose()
+
+
+_client: Optional[GedClient] = None
+_client_lock = threading.Lock()
+
+
+def get_ged_client() -> GedClient:
+    """
+    Instância única do GedClient por processo (criada no primeiro uso). Rotas
+    síncronas chamam daqui a partir do threadpool, daí o lock.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GedClient.from_settings()
+    return _client
+
+
+async def fechar_ged_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,428 @@
+import base64
+import binascii
+import json
+import re
+import tempfile
+from typing import IO, Any, AsyncIterator, Dict, Optional, Tuple
+
+import httpx
+from fastapi import HTTPException
+
+from app.utils.ged_client import get_ged_client
+from config.settings import settings
+
+
+# bytes que não fazem parte do alfabeto base64 (quebras de linha, aspas, "\" de "\/")
+_NAO_BASE64 = re.compile(rb"[^A-Za-z0-9+/=]")
+_PREFIXO_DATA_URI = re.compile(rb"^\s*\"?data:[^,]*;base64,", re.IGNORECASE)
+
+_ASSINATURAS = (
+    (b"%PDF", "application/pdf", ".pdf"),
+    (b"\x89PNG", "image/png", ".png"),
+    (b"\xff\xd8\xff", "image/jpeg", ".jpg"),
+    (b"GIF8", "image/gif", ".gif"),
+    (b"II*\x00", "image/tiff", ".tif"),
+    (b"MM\x00*", "image/tiff", ".tif"),
+    (b"PK\x03\x04", "application/zip", ".zip"),
+)
+
+# chaves onde o GED costuma devolver o arquivo quando responde em JSON
+_CHAVES_CONTEUDO = ("documento", "base64", "arquivo", "conteudo", "content", "file", "data")
+
+# string do JSON maior que isto é o arquivo: passa a ser lida em partes
+LIMITE_CAMPO_JSON = 4096
+# valores que não são string (números, objetos) nunca são o arquivo
+LIMITE_VALOR_JSON = 64 * 1024
+# escapes de string JSON: só "\/" vira um caractere do base64; os demais são descartados
+_ESCAPE_JSON = re.compile(rb"\\(u[0-9A-Fa-f]{4}|[^u])")
+_ESPACOS = b" \t\r\n"
+TAMANHO_BLOCO = 64 * 1024
+
+
+def identifica_mimetype(inicio: bytes, padrao: str = "application/octet-stream") -> tuple[str, str]:
+    """(mimetype, extensão) pelos primeiros bytes do arquivo."""
+    for assinatura, mimetype, extensao in _ASSINATURAS:
+        if inicio.startswith(assinatura):
+            return mimetype, extensao
+    return padrao, ""
+
+
+class DecodificadorBase64:
+    """
+    Decodifica base64 em partes, guardando o resto que não fecha um bloco de 4.
+    Os primeiros bytes ficam retidos até dar para reconhecer (e remover) o
+    prefixo data URI, mesmo que ele chegue dividido em vários chunks.
+    """
+
+    _CABECA = 256
+
+    def __init__(self):
+        self._resto = b""
+        self._cabeca: Optional[bytes] = b""
+
+    def decode(self, chunk: bytes) -> bytes:
+        if self._cabeca is not None:
+            self._cabeca += chunk
+            if len(self._cabeca) < self._CABECA:
+                return b""
+            chunk, self._cabeca = _PREFIXO_DATA_URI.sub(b"", self._cabeca, count=1), None
+        dados = self._resto + _NAO_BASE64.sub(b"", chunk)
+        corte = len(dados) - len(dados) % 4
+        self._resto = dados[corte:]
+        return base64.b64decode(dados[:corte]) if corte else b""
+
+    def final(self) -> bytes:
+        saida = b""
+        if self._cabeca is not None:
+            cabeca, self._cabeca = self._cabeca, None
+            saida = self.decode(_PREFIXO_DATA_URI.sub(b"", cabeca, count=1))
+        if self._resto:
+            saida += base64.b64decode(self._resto + b"=" * (-len(self._resto) % 4))
+            self._resto = b""
+        return saida
+
+
+class DownloadGed:
+    """
+    Documento do GED aberto em streaming. `chunks()` entrega os bytes já
+    decodificados. Binário direto é repassado conforme chega (tamanho pelo
+    Content-Length do GED, se houver); base64 (texto ou JSON) é decodificado
+    para um arquivo temporário, e então o tamanho exato é conhecido.
+    """
+
+    def __init__(self, response: httpx.Response, mimetype: str, extensao: str,
+                 tamanho: Optional[int], corpo: AsyncIterator[bytes], arquivo: Optional[IO[bytes]] = None):
+        self._response = response
+        self.mimetype = mimetype
+        self.extensao = extensao
+        self.tamanho = tamanho
+        self._corpo = corpo
+        self._arquivo = arquivo
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        try:
+            async for chunk in self._corpo:
+                if chunk:
+                    yield chunk
+        finally:
+            await self.aclose()
+
+    async def aclose(self) -> None:
+        if self._arquivo is not None:
+            self._arquivo.close()
+        await self._response.aclose()
+
+
+def _conteudo_do_json(data: dict) -> Optional[str]:
+    for chave in _CHAVES_CONTEUDO:
+        valor = data.get(chave)
+        if isinstance(valor, str) and valor:
+            return valor
+    # fallback: maior string do JSON
+    strings = [v for v in data.values() if isinstance(v, str)]
+    return max(strings, key=len) if strings else None
+
+
+class _LeitorJson:
+    """
+    Lê o objeto JSON do download sobre o stream, campo a campo, só até achar
+    a string do arquivo; nada do corpo é juntado além do campo atual.
+    """
+
+    def __init__(self, inicio: bytes, partes: AsyncIterator[bytes]):
+        self._buf = inicio
+        self._pos = 0
+        self._partes = partes
+
+    async def _mais(self) -> bool:
+        try:
+            chunk = await self._partes.__anext__()
+        except StopAsyncIteration:
+            return False
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    async def _proximo(self) -> int:
+        """Próximo byte que não é espaço, sem consumi-lo."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _ESPACOS:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not await self._mais():
+                raise ValueError("JSON incompleto")
+
+    async def _espera(self, caractere: bytes) -> None:
+        if await self._proximo() != caractere[0]:
+            raise ValueError(f"esperado {caractere!r}")
+        self._pos += 1
+
+    async def _string(self, limite: int) -> Tuple[bytes, bool]:
+        """
+        Bytes (ainda escapados) da string aberta e se ela fechou. Para ao
+        passar de `limite`, deixando o restante no stream.
+        """
+        lido = bytearray()
+        barras = 0
+        while True:
+            if self._pos >= len(self._buf) and not await self._mais():
+                raise ValueError("JSON incompleto")
+            fim, barras = _fim_da_string(self._buf, self._pos, barras)
+            if fim >= 0:
+                lido += self._buf[self._pos:fim]
+                self._pos = fim + 1
+                return bytes(lido), True
+            lido += self._buf[self._pos:]
+            self._pos = len(self._buf)
+            if len(lido) > limite:
+                return bytes(lido), False
+
+    async def _valor(self) -> Any:
+        """Valor que não é string (número, bool, null, objeto, lista)."""
+        inicio = bytearray()
+        profundidade = 0
+        em_string = False
+        barras = 0
+        while True:
+            if self._pos >= len(self._buf) and not await self._mais():
+                raise ValueError("JSON incompleto")
+            c = self._buf[self._pos]
+            if em_string:
+                if c == 0x22 and barras % 2 == 0:
+                    em_string = False
+                barras = barras + 1 if c == 0x5C else 0
+            elif c == 0x22:
+                em_string = True
+            elif c in b"[{":
+                profundidade += 1
+            elif c in b"]}" and profundidade:
+                profundidade -= 1
+            elif c in b",}" and not profundidade:
+                return json.loads(bytes(inicio))
+            inicio.append(c)
+            self._pos += 1
+            if len(inicio) > LIMITE_VALOR_JSON:
+                raise ValueError("valor JSON grande demais")
+
+    async def ate_o_conteudo(self) -> Tuple[Dict[str, Any], Optional[AsyncIterator[bytes]]]:
+        """
+        Campos lidos antes do arquivo e, se o arquivo estiver numa string
+        grande (> LIMITE_CAMPO_JSON), um iterador com o conteúdo dela ainda
+        escapado. Sem string grande, o objeto é lido inteiro e o arquivo, se
+        houver, está nos campos.
+        """
+        campos: Dict[str, Any] = {}
+        await self._espera(b"{")
+        if await self._proximo() == ord("}"):
+            return campos, None
+        while True:
+            await self._espera(b'"')
+            chave_bruta, _ = await self._string(LIMITE_CAMPO_JSON)
+            chave = json.loads(b'"' + chave_bruta + b'"')
+            await self._espera(b":")
+            if await self._proximo() == ord('"'):
+                self._pos += 1
+                valor, fechou = await self._string(LIMITE_CAMPO_JSON)
+                if not fechou:
+                    return campos, self._resto_da_string(valor)
+                campos[chave] = json.loads(b'"' + valor + b'"')
+            else:
+                campos[chave] = await self._valor()
+            if await self._proximo() == ord("}"):
+                return campos, None
+            await self._espera(b",")
+
+    async def _resto_da_string(self, lido: bytes) -> AsyncIterator[bytes]:
+        yield lido
+        barras = len(lido) - len(lido.rstrip(b"\\"))
+        while True:
+            if self._pos >= len(self._buf) and not await self._mais():
+                raise ValueError("JSON incompleto")
+            fim, barras = _fim_da_string(self._buf, self._pos, barras)
+            if fim >= 0:
+                yield self._buf[self._pos:fim]
+                self._pos = fim + 1
+                return
+            yield self._buf[self._pos:]
+            self._pos = len(self._buf)
+
+
+def _fim_da_string(dados: bytes, inicio: int, barras: int) -> Tuple[int, int]:
+    """
+    Posição da aspa que fecha a string em dados[inicio:] (-1 se não fecha) e
+    quantas contrabarras seguidas há no fim do trecho, para o próximo chunk.
+    `barras`: contrabarras seguidas no fim do chunk anterior.
+    """
+    i = inicio
+    while True:
+        aspa = dados.find(b'"', i)
+        if aspa < 0:
+            sem_barras = dados.rstrip(b"\\")
+            finais = len(dados) - max(len(sem_barras), inicio)
+            return -1, (barras + finais) if finais == len(dados) - inicio else finais
+        j = aspa
+        while j > inicio and dados[j - 1] == 0x5C:
+            j -= 1
+        seguidas = aspa - j + (barras if j == inicio else 0)
+        if seguidas % 2 == 0:
+            return aspa, 0
+        i = aspa + 1
+
+
+class _Desescapa:
+    """Remove os escapes JSON do base64 em partes ("\\/" vira "/", os demais somem)."""
+
+    def __init__(self):
+        self._resto = b""
+
+    def __call__(self, dados: bytes) -> bytes:
+        dados = self._resto + dados
+        saida = []
+        pos = 0
+        for m in _ESCAPE_JSON.finditer(dados):
+            saida.append(dados[pos:m.start()])
+            if m.group(1) == b"/":
+                saida.append(b"/")
+            pos = m.end()
+        cauda = dados[pos:]
+        corte = cauda.find(b"\\")
+        if corte >= 0:
+            # escape incompleto no fim do chunk: completa com o próximo
+            cauda, self._resto = cauda[:corte], cauda[corte:]
+            if len(self._resto) > 6:
+                raise ValueError("escape JSON inválido")
+        else:
+            self._resto = b""
+        saida.append(cauda)
+        return b"".join(saida)
+
+
+async def _decodifica_em_arquivo(pedacos: AsyncIterator[bytes]) -> Tuple[IO[bytes], int, bytes]:
+    """
+    Decodifica o base64 para um arquivo temporário (em memória até
+    GED_DOWNLOAD_SPOOL_MEMORY_BYTES, depois em disco). Devolve o arquivo no
+    início, o tamanho e os primeiros bytes (para identificar o tipo).
+    """
+    arquivo = tempfile.SpooledTemporaryFile(max_size=settings.GED_DOWNLOAD_SPOOL_MEMORY_BYTES)
+    decodificador = DecodificadorBase64()
+    tamanho = 0
+    inicio = b""
+
+    def _grava(dados: bytes) -> None:
+        nonlocal tamanho, inicio
+        if dados:
+            arquivo.write(dados)
+            tamanho += len(dados)
+            if len(inicio) < 16:
+                inicio = (inicio + dados)[:16]
+
+    try:
+        async for pedaco in pedacos:
+            _grava(decodificador.decode(pedaco))
+        _grava(decodificador.final())
+    except (binascii.Error, ValueError):
+        arquivo.close()
+        raise HTTPException(status_code=502, detail="Conteúdo base64 inválido vindo do GED")
+    except BaseException:
+        arquivo.close()
+        raise
+    arquivo.seek(0)
+    return arquivo, tamanho, inicio
+
+
+async def _blocos(arquivo: IO[bytes]) -> AsyncIterator[bytes]:
+    while True:
+        bloco = arquivo.read(TAMANHO_BLOCO)
+        if not bloco:
+            return
+        yield bloco
+
+
+async def _desescapado(pedacos: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    desescapa = _Desescapa()
+    async for pedaco in pedacos:
+        yield desescapa(pedaco)
+
+
+async def _um(dados: bytes) -> AsyncIterator[bytes]:
+    yield dados
+
+
+async def _texto(cabeca: bytes, partes: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    yield cabeca
+    async for chunk in partes:
+        yield chunk
+
+
+async def abrir_download(id_tipo: int, id_documento: int, timeout: Optional[float] = None) -> DownloadGed:
+    """
+    Abre /documents/download em streaming e identifica o formato da resposta
+    pelos primeiros bytes:
+      - binário (PDF/imagem): repassado como está;
+      - texto base64 (com ou sem data URI): decodificado em partes;
+      - JSON: lido campo a campo até a string do arquivo, que é decodificada
+        em partes (o corpo nunca é montado inteiro).
+    O base64 decodificado vai para um arquivo temporário antes de ser
+    repassado, para que a resposta tenha Content-Length; a memória fica em
+    poucos chunks mais GED_DOWNLOAD_SPOOL_MEMORY_BYTES.
+    """
+    response = await get_ged_client().open_stream(
+        "POST",
+        "/documents/download",
+        data={"id_tipo": id_tipo, "id_documento": id_documento},
+        timeout=timeout,
+    )
+    try:
+        if response.status_code != 200:
+            await response.aread()
+            raise HTTPException(status_code=response.status_code,
+                                detail=f"Erro {response.status_code}: {response.text}")
+
+        partes = response.aiter_bytes()
+        cabeca = b""
+        async for chunk in partes:
+            cabeca += chunk
+            if len(cabeca) >= 64:
+                break
+
+        inicio = cabeca.lstrip()
+        mimetype_upstream = (response.headers.get("content-type") or "").split(";")[0].strip()
+
+        # --- binário direto ---
+        mimetype, extensao = identifica_mimetype(inicio, padrao="")
+        if mimetype:
+            tamanho = None
+            if "content-encoding" not in response.headers and response.headers.get("content-length"):
+                tamanho = int(response.headers["content-length"])
+            return DownloadGed(response, mimetype, extensao, tamanho, _texto(cabeca, partes))
+
+        # --- JSON: o base64 está dentro de um campo ---
+        if inicio.startswith(b"{"):
+            try:
+                campos, conteudo = await _LeitorJson(inicio, partes).ate_o_conteudo()
+            except ValueError:
+                raise HTTPException(status_code=502, detail="Resposta inválida do GED no download")
+            if campos.get("error"):
+                raise HTTPException(status_code=404, detail=f"GED: {campos.get('message', 'documento não encontrado')}")
+            if conteudo is None:
+                pequeno = _conteudo_do_json(campos)
+                if not pequeno:
+                    raise HTTPException(status_code=502, detail="GED não retornou o conteúdo do documento")
+                conteudo = _um(pequeno.encode("latin-1", "ignore"))
+            else:
+                conteudo = _desescapado(conteudo)
+            padrao = campos.get("mimetype") or "application/pdf"
+        # --- texto base64 ---
+        else:
+            conteudo = _texto(cabeca, partes)
+            padrao = mimetype_upstream if mimetype_upstream.startswith(("application/pdf", "image/")) else "application/pdf"
+
+        arquivo, tamanho, primeiros = await _decodifica_em_arquivo(conteudo)
+        # o GED já foi lido inteiro: devolve a conexão ao pool antes de repassar
+        await response.aclose()
+        mimetype, extensao = identifica_mimetype(primeiros, padrao=padrao)
+        return DownloadGed(response, mimetype, extensao, tamanho, _blocos(arquivo), arquivo)
+    except BaseException:
+        await response.aclose()
+        raise
@@ -0,0 +1,129 @@
+import unicodedata
+from typing import Any, Dict, List, Optional
+
+import httpx
+from fastapi import HTTPException
+
+from app.utils.cache import TTLCache
+from app.utils.ged_client import get_ged_client
+from config.settings import settings
+
+
+def normaliza_nome_campo(s: str) -> str:
+    s = s or ""
+    s = s.strip().lower().replace(" ", "").replace("-", "").replace(".", "").replace("__", "_").replace("_", "")
+    s = unicodedata.normalize("NFKD", s)
+    return "".join(ch for ch in s if not unicodedata.combining(ch))
+
+
+class TemplateGed:
+    """
+    Definição de um template do GED (/templates/getfields) com os índices
+    dos campos pré-calculados, para montar o cp[] em uma única passada.
+
+    O cp[] tem uma posição por campo do getfields, inclusive campos sem
+    `nomecampo` (como o upload e a exclusão sempre montaram). As buscas
+    sempre enviaram só os campos com nome: para elas, `para_busca()`.
+    """
+
+    def __init__(self, id_template: int | str, resposta: Dict[str, Any],
+                 campos: Optional[List[Dict[str, Any]]] = None):
+        self.id_template = id_template
+        self.resposta = resposta
+        self.campos: List[Dict[str, Any]] = campos if campos is not None else (resposta.get("fields", []) or [])
+        self.nomes: List[str] = [str(f.get("nomecampo") or "") for f in self.campos]
+        self.posicao: Dict[str, int] = {}
+        self.posicao_norm: Dict[str, int] = {}
+        for i, nome in enumerate(self.nomes):
+            if nome:
+                self.posicao.setdefault(nome, i)
+                self.posicao_norm.setdefault(normaliza_nome_campo(nome), i)
+        self._busca: Optional["TemplateGed"] = None
+
+    @property
+    def valido(self) -> bool:
+        """Resposta sem erro e com ao menos um campo nomeado (só assim vai para o cache)."""
+        return not self.resposta.get("error") and bool(self.posicao)
+
+    def para_busca(self) -> "TemplateGed":
+        """O mesmo template só com os campos que têm nome: o cp[] do /documents/search."""
+        if self._busca is None:
+            nomeados = [f for f in self.campos if f.get("nomecampo")]
+            self._busca = self if len(nomeados) == len(self.campos) else TemplateGed(
+                self.id_template, self.resposta, nomeados
+            )
+        return self._busca
+
+    def cp_vazio(self) -> List[str]:
+        return ["" for _ in self.nomes]
+
+    def indice(self, nome: str) -> Optional[int]:
+        return self.posicao.get(nome)
+
+    def indice_norm(self, nome: str) -> Optional[int]:
+        return self.posicao_norm.get(normaliza_nome_campo(nome))
+
+    def nomes_txt(self) -> str:
+        nomes = [n for n in self.nomes if n]
+        return ", ".join(nomes) if nomes else "(vazio)"
+
+
+_CHAVE_GETALL = "__getall__"
+
+_templates_cache = TTLCache(maxsize=512, ttl=settings.GED_TEMPLATE_CACHE_TTL_SECONDS)
+
+
+def _chave(id_template: int | str) -> str:
+    return str(id_template).strip()
+
+
+async def obter_template(id_template: int | str, forcar: bool = False) -> TemplateGed:
+    """Retorna a definição do template, buscando no GED só quando não há cache válido."""
+    chave = _chave(id_template)
+    if not forcar:
+        tpl = _templates_cache.get(chave)
+        if tpl is not None:
+            return tpl
+
+    try:
+        response = await get_ged_client().post(
+            "/templates/getfields",
+            data={"id_template": chave},
+        )
+    except httpx.HTTPError:
+        raise HTTPException(status_code=500, detail="Erro ao buscar campos do template")
+    if response.status_code != 200:
+        raise HTTPException(status_code=500, detail="Erro ao buscar campos do template")
+
+    tpl = TemplateGed(id_template, response.json() or {})
+    # resposta com erro ou sem campos não fica em cache: a próxima chamada tenta de novo
+    if tpl.valido:
+        _templates_cache.set(chave, tpl)
+    return tpl
+
+
+async def listar_templates_ged(forcar: bool = False) -> List[Dict[str, Any]]:
+    """Lista de /templates/getall, com o mesmo TTL das definições."""
+    if not forcar:
+        templates = _templates_cache.get(_CHAVE_GETALL)
+        if templates is not None:
+            return templates
+
+    response = await get_ged_client().get("/templates/getall")
+    if response.status_code != 200:
+        raise HTTPException(status_code=response.status_code, detail="Erro ao buscar templates")
+    data = response.json()
+    if data.get("error"):
+        raise HTTPException(status_code=400, detail="Erro na resposta da API GED")
+
+    templates = data.get("templates", [])
+    _templates_cache.set(_CHAVE_GETALL, templates)
+    return templates
+
+
+def invalidar_templates(id_template: int | str | None = None) -> None:
+    """Remove do cache um template específico ou, sem argumento, todos (inclusive o getall)."""
+    if id_template is None:
+        _templates_cache.clear()
+        return
+    _templates_cache.invalidate(_chave(id_template))
@@ -0,0 +1,83 @@
+import base64
+import tempfile
+from typing import IO, Any, AsyncIterator, List, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+
+from app.utils.ged_client import encode_form
+from config.settings import settings
+
+
+# múltiplo de 3: cada bloco vira base64 sem padding no meio do arquivo
+TAMANHO_BLOCO = 3 * 64 * 1024
+
+
+def _base64_urlencoded(bloco: bytes) -> bytes:
+    """base64 do bloco já escapado para x-www-form-urlencoded (+, / e = são os únicos a escapar)."""
+    return (
+        base64.b64encode(bloco)
+        .replace(b"+", b"%2B")
+        .replace(b"/", b"%2F")
+        .replace(b"=", b"%3D")
+    )
+
+
+class CorpoUploadGed:
+    """
+    Corpo x-www-form-urlencoded do /documents/uploadbase64 montado em
+    streaming a partir do arquivo recebido (UploadFile, em spool no disco):
+    os campos do form vão antes e depois, e o campo `documento` é o base64
+    do arquivo. O tamanho do base64 escapado depende do conteúdo (+, / e =
+    viram três bytes), então `medir()` codifica o arquivo uma única vez para
+    um arquivo temporário, contando os bytes, e `partes()` só relê esse
+    arquivo (de novo a cada chamada, se o GED responder 401).
+    """
+
+    def __init__(self, arquivo: UploadFile, antes: List[Tuple[str, Any]], depois: List[Tuple[str, Any]]):
+        self.arquivo = arquivo
+        self._antes = encode_form(antes + [("documento", "")])
+        self._depois = b"&" + encode_form(depois) if depois else b""
+        self._codificado: Optional[IO[bytes]] = None
+        self.tamanho = 0
+
+    async def medir(self) -> int:
+        """Codifica o arquivo para o spool e devolve o Content-Length exato."""
+        self.fechar()
+        codificado = tempfile.SpooledTemporaryFile(max_size=settings.GED_UPLOAD_SPOOL_MEMORY_BYTES)
+        total = 0
+        try:
+            await self.arquivo.seek(0)
+            while True:
+                bloco = await self.arquivo.read(TAMANHO_BLOCO)
+                if not bloco:
+                    break
+                dados = _base64_urlencoded(bloco)
+                codificado.write(dados)
+                total += len(dados)
+        except BaseException:
+            codificado.close()
+            raise
+        if not total:
+            codificado.close()
+            raise HTTPException(status_code=400, detail="Arquivo vazio")
+        self._codificado = codificado
+        self.tamanho = len(self._antes) + total + len(self._depois)
+        return self.tamanho
+
+    async def partes(self) -> AsyncIterator[bytes]:
+        if self._codificado is None:
+            raise RuntimeError("CorpoUploadGed.medir() precisa ser chamado antes de partes()")
+        self._codificado.seek(0)
+        yield self._antes
+        while True:
+            bloco = self._codificado.read(TAMANHO_BLOCO)
+            if not bloco:
+                break
+            yield bloco
+        if self._depois:
+            yield self._depois
+
+    def fechar(self) -> None:
+        if self._codificado is not None:
+            self._codificado.close()
+            self._codificado = None
@@ -0,0 +1,280 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from config.settings import settings
+
+
+# linha de tb_holerite_cache_geracao que invalida todos os lotes
+GERACAO_TODOS = "*"
+
+
+class _Entrada(NamedTuple):
+    lote: str
+    tamanho: int
+    valor: Dict[str, Any]
+    geracao: int
+    criada_em: float
+
+
+def _nome_seguro(valor: Any) -> str:
+    return re.sub(r"[^0-9A-Za-z_.-]", "_", str(valor)) or "_"
+
+
+class CacheHolerites:
+    """
+    Holerites já montados, por (formato, uuid). Depois do pagamento cabeçalho,
+    rodapé e eventos de um uuid só mudam se o lote for reprocessado: LRU pelo
+    total de bytes, expiração longa (ttl) e invalidação explícita.
+    O aceite não entra aqui; é sempre consultado na hora.
+
+    Cada entrada guarda a geração do lote (tb_holerite_cache_geracao) de
+    quando foi gravada; quem lê informa a geração atual e entrada de outra
+    geração é descartada. Assim a invalidação feita num worker vale para
+    todos, mesmo com a memória separada.
+
+    Os valores são guardados já codificados para JSON (jsonable_encoder), o
+    que dá o tamanho de cada entrada e permite o nível opcional em disco,
+    compartilhado entre workers:
+      <diretorio>/<lote>/<formato>_<uuid>.json
+    O disco não tem limite próprio; invalidar por lote remove a pasta inteira.
+    """
+
+    def __init__(self, max_bytes: int, diretorio: Optional[str] = None, ttl: float = 0):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.diretorio = diretorio or None
+        if self.diretorio:
+            os.makedirs(self.diretorio, exist_ok=True)
+        self._lock = threading.Lock()
+        self._dados: "OrderedDict[Tuple[str, str], _Entrada]" = OrderedDict()
+        self.total_bytes = 0
+        self.estatisticas: Dict[str, int] = {"hits": 0, "hits_disco": 0, "misses": 0, "gravados": 0, "removidos": 0}
+
+    # -------------------------------------------------
+    # Disco
+    # -------------------------------------------------
+    def _caminho(self, formato: str, uuid: str, lote: str) -> str:
+        return os.path.join(self.diretorio, _nome_seguro(lote), f"{_nome_seguro(formato)}_{_nome_seguro(uuid)}.json")
+
+    def _le_disco(self, formato: str, uuid: str, lote: str) -> Optional[str]:
+        try:
+            with open(self._caminho(formato, uuid, lote), "r", encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _grava_disco(self, formato: str, uuid: str, lote: str, bruto: str) -> None:
+        destino = self._caminho(formato, uuid, lote)
+        try:
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(destino), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(bruto)
+            os.replace(tmp, destino)
+        except OSError:
+            pass
+
+    # -------------------------------------------------
+    # Memória
+    # -------------------------------------------------
+    def _adiciona_locked(self, chave: Tuple[str, str], entrada: _Entrada) -> None:
+        anterior = self._dados.pop(chave, None)
+        if anterior is not None:
+            self.total_bytes -= anterior.tamanho
+        if entrada.tamanho > self.max_bytes:
+            return
+        self._dados[chave] = entrada
+        self.total_bytes += entrada.tamanho
+        while self.total_bytes > self.max_bytes and self._dados:
+            _, removida = self._dados.popitem(last=False)
+            self.total_bytes -= removida.tamanho
+            self.estatisticas["removidos"] += 1
+
+    # -------------------------------------------------
+    # API
+    # -------------------------------------------------
+    def _vigente(self, geracao_entrada: int, criada_em: float, geracao: int) -> bool:
+        if geracao_entrada != geracao:
+            return False
+        return not self.ttl or time.time() - criada_em < self.ttl
+
+    def obter(self, formato: str, uuid: str, lote: Any, geracao: int = 0) -> Optional[Dict[str, Any]]:
+        chave = (formato, str(uuid))
+        with self._lock:
+            entrada = self._dados.get(chave)
+            if entrada is not None:
+                if self._vigente(entrada.geracao, entrada.criada_em, geracao):
+                    self._dados.move_to_end(chave)
+                    self.estatisticas["hits"] += 1
+                    return entrada.valor
+                del self._dados[chave]
+                self.total_bytes -= entrada.tamanho
+                self.estatisticas["removidos"] += 1
+
+        bruto = self._le_disco(formato, str(uuid), str(lote)) if self.diretorio else None
+        valor = None
+        if bruto is not None:
+            try:
+                envelope = json.loads(bruto)
+                if self._vigente(envelope["geracao"], envelope["criada_em"], geracao):
+                    valor = envelope["valor"]
+            except (ValueError, TypeError, KeyError):
+                valor = None
+        if valor is None:
+            with self._lock:
+                self.estatisticas["misses"] += 1
+            return None
+        with self._lock:
+            self._adiciona_locked(chave, _Entrada(str(lote), len(bruto), valor, geracao, envelope["criada_em"]))
+            self.estatisticas["hits_disco"] += 1
+        return valor
+
+    def gravar(self, formato: str, uuid: str, lote: Any, valor: Dict[str, Any], geracao: int = 0) -> Dict[str, Any]:
+        """Guarda e devolve o valor codificado (o mesmo que um hit devolveria)."""
+        codificado = jsonable_encoder(valor)
+        criada_em = time.time()
+        bruto = json.dumps(
+            {"geracao": geracao, "criada_em": criada_em, "valor": codificado},
+            ensure_ascii=False, separators=(",", ":"),
+        )
+        with self._lock:
+            self._adiciona_locked((formato, str(uuid)), _Entrada(str(lote), len(bruto), codificado, geracao, criada_em))
+            self.estatisticas["gravados"] += 1
+        if self.diretorio:
+            self._grava_disco(formato, str(uuid), str(lote), bruto)
+        return codificado
+
+    def invalidar(self, uuids: Iterable[str]) -> int:
+        alvo = {str(u) for u in uuids}
+        with self._lock:
+            chaves = [k for k in self._dados if k[1] in alvo]
+            for k in chaves:
+                self.total_bytes -= self._dados.pop(k).tamanho
+        if self.diretorio and alvo:
+            for lote in os.listdir(self.diretorio):
+                pasta = os.path.join(self.diretorio, lote)
+                if not os.path.isdir(pasta):
+                    continue
+                for nome in os.listdir(pasta):
+                    if nome.endswith(".json") and nome[:-5].split("_", 1)[-1] in alvo:
+                        try:
+                            os.unlink(os.path.join(pasta, nome))
+                        except OSError:
+                            pass
+        return len(chaves)
+
+    def invalidar_lote(self, lote: Any) -> int:
+        lote = str(lote)
+        with self._lock:
+            chaves = [k for k, e in self._dados.items() if e.lote == lote]
+            for k in chaves:
+                self.total_bytes -= self._dados.pop(k).tamanho
+        if self.diretorio:
+            shutil.rmtree(os.path.join(self.diretorio, _nome_seguro(lote)), ignore_errors=True)
+        return len(chaves)
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._dados.clear()
+            self.total_bytes = 0
+        if self.diretorio:
+            for nome in os.listdir(self.diretorio):
+                shutil.rmtree(os.path.join(self.diretorio, nome), ignore_errors=True)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "itens": len(self._dados),
+                "total_bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_s": self.ttl,
+                "diretorio": self.diretorio,
+                **self.estatisticas,
+            }
+
+
+_cache: Optional[CacheHolerites] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache_holerites() -> CacheHolerites:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = CacheHolerites(
+                    settings.HOLERITE_CACHE_MAX_BYTES,
+                    settings.HOLERITE_CACHE_DIR,
+                    settings.HOLERITE_CACHE_TTL_SECONDS,
+                )
+    return _cache
+
+
+def geracoes_dos_lotes(db: Session, lotes: Iterable[Any]) -> Dict[str, int]:
+    """
+    Geração atual de cada lote: a do próprio lote somada à de GERACAO_TODOS
+    (as duas só crescem, então a soma muda sempre que uma delas muda).
+    Lote sem linha tem geração 0.
+    """
+    lotes = sorted({str(l) for l in lotes})
+    if not lotes:
+        return {}
+    linhas = db.execute(
+        text("""
+            SELECT lote, geracao
+              FROM tb_holerite_cache_geracao
+             WHERE lote = ANY(CAST(:lotes AS text[]))
+        """),
+        {"lotes": lotes + [GERACAO_TODOS]},
+    ).fetchall()
+    atuais = {str(l): int(g) for l, g in linhas}
+    todos = atuais.get(GERACAO_TODOS, 0)
+    return {l: atuais.get(l, 0) + todos for l in lotes}
+
+
+def avancar_geracao(db: Session, lotes: Iterable[Any]) -> None:
+    """Invalida os lotes (ou GERACAO_TODOS) para todos os workers. Faz commit."""
+    lotes = sorted({str(l) for l in lotes})
+    if not lotes:
+        return
+    db.execute(
+        text("""
+            INSERT INTO tb_holerite_cache_geracao AS g (lote, geracao)
+            SELECT unnest(CAST(:lotes AS text[])), 1
+            ON CONFLICT (lote) DO UPDATE
+               SET geracao = g.geracao + 1,
+                   atualizado_em = now()
+        """),
+        {"lotes": lotes},
+    )
+    db.commit()
+
+
+def separar_hits(
+    formato: str, chaves: Iterable[Tuple[str, Any]], geracoes: Dict[str, int]
+) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+    """
+    (uuid, lote) → holerites em cache por uuid e a lista de uuids que faltam
+    montar. `geracoes` vem de geracoes_dos_lotes.
+    """
+    cache = get_cache_holerites()
+    hits: Dict[str, Dict[str, Any]] = {}
+    faltando: List[str] = []
+    for uuid, lote in chaves:
+        valor = cache.obter(formato, uuid, lote, geracoes.get(str(lote), 0))
+        if valor is None:
+            faltando.append(uuid)
+        else:
+            hits[uuid] = valor
+    return hits, faltando
@@ -0,0 +1,206 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Optional, Tuple
+
+from babel.dates import format_date
+from fpdf import FPDF # type: ignore
+
+from config.settings import settings
+
+
+def pad_left(valor: str, width: int) -> str:
+    return str(valor).strip().zfill(width)
+
+def fmt_num(valor: float) -> str:
+    s = f"{valor:,.2f}"
+    s = s.replace(",", "X").replace(".", ",")
+    return s.replace("X", ".")
+
+def truncate(text: str, max_len: int) -> str:
+    text = text or ""
+    return text if len(text) <= max_len else text[: max_len - 3] + "..."
+
+def gerar_recibo(cabecalho: dict, eventos: list[dict], rodape: dict, page_number: int = 1) -> bytes:
+    cabecalho["matricula"] = pad_left(cabecalho["matricula"], 6)
+    cabecalho["cliente"]   = pad_left(cabecalho["cliente"],   5)
+    cabecalho["empresa"]   = pad_left(cabecalho["empresa"],   3)
+    cabecalho["filial"]    = pad_left(cabecalho["filial"],    3)
+
+    adm = datetime.fromisoformat(cabecalho["admissao"])
+    cabecalho["admissao"]   = format_date(adm, "dd/MM/yyyy", locale="pt_BR")
+    comp = datetime.strptime(cabecalho["competencia"], "%Y%m")
+    cabecalho["competencia"] = format_date(comp, "LLLL/yyyy", locale="pt_BR").capitalize()
+
+    empresa_nome = truncate(cabecalho.get("empresa_nome", ""), 50)
+    cliente_nome = truncate(cabecalho.get("cliente_nome", ""), 50)
+    funcionario  = truncate(cabecalho.get("nome", ""), 30)
+    funcao       = truncate(cabecalho.get("funcao_nome", ""), 16)
+
+    pdf = FPDF(format='A4', unit='mm')
+    pdf.add_page()
+    pdf.set_auto_page_break(auto=True, margin=15)
+
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(0, 6, "Recibo de Pagamento de Salário", ln=0)
+    pdf.ln(6)
+
+    pdf.set_font("Arial", '', 9)
+    pdf.cell(120, 5, f"Empresa: {cabecalho['empresa']} - {cabecalho['filial']} {empresa_nome}", ln=0)
+    pdf.cell(0,   5, f"Nº Inscrição: {cabecalho['empresa_cnpj']}", ln=1, align='R')
+    pdf.cell(120, 5, f"Cliente: {cabecalho['cliente']} {cliente_nome}",       ln=0)
+    pdf.cell(0,   5, f"Nº Inscrição: {cabecalho['cliente_cnpj']}", ln=1, align='R')
+    pdf.ln(3)
+
+    col_widths = [20, 60, 40, 30, 30]
+    headers    = ["Código", "Nome do Funcionário", "Função", "Admissão", "Competência"]
+    pdf.set_font("Arial", 'B', 9)
+    for w, h in zip(col_widths, headers):
+        pdf.cell(w, 6, h)
+    pdf.ln(6)
+
+    pdf.set_font("Arial", '', 7)
+    vals = [cabecalho["matricula"], funcionario, funcao,
+            cabecalho["admissao"], cabecalho["competencia"]]
+    for w, v in zip(col_widths, vals):
+        pdf.cell(w, 6, v)
+    pdf.ln(6)
+
+    y_sep = pdf.get_y()
+    pdf.set_draw_color(0, 0, 0)
+    pdf.set_line_width(0.2)
+    pdf.line(pdf.l_margin, y_sep, pdf.w - pdf.r_margin, y_sep)
+    pdf.ln(3)
+
+    evt_headers = ["Cód.", "Descrição", "Referência", "Vencimentos", "Descontos"]
+    pdf.set_font("Arial", 'B', 9)
+    for i, (w, h) in enumerate(zip(col_widths, evt_headers)):
+        align = 'C' if i >= 2 else ''
+        pdf.cell(w, 6, h, align=align)
+    pdf.ln(6)
+
+    y_start = pdf.get_y()
+    pdf.set_font("Arial", '', 9)
+    for evt in eventos:
+        nome_evt = truncate(evt.get("evento_nome", ""), 30).upper()
+        row = [
+            str(evt['evento']),
+            nome_evt,
+            fmt_num(evt['referencia']),
+            fmt_num(evt['valor']) if evt['tipo'] == 'V' else "",
+            fmt_num(evt['valor']) if evt['tipo'] == 'D' else ""
+        ]
+        for i, (w, v) in enumerate(zip(col_widths, row)):
+            align = 'R' if i >= 2 else ''
+            pdf.cell(w, 6, v, align=align)
+        pdf.ln(6)
+    y_end = pdf.get_y()
+
+    x0 = pdf.l_margin + col_widths[0] + col_widths[1]
+    x1 = x0 + col_widths[2]
+    x2 = x1 + col_widths[3]
+    pdf.set_line_width(0.2)
+    for x in (x0, x1, x2):
+        pdf.line(x, y_start, x, y_end)
+    pdf.ln(2)
+
+    y = pdf.get_y()
+    pdf.line(pdf.l_margin, y, pdf.w - pdf.r_margin, y)
+    pdf.ln(3)
+
+    usable = pdf.w - pdf.l_margin - pdf.r_margin
+    half   = (usable - 10) / 2
+    pdf.set_font("Arial", 'B', 9)
+    pdf.cell(half, 6, "Total Vencimentos", ln=0, align='R')
+    pdf.cell(10,   6, "", ln=0)
+    pdf.cell(half, 6, "Total Descontos",    ln=1, align='R')
+    pdf.set_font("Arial", '', 9)
+    pdf.cell(half, 6, fmt_num(rodape['total_vencimentos']), ln=0, align='R')
+    pdf.cell(10,   6, "", ln=0)
+    pdf.cell(half, 6, fmt_num(rodape['total_descontos']),    ln=1, align='R')
+    pdf.ln(3)
+
+    pdf.set_font("Arial", 'B', 9)
+    pdf.cell(0, 6, f"Valor Líquido »» {fmt_num(rodape['valor_liquido'])}", ln=1, align='R')
+    pdf.ln(4)
+
+    y = pdf.get_y()
+    pdf.line(pdf.l_margin, y, pdf.w - pdf.r_margin, y)
+    pdf.ln(3)
+
+    detalhes = ["Salário Base", "Sal. Contr. INSS", "Base Cálc FGTS",
+               "F.G.T.S. do Mês", "Base Cálc IRRF", "DEP SF", "DEP IRF"]
+    pdf.set_font("Arial", 'B', 8)
+    for d in detalhes:
+        pdf.cell(28, 5, d)
+    pdf.ln(5)
+
+    pdf.set_font("Arial", '', 8)
+    footer_vals = [
+        f"{fmt_num(rodape['salario_base'])}/M",
+        fmt_num(rodape['sal_contr_inss']),
+        fmt_num(rodape['base_calc_fgts']),
+        fmt_num(rodape['fgts_mes']),
+        fmt_num(rodape['base_calc_irrf']),
+        pad_left(rodape['dep_sf'], 2),
+        pad_left(rodape['dep_irf'], 2),
+    ]
+    for v in footer_vals:
+        pdf.cell(28, 6, v)
+    pdf.ln(10)
+
+    pdf.ln(10)
+    y_sig = pdf.get_y()
+    pdf.set_line_width(0.2)
+    pdf.line(pdf.l_margin, y_sig, pdf.l_margin + 80, y_sig)
+    pdf.ln(2)
+    pdf.set_font("Arial", '', 9)
+    pdf.cell(80, 6, funcionario, ln=0)
+    pdf.cell(0, 6, "Data: ____/____/____", ln=1, align='R')
+
+    return pdf.output(dest='S').encode('latin-1')
+
+
+def renderizar_recibo(nome: str, cabecalho: dict, eventos: list[dict], rodape: dict) -> Tuple[str, bytes]:
+    """Executado nos processos do pool: devolve o nome do arquivo junto com o PDF."""
+    return nome, gerar_recibo(cabecalho, eventos, rodape)
+
+
+# -------------------------------------------------
+# Pool de processos para geração em lote
+# -------------------------------------------------
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def workers_pdf() -> int:
+    """HOLERITE_PDF_WORKERS ou, se 0, um processo por núcleo."""
+    return settings.HOLERITE_PDF_WORKERS or os.cpu_count() or 1
+
+
+def get_pool_pdf() -> ProcessPoolExecutor:
+    """
+    Pool compartilhado (criado no primeiro uso). Os processos são iniciados
+    com spawn: fork de um processo com event loop e threads do threadpool
+    pode herdar locks presos.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=workers_pdf(),
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _pool
+
+
+def descartar_pool_pdf() -> None:
+    """Encerra o pool (shutdown ou processo morto); o próximo uso cria outro."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
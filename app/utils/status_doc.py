@@ -0,0 +1,145 @@
+import threading
+from typing import Any, Dict, FrozenSet, Iterable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import TextClause
+
+
+SCHEMA_STATUS = "public"
+# a grafia "satus" existe em alguns bancos e tem precedência sobre a correta
+TABELAS_STATUS = ("tb_satus_doc", "tb_status_doc")
+# tabela ou coluna de status removida depois da descoberta (undefined_table/undefined_column)
+SQLSTATE_ESQUEMA = frozenset({"42P01", "42703"})
+
+
+class ConsultaAceite:
+    """
+    Formato da tabela de status de aceite (qual tabela existe e se tem
+    competencia/data/hora) e o SQL do aceite por competência já montado.
+    Descoberto uma vez no information_schema e reaproveitado entre requisições.
+    """
+
+    def __init__(self, tabela: Optional[str], colunas: FrozenSet[str]):
+        self.tabela = tabela
+        self.colunas = colunas
+        self.sql: Optional[TextClause] = self._montar() if tabela else None
+
+    def _expr_competencia(self) -> str:
+        if "competencia" in self.colunas:
+            # mesma expressão do índice ix_<tabela>_aceite (migrations/004)
+            return "regexp_replace(TRIM(sd.competencia), '[^0-9]', '', 'g')"
+        if "data" in self.colunas:
+            return """
+                COALESCE(
+                    to_char(
+                        CASE
+                            WHEN sd.data ~ '^[0-9]{4}-[0-9]{2}-[0-9]{2}$'
+                            THEN to_date(sd.data, 'YYYY-MM-DD')
+                            ELSE NULL
+                        END,
+                        'YYYYMM'
+                    ),
+                    substr(regexp_replace(TRIM(sd.data), '[^0-9]', '', 'g'), 1, 6)
+                )
+            """
+        return "NULL"
+
+    def _montar(self) -> TextClause:
+        comp_norm_expr = self._expr_competencia()
+
+        # "id DESC" (nulos primeiro, o padrão) como no índice ix_<tabela>_aceite,
+        # para a ordenação sair do índice; id é a chave, nunca nulo
+        order_parts = ["sd.id DESC"]
+        if "data" in self.colunas:
+            order_parts.append("sd.data DESC NULLS LAST")
+        if "hora" in self.colunas:
+            order_parts.append("sd.hora DESC NULLS LAST")
+        order_by_sql = ", ".join(order_parts)
+
+        # último aceite de cada competência pedida, numa única consulta
+        return text(f"""
+            SELECT DISTINCT ON (comp_norm)
+                   {comp_norm_expr} AS comp_norm,
+                   sd.aceito
+              FROM {SCHEMA_STATUS}.{self.tabela} sd
+             WHERE TRIM(sd.cpf::text)       = TRIM(:cpf)
+               AND TRIM(sd.matricula::text) = TRIM(:matricula)
+               AND {comp_norm_expr}         = ANY(:comps)
+             ORDER BY comp_norm, {order_by_sql}
+        """)
+
+    def aceites(self, db: Session, cpf: str, matricula: str, comps: Iterable[str]) -> Dict[str, bool]:
+        """
+        Último aceite da pessoa em cada competência (YYYYMM). Competência sem
+        registro (ou sem tabela de status) vem False. Outros erros do banco
+        sobem: não viram "não aceito".
+        """
+        comps = sorted({c for c in comps if c})
+        resultado = {c: False for c in comps}
+        if self.sql is None or not comps:
+            return resultado
+        try:
+            rows = db.execute(self.sql, {"cpf": cpf, "matricula": matricula, "comps": comps}).fetchall()
+        except ProgrammingError as e:
+            if getattr(e.orig, "pgcode", None) not in SQLSTATE_ESQUEMA:
+                raise
+            db.rollback()
+            return resultado
+        for comp, aceito in rows:
+            resultado[comp] = bool(aceito) if aceito is not None else False
+        return resultado
+
+    def aceito(self, db: Session, cpf: str, matricula: str, comp_norm: str) -> bool:
+        return self.aceites(db, cpf, matricula, [comp_norm]).get(comp_norm, False)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "tabela": f"{SCHEMA_STATUS}.{self.tabela}" if self.tabela else None,
+            "colunas": sorted(self.colunas & {"competencia", "data", "hora"}),
+        }
+
+
+_consulta: Optional[ConsultaAceite] = None
+_consulta_lock = threading.Lock()
+
+
+def _descobrir(db: Session) -> ConsultaAceite:
+    # uma única ida ao catálogo para as duas tabelas candidatas
+    rows = db.execute(
+        text("""
+            SELECT table_name, column_name
+              FROM information_schema.columns
+             WHERE table_schema::text = :schema
+               AND table_name::text = ANY(CAST(:tabelas AS text[]))
+        """),
+        {"schema": SCHEMA_STATUS, "tabelas": list(TABELAS_STATUS)},
+    ).fetchall()
+
+    colunas: Dict[str, set] = {}
+    for tabela, coluna in rows:
+        colunas.setdefault(tabela, set()).add(coluna)
+
+    for tabela in TABELAS_STATUS:
+        if tabela in colunas:
+            return ConsultaAceite(tabela, frozenset(colunas[tabela]))
+    return ConsultaAceite(None, frozenset())
+
+
+def get_consulta_aceite(db: Session) -> ConsultaAceite:
+    """Consulta de aceite do processo, descoberta no primeiro uso."""
+    global _consulta
+    if _consulta is None:
+        with _consulta_lock:
+            if _consulta is None:
+                _consulta = _descobrir(db)
+    return _consulta
+
+
+def recarregar_consulta_aceite(db: Session) -> ConsultaAceite:
+    """Refaz a descoberta (usar depois de migrações na tabela de status)."""
+    global _consulta
+    with _consulta_lock:
+        _consulta = _descobrir(db)
+    return _consulta
@@ -0,0 +1,113 @@
+"""
+Teste de carga das rotas que dependem do GED, contra o GED falso.
+
+    uvicorn bench.fake_ged:app --port 9090
+    GED_BASE_URL=http://127.0.0.1:9090 uvicorn main:app --port 8000
+    python -m bench.carga --api http://127.0.0.1:8000 --ged http://127.0.0.1:9090 \\
+        --requisicoes 2000 --concorrencia 100
+
+Cada requisição sorteia (com semente fixa) um colaborador do GED falso e um
+dos cenários abaixo; no fim imprime vazão e percentis de latência por cenário.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+
+import httpx
+
+
+def _recibos_meses(c: Dict[str, str]) -> Tuple[str, Dict[str, Any]]:
+    return "/documents/search/recibos", {
+        "id_template": 1,
+        "campo_anomes": "anomes",
+        "cp": [
+            {"nome": "tipodedoc", "valor": "RECIBO DE PAGAMENTO"},
+            {"nome": "matricula", "valor": c["matricula"]},
+            {"nome": "colaborador", "valor": c["colaborador"]},
+        ],
+    }
+
+
+def _recibos_mes(c: Dict[str, str]) -> Tuple[str, Dict[str, Any]]:
+    rota, payload = _recibos_meses(c)
+    payload["anomes"] = "2024-12"
+    return rota, payload
+
+
+def _informes_anos(c: Dict[str, str]) -> Tuple[str, Dict[str, Any]]:
+    return "/documents/search/informetrct", {
+        "id_template": 2,
+        "campo_anomes": "ano",
+        "cp": [
+            {"nome": "tipodedoc", "valor": "INFORME DE RENDIMENTOS"},
+            {"nome": "cpf", "valor": c["cpf"]},
+        ],
+    }
+
+
+CENARIOS = {
+    "recibos_meses": _recibos_meses,
+    "recibos_mes": _recibos_mes,
+    "informes_anos": _informes_anos,
+}
+
+
+def _percentil(valores: List[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+async def executar(api: str, ged: str, requisicoes: int, concorrencia: int, seed: int, cenarios: List[str]) -> None:
+    rng = random.Random(seed)
+    async with httpx.AsyncClient(timeout=120) as cliente:
+        colaboradores = (await cliente.get(f"{ged}/_fake/colaboradores")).json()
+        plano = [(nome, CENARIOS[nome](rng.choice(colaboradores))) for nome in
+                 (rng.choice(cenarios) for _ in range(requisicoes))]
+
+        limite = asyncio.Semaphore(concorrencia)
+        latencias: Dict[str, List[float]] = defaultdict(list)
+        status: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+
+        async def _uma(nome: str, rota: str, payload: Dict[str, Any]) -> None:
+            async with limite:
+                inicio = time.perf_counter()
+                try:
+                    r = await cliente.post(f"{api}{rota}", json=payload)
+                    codigo = r.status_code
+                except httpx.HTTPError:
+                    codigo = 0
+                latencias[nome].append((time.perf_counter() - inicio) * 1000)
+                status[nome][codigo] += 1
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(_uma(nome, rota, payload) for nome, (rota, payload) in plano))
+        duracao = time.perf_counter() - inicio
+
+    print(f"{requisicoes} requisições em {duracao:.2f}s ({requisicoes / duracao:.1f} req/s), concorrência {concorrencia}")
+    for nome, valores in sorted(latencias.items()):
+        print(
+            f"  {nome:<15} n={len(valores):<6} média={statistics.mean(valores):8.1f}ms "
+            f"p50={_percentil(valores, 50):8.1f}ms p95={_percentil(valores, 95):8.1f}ms "
+            f"p99={_percentil(valores, 99):8.1f}ms status={dict(status[nome])}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--api", default="http://127.0.0.1:8000")
+    parser.add_argument("--ged", default="http://127.0.0.1:9090")
+    parser.add_argument("--requisicoes", type=int, default=1000)
+    parser.add_argument("--concorrencia", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--cenarios", default=",".join(CENARIOS), help="lista separada por vírgula")
+    args = parser.parse_args()
+    cenarios = [c.strip() for c in args.cenarios.split(",") if c.strip()]
+    asyncio.run(executar(args.api, args.ged, args.requisicoes, args.concorrencia, args.seed, cenarios))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""
+GED falso (byebyepaper) para testes de carga locais.
+
+Implementa as rotas usadas pela API (/login, /templates/getall,
+/templates/getfields, /documents/search, /documents/filter,
+/documents/download, /documents/uploadbase64 e /documents/delete) sobre uma
+base gerada a partir de uma semente, com latência e taxa de erro ajustáveis.
+
+Uso:
+    FAKE_GED_LATENCY_MS=80 FAKE_GED_ERROR_RATE=0.02 \\
+        uvicorn bench.fake_ged:app --port 9090 --workers 1
+
+e na API:
+    GED_BASE_URL=http://127.0.0.1:9090
+
+Variáveis (todas opcionais):
+    FAKE_GED_SEED              semente dos dados e do sorteio de erros (42)
+    FAKE_GED_FUNCIONARIOS      colaboradores gerados (200)
+    FAKE_GED_MESES             meses de recibos por colaborador (24)
+    FAKE_GED_PAGE_SIZE         documentos por página no /documents/search (20)
+    FAKE_GED_LATENCY_MS        latência base de cada rota (50)
+    FAKE_GED_JITTER_MS         variação aleatória somada à latência (20)
+    FAKE_GED_LATENCY_MS_<ROTA> latência de uma rota: LOGIN, TEMPLATES, SEARCH,
+                               FILTER, DOWNLOAD, UPLOAD, DELETE
+    FAKE_GED_ERROR_RATE        fração de respostas 500 (0)
+    FAKE_GED_DOC_KB            tamanho dos PDFs baixados (200)
+    FAKE_GED_DOWNLOAD_MODO     formato do download: base64, binario ou json (base64)
+
+Os colaboradores gerados ficam em GET /_fake/colaboradores, para montar os
+payloads do teste de carga.
+"""
+import asyncio
+import base64
+import math
+import os
+import random
+import re
+import secrets
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+
+def _env_int(nome: str, padrao: int) -> int:
+    return int(os.getenv(nome, padrao))
+
+
+def _env_float(nome: str, padrao: float) -> float:
+    return float(os.getenv(nome, padrao))
+
+
+SEED = _env_int("FAKE_GED_SEED", 42)
+FUNCIONARIOS = _env_int("FAKE_GED_FUNCIONARIOS", 200)
+MESES = _env_int("FAKE_GED_MESES", 24)
+PAGE_SIZE = max(1, _env_int("FAKE_GED_PAGE_SIZE", 20))
+LATENCIA_MS = _env_float("FAKE_GED_LATENCY_MS", 50)
+JITTER_MS = _env_float("FAKE_GED_JITTER_MS", 20)
+ERROR_RATE = _env_float("FAKE_GED_ERROR_RATE", 0)
+DOC_KB = _env_int("FAKE_GED_DOC_KB", 200)
+DOWNLOAD_MODO = os.getenv("FAKE_GED_DOWNLOAD_MODO", "base64")
+
+EMPRESAS = ["ACME LTDA", "WECAN SERVICOS", "ZION TECNOLOGIA", "BOA VISTA COMERCIO"]
+NOMES = ["ANA", "BRUNO", "CARLA", "DIEGO", "ELAINE", "FABIO", "GISELE", "HUGO", "IARA", "JOAO"]
+SOBRENOMES = ["SILVA", "SOUZA", "OLIVEIRA", "SANTOS", "PEREIRA", "LIMA", "COSTA", "ALVES"]
+
+TEMPLATES: Dict[int, Dict[str, Any]] = {
+    1: {"nome": "RECIBOS", "campos": ["tipodedoc", "matricula", "colaborador", "cpf", "empresa", "anomes"]},
+    2: {"nome": "INFORMES E TRCT", "campos": ["tipodedoc", "cpf", "colaborador", "empresa", "ano"]},
+}
+
+_rng_requisicoes = random.Random(SEED + 1)
+_chaves: set = set()
+_documentos: Dict[int, Dict[str, Dict[str, Any]]] = {id_tipo: {} for id_tipo in TEMPLATES}
+_colaboradores: List[Dict[str, str]] = []
+_proximo_id = 1
+
+
+def _novo_documento(id_tipo: int, nomearquivo: str, criado_em: datetime, attrs: Dict[str, str]) -> None:
+    global _proximo_id
+    id_documento = str(_proximo_id)
+    _proximo_id += 1
+    _documentos[id_tipo][id_documento] = {
+        "id_documento": id_documento,
+        "id_tipo": id_tipo,
+        "nomearquivo": nomearquivo,
+        "datacriacao": criado_em.strftime("%Y-%m-%d %H:%M:%S"),
+        "attributes": [{"name": k, "value": v} for k, v in attrs.items()],
+    }
+
+
+def _gera_base() -> None:
+    rng = random.Random(SEED)
+    hoje = datetime(2025, 1, 10)
+    for i in range(FUNCIONARIOS):
+        cpf = "".join(str(rng.randint(0, 9)) for _ in range(11))
+        nome = f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)}"
+        colab = {
+            "cpf": cpf,
+            "matricula": str(1000 + i),
+            "nome": nome,
+            "colaborador": f"{nome}_{cpf}",
+            "empresa": rng.choice(EMPRESAS),
+        }
+        _colaboradores.append(colab)
+        base = {"colaborador": colab["colaborador"], "cpf": cpf, "empresa": colab["empresa"]}
+
+        for m in range(MESES):
+            ref = hoje - timedelta(days=30 * m)
+            anomes = ref.strftime("%Y%m")
+            _novo_documento(1, f"RECIBO_{colab['matricula']}_{anomes}.pdf", ref, {
+                "tipodedoc": "RECIBO DE PAGAMENTO", "matricula": colab["matricula"], "anomes": anomes, **base,
+            })
+        for ano in sorted({(hoje - timedelta(days=30 * m)).year - 1 for m in range(MESES)}):
+            _novo_documento(2, f"INFORME_{cpf}_{ano}.pdf", datetime(ano + 1, 2, 20), {
+                "tipodedoc": "INFORME DE RENDIMENTOS", "ano": str(ano), **base,
+            })
+        if rng.random() < 0.1:
+            _novo_documento(2, f"TRCT_{cpf}.pdf", hoje, {
+                "tipodedoc": "TRCT", "ano": str(hoje.year), **base,
+            })
+
+
+_gera_base()
+
+app = FastAPI(title="GED falso")
+
+
+# -------------------------------------------------
+# Comportamento injetado
+# -------------------------------------------------
+async def _simula(rota: str) -> Optional[Response]:
+    latencia = _env_float(f"FAKE_GED_LATENCY_MS_{rota}", LATENCIA_MS)
+    atraso = latencia + _rng_requisicoes.uniform(0, JITTER_MS)
+    if atraso > 0:
+        await asyncio.sleep(atraso / 1000)
+    if ERROR_RATE and _rng_requisicoes.random() < ERROR_RATE:
+        return JSONResponse({"error": True, "message": "falha simulada"}, status_code=500)
+    return None
+
+
+def _autorizado(request: Request) -> bool:
+    return request.headers.get("authorization") in _chaves
+
+
+def _nao_autorizado() -> JSONResponse:
+    return JSONResponse({"error": True, "message": "authorization_key inválida"}, status_code=401)
+
+
+def _padrao_like(valor: str) -> "re.Pattern[str]":
+    """Valor do cp[] no estilo LIKE do GED: % é curinga, sem diferenciar maiúsculas."""
+    partes = [re.escape(p) for p in valor.split("%")]
+    return re.compile("^" + ".*".join(partes) + "$", re.IGNORECASE | re.DOTALL)
+
+
+def _atributos(doc: Dict[str, Any]) -> Dict[str, str]:
+    return {a["name"]: a["value"] for a in doc["attributes"]}
+
+
+def _filtra(id_tipo: int, criterios: Dict[str, str]) -> List[Dict[str, Any]]:
+    padroes = {campo: _padrao_like(v) for campo, v in criterios.items() if v}
+    achados = []
+    for doc in _documentos.get(id_tipo, {}).values():
+        attrs = _atributos(doc)
+        if all(p.match(attrs.get(campo, "")) for campo, p in padroes.items()):
+            achados.append(doc)
+    return achados
+
+
+def _pdf_falso(id_documento: str) -> bytes:
+    rng = random.Random(f"{SEED}-{id_documento}")
+    corpo = bytes(rng.getrandbits(8) for _ in range(256)) * max(1, DOC_KB * 4)
+    return b"%PDF-1.4\n%fake " + id_documento.encode() + b"\n" + corpo[: DOC_KB * 1024] + b"\n%%EOF\n"
+
+
+# -------------------------------------------------
+# Rotas do GED
+# -------------------------------------------------
+@app.post("/login")
+async def login(request: Request):
+    if (erro := await _simula("LOGIN")) is not None:
+        return erro
+    form = await request.form()
+    if not form.get("usuario") or not form.get("senha"):
+        return {"error": True, "message": "credenciais inválidas"}
+    chave = secrets.token_hex(16)
+    _chaves.add(chave)
+    return {"error": False, "authorization_key": chave}
+
+
+@app.get("/templates/getall")
+async def templates_getall(request: Request):
+    if (erro := await _simula("TEMPLATES")) is not None:
+        return erro
+    if not _autorizado(request):
+        return _nao_autorizado()
+    return {
+        "error": False,
+        "templates": [{"id_tipo": i, "nome": t["nome"]} for i, t in TEMPLATES.items()],
+    }
+
+
+@app.post("/templates/getfields")
+async def templates_getfields(request: Request):
+    if (erro := await _simula("TEMPLATES")) is not None:
+        return erro
+    if not _autorizado(request):
+        return _nao_autorizado()
+    form = await request.form()
+    tpl = TEMPLATES.get(int(form.get("id_template") or 0))
+    if tpl is None:
+        return {"error": True, "message": "template não encontrado", "fields": []}
+    return {
+        "error": False,
+        "fields": [{"nomecampo": c, "tipo": "texto", "ordem": i + 1} for i, c in enumerate(tpl["campos"])],
+    }
+
+
+@app.post("/documents/search")
+async def documents_search(request: Request):
+    if (erro := await _simula("SEARCH")) is not None:
+        return erro
+    if not _autorizado(request):
+        return _nao_autorizado()
+    form = await request.form()
+    id_tipo = int(form.get("id_tipo") or 0)
+    tpl = TEMPLATES.get(id_tipo)
+    if tpl is None:
+        return {"error": True, "message": "tipo inválido", "documents": []}
+    valores = form.getlist("cp[]")
+    achados = _filtra(id_tipo, dict(zip(tpl["campos"], valores)))
+
+    pagina = max(1, int(form.get("pagina") or 1))
+    total_paginas = max(1, math.ceil(len(achados) / PAGE_SIZE))
+    inicio = (pagina - 1) * PAGE_SIZE
+    return {
+        "error": False,
+        "documents": achados[inicio:inicio + PAGE_SIZE],
+        "variables": {"totalpaginas": total_paginas, "pagina": pagina, "totalregistros": len(achados)},
+    }
+
+
+@app.post("/documents/filter")
+async def documents_filter(request: Request):
+    if (erro := await _simula("FILTER")) is not None:
+        return erro
+    if not _autorizado(request):
+        return _nao_autorizado()
+    form = await request.form()
+    id_tipo = int(form.get("id_tipo") or 0)
+    campo = form.get("filtro") or ""
+    criterios = {}
+    for n in range(1, 10):
+        nome = form.get(f"filtro{n}")
+        if nome:
+            criterios[nome] = form.get(f"filtro{n}_valor") or ""
+
+    contagem: Dict[str, int] = {}
+    for doc in _filtra(id_tipo, criterios):
+        valor = _atributos(doc).get(campo)
+        if valor:
+            contagem[valor] = contagem.get(valor, 0) + 1
+    return {"error": False, "groups": [{campo: v, "total": n} for v, n in sorted(contagem.items())]}
+
+
+@app.post("/documents/download")
+async def documents_download(request: Request):
+    if (erro := await _simula("DOWNLOAD")) is not None:
+        return erro
+    if not _autorizado(request):
+        return _nao_autorizado()
+    form = await request.form()
+    id_documento = str(form.get("id_documento") or "")
+    if id_documento not in _documentos.get(int(form.get("id_tipo") or 0), {}):
+        return {"error": True, "message": "documento não encontrado"}
+
+    pdf = _pdf_falso(id_documento)
+    if DOWNLOAD_MODO == "binario":
+        return Response(pdf, media_type="application/pdf")
+    conteudo = base64.b64encode(pdf).decode("ascii")
+    if DOWNLOAD_MODO == "json":
+        return {"error": False, "mimetype": "application/pdf", "documento": conteudo}
+    return Response(conteudo, media_type="text/plain")
+
+
+@app.post("/documents/uploadbase64")
+async def documents_uploadbase64(request: Request):
+    if (erro := await _simula("UPLOAD")) is not None:
+        return erro
+    if not _autorizado(request):
+        return _nao_autorizado()
+    # o GED real recebe o upload como x-www-form-urlencoded
+    if not (request.headers.get("content-type") or "").startswith("application/x-www-form-urlencoded"):
+        return {"error": True, "message": "formato do corpo não suportado"}
+    # o documento é um campo só (base64); o Starlette limita campos a 1 MiB por padrão
+    form = await request.form(max_part_size=256 * 1024 * 1024)
+    id_tipo = int(form.get("id_tipo") or 0)
+    tpl = TEMPLATES.get(id_tipo)
+    if tpl is None:
+        return {"error": True, "message": "tipo inválido"}
+    try:
+        tamanho = len(base64.b64decode(form.get("documento") or "", validate=True))
+    except ValueError:
+        return {"error": True, "message": "documento base64 inválido"}
+    attrs = dict(zip(tpl["campos"], form.getlist("cp[]")))
+    _novo_documento(id_tipo, form.get("documento_nome") or "documento.pdf", datetime.now(), attrs)
+    return {"error": False, "id_documento": str(_proximo_id - 1), "tamanho": tamanho}
+
+
+@app.post("/documents/delete")
+async def documents_delete(request: Request):
+    if (erro := await _simula("DELETE")) is not None:
+        return erro
+    if not _autorizado(request):
+        return _nao_autorizado()
+    form = await request.form()
+    removido = _documentos.get(int(form.get("id_tipo") or 0), {}).pop(str(form.get("id_documento") or ""), None)
+    if removido is None:
+        return {"error": True, "message": "documento não encontrado"}
+    return {"error": False}
+
+
+# -------------------------------------------------
+# Apoio ao teste de carga
+# -------------------------------------------------
+@app.get("/_fake/colaboradores")
+def colaboradores():
+    return _colaboradores
@@ -1,7 +1,13 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+import httpx
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from app.database.connection import engine, Base
+from app.utils.ged_client import fechar_ged_client
+from app.utils.recibo_pdf import descartar_pool_pdf
 
 from app.models.user import Pessoa, Usuario
 _ = (Pessoa, Usuario)
@@ -13,8 +19,25 @@ from app.routers import document as documents_router
 from app.routers import user  as usuario_router
 from app.routers import ged   as ged_router
 from app.routers import gustavo as gustavo_router
+from app.routers import metrics as metrics_router
+from app.routers import meus_documentos as meus_documentos_router
+from app.routers import exportacao as exportacao_router
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await fechar_ged_client()
+    descartar_pool_pdf()
+
+app = FastAPI(title="Consulta de Documentos – WeCanBR", lifespan=lifespan)
+
+@app.exception_handler(httpx.TimeoutException)
+async def ged_timeout(request: Request, exc: httpx.TimeoutException):
+    return JSONResponse(status_code=504, content={"detail": "Tempo esgotado aguardando o GED"})
 
-app = FastAPI(title="Consulta de Documentos – WeCanBR")
+@app.exception_handler(httpx.TransportError)
+async def ged_indisponivel(request: Request, exc: httpx.TransportError):
+    return JSONResponse(status_code=502, content={"detail": "Falha de comunicação com o GED"})
 
 app.add_middleware(
     CORSMiddleware,
@@ -27,9 +50,12 @@ app.add_middleware(
 # rotas
 app.include_router(documents_router.router, tags=["Documentos"])
 app.include_router(usuario_router.router, tags=["Usuários"])
+app.include_router(meus_documentos_router.router, tags=["Usuários"])
 app.include_router(ged_router.router, tags=["GED"])
+app.include_router(exportacao_router.router, tags=["Exportação"])
 app.include_router(livechat_router.router, tags=["Live Chat"])
 app.include_router(gustavo_router.router, tags=["Gustavo"])
+app.include_router(metrics_router.router, tags=["Métricas"])
 
 @app.get("/")
 def root():
@@ -0,0 +1,87 @@
+-- 001 — chaves normalizadas nas tabelas de holerite
+--
+-- As consultas de holerite filtravam por TRIM(cpf::text), TRIM(matricula::text),
+-- TRIM(cliente::text) e regexp_replace(competencia, '[^0-9]', '', 'g'), o que
+-- impede o uso de índices. Aqui essas expressões viram colunas geradas
+-- (STORED, PostgreSQL 12+) e ganham índices compostos:
+--   cpf_digitos      só os dígitos do cpf
+--   matricula_norm   matrícula sem espaços nas pontas
+--   cliente_norm     cliente sem espaços nas pontas
+--   competencia_num  competência como inteiro YYYYMM (NULL se não tiver 6 dígitos)
+--
+-- Rodar ANTES de publicar a versão da API que usa as colunas.
+-- ADD COLUMN ... STORED reescreve a tabela (lock exclusivo): executar em janela.
+-- CREATE INDEX CONCURRENTLY não roda dentro de transação: usar
+--   psql -f migrations/001_holerite_chaves_normalizadas.sql   (sem -1)
+
+-- ---------------------------------------------------------------------------
+-- Colunas
+-- ---------------------------------------------------------------------------
+ALTER TABLE tb_holerite_cabecalhos
+    ADD COLUMN IF NOT EXISTS cpf_digitos text
+        GENERATED ALWAYS AS (regexp_replace(cpf::text, '[^0-9]', '', 'g')) STORED,
+    ADD COLUMN IF NOT EXISTS matricula_norm text
+        GENERATED ALWAYS AS (btrim(matricula::text)) STORED,
+    ADD COLUMN IF NOT EXISTS cliente_norm text
+        GENERATED ALWAYS AS (btrim(cliente::text)) STORED,
+    ADD COLUMN IF NOT EXISTS competencia_num integer
+        GENERATED ALWAYS AS (
+            CASE WHEN regexp_replace(competencia::text, '[^0-9]', '', 'g') ~ '^[0-9]{6}$'
+                 THEN regexp_replace(competencia::text, '[^0-9]', '', 'g')::integer
+            END
+        ) STORED;
+
+ALTER TABLE tb_holerite_rodapes
+    ADD COLUMN IF NOT EXISTS cpf_digitos text
+        GENERATED ALWAYS AS (regexp_replace(cpf::text, '[^0-9]', '', 'g')) STORED,
+    ADD COLUMN IF NOT EXISTS matricula_norm text
+        GENERATED ALWAYS AS (btrim(matricula::text)) STORED,
+    ADD COLUMN IF NOT EXISTS cliente_norm text
+        GENERATED ALWAYS AS (btrim(cliente::text)) STORED,
+    ADD COLUMN IF NOT EXISTS competencia_num integer
+        GENERATED ALWAYS AS (
+            CASE WHEN regexp_replace(competencia::text, '[^0-9]', '', 'g') ~ '^[0-9]{6}$'
+                 THEN regexp_replace(competencia::text, '[^0-9]', '', 'g')::integer
+            END
+        ) STORED;
+
+ALTER TABLE tb_holerite_eventos
+    ADD COLUMN IF NOT EXISTS cpf_digitos text
+        GENERATED ALWAYS AS (regexp_replace(cpf::text, '[^0-9]', '', 'g')) STORED,
+    ADD COLUMN IF NOT EXISTS matricula_norm text
+        GENERATED ALWAYS AS (btrim(matricula::text)) STORED,
+    ADD COLUMN IF NOT EXISTS cliente_norm text
+        GENERATED ALWAYS AS (btrim(cliente::text)) STORED,
+    ADD COLUMN IF NOT EXISTS competencia_num integer
+        GENERATED ALWAYS AS (
+            CASE WHEN regexp_replace(competencia::text, '[^0-9]', '', 'g') ~ '^[0-9]{6}$'
+                 THEN regexp_replace(competencia::text, '[^0-9]', '', 'g')::integer
+            END
+        ) STORED;
+
+-- ---------------------------------------------------------------------------
+-- Índices
+-- ---------------------------------------------------------------------------
+-- chave (cpf, matrícula, cliente, competência): competências, buscar e montar
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_hol_cab_chave
+    ON tb_holerite_cabecalhos (cpf_digitos, matricula_norm, cliente_norm, competencia_num, lote);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_hol_rod_chave
+    ON tb_holerite_rodapes (cpf_digitos, matricula_norm, cliente_norm, competencia_num, lote);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_hol_evt_chave
+    ON tb_holerite_eventos (cpf_digitos, matricula_norm, cliente_norm, competencia_num, lote);
+
+-- /user/me e /documents: "cpf = ... OR matricula = ..." (BitmapOr com o índice acima)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_hol_cab_matricula
+    ON tb_holerite_cabecalhos (matricula_norm);
+-- nome do cliente por código
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_hol_cab_cliente
+    ON tb_holerite_cabecalhos (cliente_norm);
+
+-- montagem por uuid (as consultas comparam uuid::text)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_hol_cab_uuid ON tb_holerite_cabecalhos ((uuid::text));
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_hol_rod_uuid ON tb_holerite_rodapes ((uuid::text));
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_hol_evt_uuid ON tb_holerite_eventos ((uuid::text));
+
+ANALYZE tb_holerite_cabecalhos;
+ANALYZE tb_holerite_rodapes;
+ANALYZE tb_holerite_eventos;
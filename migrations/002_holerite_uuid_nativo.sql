@@ -0,0 +1,18 @@
+-- 002 — índices de uuid no tipo nativo
+--
+-- A montagem do holerite passou a buscar cabeçalho, rodapé e eventos de todos
+-- os UUIDs de uma vez com "uuid = ANY(:uuids::uuid[])", sem o cast para texto.
+-- Os índices de expressão (uuid::text) criados na 001 deixam de ser usados e
+-- são trocados por índices na própria coluna.
+--
+-- Rodar ANTES de publicar a versão da API que usa ANY(uuid[]).
+-- CREATE/DROP INDEX CONCURRENTLY não roda dentro de transação: usar
+--   psql -f migrations/002_holerite_uuid_nativo.sql   (sem -1)
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_hol_cab_uuid_nativo ON tb_holerite_cabecalhos (uuid);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_hol_rod_uuid_nativo ON tb_holerite_rodapes (uuid);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_hol_evt_uuid_nativo ON tb_holerite_eventos (uuid);
+
+DROP INDEX CONCURRENTLY IF EXISTS ix_hol_cab_uuid;
+DROP INDEX CONCURRENTLY IF EXISTS ix_hol_rod_uuid;
+DROP INDEX CONCURRENTLY IF EXISTS ix_hol_evt_uuid;
@@ -0,0 +1,172 @@
+-- 003 — resumo dos holerites completos (tb_holerite_competencias)
+--
+-- A listagem de competências e a busca de UUIDs do holerite cruzavam
+-- cabeçalhos, rodapés e eventos a cada chamada. Esta tabela guarda uma linha
+-- por holerite completo (uuid presente nas três tabelas com a mesma chave):
+--   (cpf_digitos, matricula_norm, cliente_norm, competencia_num, lote, uuid, pagamento)
+-- O filtro de pagamento continua na consulta (depende de current_date).
+--
+-- Manutenção incremental: triggers por comando (com tabelas de transição)
+-- nas três tabelas recalculam só os UUIDs tocados pelo INSERT/UPDATE/DELETE,
+-- então a carga de um lote novo atualiza o resumo na mesma transação.
+-- Cada trigger só enxerga o que a própria transação vê: as três tabelas de
+-- um lote devem ser carregadas na mesma transação ou em sequência; cargas
+-- concorrentes chamam fn_holerite_competencias_recalcular_lote (007) no fim.
+-- Recalcular tudo: SELECT fn_holerite_competencias_recalcular();
+-- (ou POST /documents/holerite/competencias/recalcular)
+--
+-- Requer a 001 (colunas normalizadas). Rodar ANTES de publicar a versão da API
+-- que lê o resumo; a carga inicial é feita no fim deste script.
+--   psql -1 -f migrations/003_holerite_competencias.sql
+
+-- ---------------------------------------------------------------------------
+-- Definição de "holerite completo"
+-- ---------------------------------------------------------------------------
+CREATE OR REPLACE VIEW vw_holerite_completos AS
+SELECT DISTINCT ON (c.uuid)
+       c.cpf_digitos,
+       c.matricula_norm,
+       c.cliente_norm,
+       c.competencia_num,
+       c.lote,
+       c.uuid,
+       c.pagamento
+  FROM tb_holerite_cabecalhos c
+ WHERE c.uuid IS NOT NULL
+   AND c.competencia_num IS NOT NULL
+   AND EXISTS (
+        SELECT 1 FROM tb_holerite_rodapes r
+         WHERE r.uuid            = c.uuid
+           AND r.cpf_digitos     = c.cpf_digitos
+           AND r.matricula_norm  = c.matricula_norm
+           AND r.cliente_norm    = c.cliente_norm
+           AND r.competencia_num = c.competencia_num
+   )
+   AND EXISTS (
+        SELECT 1 FROM tb_holerite_eventos e
+         WHERE e.uuid            = c.uuid
+           AND e.cpf_digitos     = c.cpf_digitos
+           AND e.matricula_norm  = c.matricula_norm
+           AND e.cliente_norm    = c.cliente_norm
+           AND e.competencia_num = c.competencia_num
+   )
+ ORDER BY c.uuid;
+
+-- ---------------------------------------------------------------------------
+-- Tabela de resumo (tipos herdados do cabeçalho)
+-- ---------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS tb_holerite_competencias AS
+SELECT * FROM vw_holerite_completos WITH NO DATA;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint WHERE conname = 'pk_holerite_competencias'
+    ) THEN
+        ALTER TABLE tb_holerite_competencias
+            ADD CONSTRAINT pk_holerite_competencias PRIMARY KEY (uuid);
+    END IF;
+END $$;
+
+CREATE INDEX IF NOT EXISTS ix_hol_comp_chave
+    ON tb_holerite_competencias (cpf_digitos, matricula_norm, cliente_norm, competencia_num)
+    INCLUDE (pagamento);
+
+-- ---------------------------------------------------------------------------
+-- Atualização
+-- ---------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION fn_holerite_competencias_atualizar(p_uuids uuid[])
+RETURNS integer
+LANGUAGE plpgsql AS $$
+DECLARE
+    n integer;
+BEGIN
+    IF p_uuids IS NULL OR cardinality(p_uuids) = 0 THEN
+        RETURN 0;
+    END IF;
+
+    DELETE FROM tb_holerite_competencias WHERE uuid = ANY(p_uuids);
+
+    INSERT INTO tb_holerite_competencias
+    SELECT * FROM vw_holerite_completos v WHERE v.uuid = ANY(p_uuids);
+
+    GET DIAGNOSTICS n = ROW_COUNT;
+    RETURN n;
+END $$;
+
+CREATE OR REPLACE FUNCTION fn_holerite_competencias_recalcular()
+RETURNS integer
+LANGUAGE plpgsql AS $$
+DECLARE
+    n integer;
+BEGIN
+    DELETE FROM tb_holerite_competencias;
+
+    INSERT INTO tb_holerite_competencias
+    SELECT * FROM vw_holerite_completos;
+
+    GET DIAGNOSTICS n = ROW_COUNT;
+    RETURN n;
+END $$;
+
+CREATE OR REPLACE FUNCTION fn_holerite_competencias_trigger()
+RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    v_uuids uuid[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        v_uuids := ARRAY(SELECT DISTINCT uuid FROM novos WHERE uuid IS NOT NULL);
+    ELSIF TG_OP = 'DELETE' THEN
+        v_uuids := ARRAY(SELECT DISTINCT uuid FROM antigos WHERE uuid IS NOT NULL);
+    ELSE
+        v_uuids := ARRAY(
+            SELECT uuid FROM novos WHERE uuid IS NOT NULL
+            UNION
+            SELECT uuid FROM antigos WHERE uuid IS NOT NULL
+        );
+    END IF;
+
+    PERFORM fn_holerite_competencias_atualizar(v_uuids);
+    RETURN NULL;
+END $$;
+
+-- tabelas de transição exigem um trigger por evento
+DO $$
+DECLARE
+    t record;
+BEGIN
+    FOR t IN
+        SELECT * FROM (VALUES
+            ('tb_holerite_cabecalhos', 'cab'),
+            ('tb_holerite_rodapes',    'rod'),
+            ('tb_holerite_eventos',    'evt')
+        ) AS x(tabela, sufixo)
+    LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_hol_comp_%s_ins ON %I', t.sufixo, t.tabela);
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_hol_comp_%s_upd ON %I', t.sufixo, t.tabela);
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_hol_comp_%s_del ON %I', t.sufixo, t.tabela);
+
+        EXECUTE format(
+            'CREATE TRIGGER trg_hol_comp_%s_ins AFTER INSERT ON %I '
+            'REFERENCING NEW TABLE AS novos '
+            'FOR EACH STATEMENT EXECUTE FUNCTION fn_holerite_competencias_trigger()',
+            t.sufixo, t.tabela);
+        EXECUTE format(
+            'CREATE TRIGGER trg_hol_comp_%s_upd AFTER UPDATE ON %I '
+            'REFERENCING OLD TABLE AS antigos NEW TABLE AS novos '
+            'FOR EACH STATEMENT EXECUTE FUNCTION fn_holerite_competencias_trigger()',
+            t.sufixo, t.tabela);
+        EXECUTE format(
+            'CREATE TRIGGER trg_hol_comp_%s_del AFTER DELETE ON %I '
+            'REFERENCING OLD TABLE AS antigos '
+            'FOR EACH STATEMENT EXECUTE FUNCTION fn_holerite_competencias_trigger()',
+            t.sufixo, t.tabela);
+    END LOOP;
+END $$;
+
+-- ---------------------------------------------------------------------------
+-- Carga inicial
+-- ---------------------------------------------------------------------------
+SELECT fn_holerite_competencias_recalcular();
+ANALYZE tb_holerite_competencias;
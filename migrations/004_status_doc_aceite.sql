@@ -0,0 +1,36 @@
+-- 004 — índice do último aceite por competência
+--
+-- O aceite de holerites e recibos é lido numa única consulta para todas as
+-- competências da tela:
+--   SELECT DISTINCT ON (comp_norm) ... WHERE TRIM(cpf) = ... AND TRIM(matricula) = ...
+--      AND regexp_replace(TRIM(competencia), '[^0-9]', '', 'g') = ANY(:comps)
+--    ORDER BY comp_norm, id DESC
+-- Este índice cobre o filtro e a ordenação (app/utils/status_doc.py).
+--
+-- A API usa public.tb_satus_doc se existir, senão public.tb_status_doc; o
+-- bloco abaixo indexa a que existir. Tabelas sem a coluna competencia são
+-- ignoradas (a competência vem de "data" via to_char, que não é indexável).
+-- CREATE INDEX sem CONCURRENTLY (dentro de DO): bloqueia escrita na tabela de
+-- status enquanto o índice é criado.
+--   psql -f migrations/004_status_doc_aceite.sql
+
+DO $$
+DECLARE
+    t text;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['tb_satus_doc', 'tb_status_doc'] LOOP
+        IF EXISTS (
+            SELECT 1 FROM information_schema.columns
+             WHERE table_schema = 'public' AND table_name = t AND column_name = 'competencia'
+        ) THEN
+            EXECUTE format(
+                'CREATE INDEX IF NOT EXISTS %I ON public.%I ('
+                '  btrim(cpf::text), btrim(matricula::text),'
+                '  regexp_replace(btrim(competencia), ''[^0-9]'', '''', ''g''),'
+                '  id DESC)',
+                'ix_' || t || '_aceite', t);
+            EXECUTE format('ANALYZE public.%I', t);
+            EXIT;
+        END IF;
+    END LOOP;
+END $$;
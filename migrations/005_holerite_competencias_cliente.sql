@@ -0,0 +1,10 @@
+-- 005 — exportação de holerites por (cliente, competência)
+--
+-- GET /documents/holerite/exportar pagina tb_holerite_competencias por
+-- (cliente_norm, competencia_num) em ordem de uuid ("uuid > último").
+-- O índice da 003 começa por cpf_digitos e não atende essa varredura.
+--   psql -f migrations/005_holerite_competencias_cliente.sql   (sem -1)
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_hol_comp_cliente
+    ON tb_holerite_competencias (cliente_norm, competencia_num, uuid)
+    INCLUDE (pagamento);
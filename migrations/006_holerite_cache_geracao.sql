@@ -0,0 +1,20 @@
+-- 006 — geração do cache de holerites por lote
+--
+-- O cache de holerites montados (app/utils/holerite_cache.py) fica na memória
+-- de cada worker. Invalidar um lote reprocessado só limpava o worker que
+-- atendeu o POST /documents/holerite/cache/invalidar; os demais continuavam
+-- servindo a versão antiga.
+--
+-- Cada invalidação incrementa a geração do lote (ou a linha '*', que vale
+-- para todos). A geração entra na entrada do cache ao gravar e é relida do
+-- primário a cada busca; entrada com geração diferente é descartada em
+-- qualquer worker. Com os holerites lidos na réplica, a geração também é
+-- lida lá: se ficou atrás da do primário, a réplica ainda não tem o lote
+-- reprocessado e o holerite montado não vai para o cache.
+--   psql -1 -f migrations/006_holerite_cache_geracao.sql
+
+CREATE TABLE IF NOT EXISTS tb_holerite_cache_geracao (
+    lote          text        PRIMARY KEY,
+    geracao       bigint      NOT NULL DEFAULT 0,
+    atualizado_em timestamptz NOT NULL DEFAULT now()
+);
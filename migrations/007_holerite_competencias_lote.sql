@@ -0,0 +1,28 @@
+-- 007 — recálculo do resumo por lote (cargas concorrentes)
+--
+-- Os triggers da 003 recalculam os UUIDs tocados com o que a transação da
+-- carga enxerga. Se cabeçalhos, eventos e rodapés de um mesmo uuid forem
+-- gravados por transações concorrentes, cada trigger roda antes do commit das
+-- outras, não vê as demais partes e o uuid não entra no resumo.
+--
+-- Regra para a carga: ou grava as três tabelas de um lote na mesma transação
+-- (ou em transações sequenciais), ou, ao terminar cada lote, chama
+--   SELECT fn_holerite_competencias_recalcular_lote('<lote>');
+-- (ou POST /documents/holerite/competencias/recalcular?lote=<lote>)
+-- depois que todas as transações do lote fizeram commit.
+--   psql -1 -f migrations/007_holerite_competencias_lote.sql
+
+CREATE OR REPLACE FUNCTION fn_holerite_competencias_recalcular_lote(p_lote text)
+RETURNS integer
+LANGUAGE plpgsql AS $$
+BEGIN
+    RETURN fn_holerite_competencias_atualizar(ARRAY(
+        SELECT uuid FROM tb_holerite_cabecalhos WHERE lote::text = p_lote AND uuid IS NOT NULL
+        UNION
+        SELECT uuid FROM tb_holerite_rodapes    WHERE lote::text = p_lote AND uuid IS NOT NULL
+        UNION
+        SELECT uuid FROM tb_holerite_eventos    WHERE lote::text = p_lote AND uuid IS NOT NULL
+        UNION
+        SELECT uuid FROM tb_holerite_competencias WHERE lote::text = p_lote
+    ));
+END $$;
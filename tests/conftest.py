@@ -0,0 +1,87 @@
+"""
+Configuração comum dos testes.
+
+As Settings exigem as variáveis de ambiente da aplicação; aqui elas recebem
+valores de teste antes de qualquer import de `app`. O GED é o falso de
+bench/fake_ged.py, servido por uvicorn numa thread em uma porta livre.
+"""
+import os
+import socket
+import sys
+import threading
+import time
+
+import pytest
+
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+PORTA_FAKE_GED = _porta_livre()
+
+_AMBIENTE = {
+    "SECRET_KEY": "teste",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "10",
+    "DB_HOST": "localhost",
+    "DB_PORT": "5432",
+    "DB_NAME": "teste",
+    "DB_USER": "teste",
+    "DB_PASSWORD": "teste",
+    "EMAIL_HOST": "localhost",
+    "EMAIL_PORT": "25",
+    "EMAIL_USERNAME": "teste",
+    "EMAIL_PASSWORD": "teste",
+    "EMAIL_SENDER": "teste@localhost",
+    "GED_CONTA": "teste",
+    "GED_USUARIO": "teste",
+    "GED_SENHA": "teste",
+    "ENVIRONMENT": "dev",
+    "ODOO_URL": "http://localhost",
+    "ODOO_DB": "teste",
+    "ODOO_USER": "teste",
+    "ODOO_PASSWORD": "teste",
+    "HELPDESK_TEAM_ID": "1",
+    "HOLERITE_PDF_WORKERS": "2",
+}
+for _nome, _valor in _AMBIENTE.items():
+    os.environ.setdefault(_nome, _valor)
+
+# o GED dos testes é sempre o falso, sem latência nem erros sorteados
+os.environ.update({
+    "GED_BASE_URL": f"http://127.0.0.1:{PORTA_FAKE_GED}",
+    "FAKE_GED_LATENCY_MS": "0",
+    "FAKE_GED_JITTER_MS": "0",
+    "FAKE_GED_ERROR_RATE": "0",
+    "FAKE_GED_FUNCIONARIOS": "5",
+    "FAKE_GED_MESES": "3",
+    "FAKE_GED_DOC_KB": "300",
+})
+
+
+@pytest.fixture(scope="session")
+def fake_ged():
+    """Módulo bench.fake_ged com o servidor no ar em GED_BASE_URL."""
+    import uvicorn
+
+    from bench import fake_ged as modulo
+
+    servidor = uvicorn.Server(uvicorn.Config(modulo.app, host="127.0.0.1", port=PORTA_FAKE_GED, log_level="warning"))
+    thread = threading.Thread(target=servidor.run, daemon=True)
+    thread.start()
+    limite = time.monotonic() + 10
+    while not servidor.started:
+        if time.monotonic() > limite or not thread.is_alive():
+            raise RuntimeError("fake GED não subiu")
+        time.sleep(0.02)
+    yield modulo
+    servidor.should_exit = True
+    thread.join(timeout=5)
@@ -0,0 +1,185 @@
+import asyncio
+
+import pytest
+
+from app.utils import cache
+from app.utils.cache import SWRCache, TTLCache
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 1000.0
+
+    def monotonic(self) -> float:
+        return self.agora
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    r = Relogio()
+    monkeypatch.setattr(cache, "time", r)
+    return r
+
+
+class Carregador:
+    """loader do SWRCache que devolve os valores em sequência e conta as chamadas."""
+
+    def __init__(self, *valores, espera: asyncio.Event = None):
+        self.valores = list(valores)
+        self.chamadas = 0
+        self.espera = espera
+
+    async def __call__(self):
+        self.chamadas += 1
+        if self.espera is not None:
+            await self.espera.wait()
+        valor = self.valores.pop(0)
+        if isinstance(valor, Exception):
+            raise valor
+        return valor
+
+
+# -------------------------------------------------
+# TTLCache
+# -------------------------------------------------
+def test_ttl_expira(relogio):
+    c = TTLCache(ttl=10)
+    c.set("a", 1)
+    relogio.agora += 9.9
+    assert c.get("a") == 1
+    relogio.agora += 0.1
+    assert c.get("a", "vazio") == "vazio"
+    assert len(c) == 0
+
+
+def test_ttl_por_item(relogio):
+    c = TTLCache(ttl=10)
+    c.set("a", 1, ttl=60)
+    relogio.agora += 30
+    assert c.get("a") == 1
+
+
+def test_ttl_remove_o_menos_usado(relogio):
+    c = TTLCache(maxsize=2, ttl=10)
+    c.set("a", 1)
+    c.set("b", 2)
+    c.get("a")
+    c.set("c", 3)
+    assert c.get("a") == 1
+    assert c.get("b") is None
+    assert c.get("c") == 3
+
+
+# -------------------------------------------------
+# SWRCache
+# -------------------------------------------------
+def test_swr_fresco_nao_recarrega(relogio):
+    async def cenario():
+        c = SWRCache(ttl=10, stale_ttl=100)
+        loader = Carregador(["v1"], ["v2"])
+        assert await c.get_or_load("k", loader) == ["v1"]
+        relogio.agora += 9
+        assert await c.get_or_load("k", loader) == ["v1"]
+        assert loader.chamadas == 1
+
+    asyncio.run(cenario())
+
+
+def test_swr_vencido_devolve_antigo_e_recarrega_uma_vez(relogio):
+    async def cenario():
+        c = SWRCache(ttl=10, stale_ttl=100)
+        libera = asyncio.Event()
+        loader = Carregador(["v1"], ["v2"])
+        assert await c.get_or_load("k", loader) == ["v1"]
+
+        relogio.agora += 50
+        loader.espera = libera
+        # várias leituras vencidas: todas recebem o valor antigo na hora e só uma recarga sai
+        for _ in range(3):
+            assert await c.get_or_load("k", loader) == ["v1"]
+        await asyncio.sleep(0)
+        assert loader.chamadas == 2
+
+        libera.set()
+        await asyncio.sleep(0.01)
+        assert await c.get_or_load("k", loader) == ["v2"]
+        assert loader.chamadas == 2
+
+    asyncio.run(cenario())
+
+
+def test_swr_falha_na_recarga_mantem_o_antigo(relogio):
+    async def cenario():
+        c = SWRCache(ttl=10, stale_ttl=100)
+        loader = Carregador(["v1"], RuntimeError("GED fora"), ["v3"])
+        await c.get_or_load("k", loader)
+
+        relogio.agora += 50
+        assert await c.get_or_load("k", loader) == ["v1"]
+        await asyncio.sleep(0.01)
+        assert loader.chamadas == 2
+        # a próxima leitura vencida tenta de novo
+        assert await c.get_or_load("k", loader) == ["v1"]
+        await asyncio.sleep(0.01)
+        assert await c.get_or_load("k", loader) == ["v3"]
+
+    asyncio.run(cenario())
+
+
+def test_swr_alem_do_stale_espera_o_carregamento(relogio):
+    async def cenario():
+        c = SWRCache(ttl=10, stale_ttl=100)
+        loader = Carregador(["v1"], ["v2"])
+        await c.get_or_load("k", loader)
+        relogio.agora += 110
+        assert await c.get_or_load("k", loader) == ["v2"]
+        assert loader.chamadas == 2
+
+    asyncio.run(cenario())
+
+
+def test_swr_nao_guarda_vazio_nem_excecao(relogio):
+    async def cenario():
+        c = SWRCache(ttl=10, stale_ttl=100)
+        loader = Carregador([], RuntimeError("GED fora"), ["v"])
+        assert await c.get_or_load("k", loader) == []
+        with pytest.raises(RuntimeError):
+            await c.get_or_load("k", loader)
+        assert len(c) == 0
+        assert await c.get_or_load("k", loader) == ["v"]
+        assert len(c) == 1
+
+    asyncio.run(cenario())
+
+
+def test_swr_invalidacao_durante_a_recarga_vence(relogio):
+    async def cenario():
+        c = SWRCache(ttl=10, stale_ttl=100)
+        libera = asyncio.Event()
+        loader = Carregador(["v1"], ["antigo"])
+        await c.get_or_load("k", loader)
+
+        relogio.agora += 50
+        loader.espera = libera
+        await c.get_or_load("k", loader)
+        c.invalidate("k")
+        libera.set()
+        await asyncio.sleep(0.01)
+        assert len(c) == 0
+
+    asyncio.run(cenario())
+
+
+def test_swr_lru_e_invalidate_where(relogio):
+    async def cenario():
+        c = SWRCache(maxsize=2, ttl=10, stale_ttl=100)
+        for chave in (("cpf1", 2024), ("cpf1", 2025), ("cpf2", 2025)):
+            await c.get_or_load(chave, Carregador([chave]))
+        assert len(c) == 2
+        c.invalidate_where(lambda k: k[0] == "cpf1")
+        assert len(c) == 1
+        loader = Carregador(["x"])
+        assert await c.get_or_load(("cpf2", 2025), loader) == [("cpf2", 2025)]
+        assert loader.chamadas == 0
+
+    asyncio.run(cenario())
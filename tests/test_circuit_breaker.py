@@ -0,0 +1,140 @@
+import asyncio
+
+import pytest
+
+from app.utils import circuit_breaker
+from app.utils.circuit_breaker import CircuitBreaker, ServicoIndisponivel
+from app.utils.ged_client import GedClient
+from config.settings import settings
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 1000.0
+
+    def monotonic(self) -> float:
+        return self.agora
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    r = Relogio()
+    monkeypatch.setattr(circuit_breaker, "time", r)
+    return r
+
+
+def _abre(cb: CircuitBreaker) -> None:
+    for _ in range(cb.limite_falhas):
+        cb.falha(cb.antes())
+
+
+def test_fechado_deixa_passar_e_sucesso_zera_falhas(relogio):
+    cb = CircuitBreaker("GED", limite_falhas=3, tempo_aberto=10)
+    cb.falha(cb.antes())
+    cb.falha(cb.antes())
+    cb.sucesso(cb.antes())
+    cb.falha(cb.antes())
+    cb.falha(cb.antes())
+    assert cb.estado == CircuitBreaker.FECHADO
+    assert cb.falhas_seguidas == 2
+
+
+def test_abre_no_limite_e_rejeita_com_retry_after(relogio):
+    cb = CircuitBreaker("GED", limite_falhas=3, tempo_aberto=10)
+    _abre(cb)
+    assert cb.estado == CircuitBreaker.ABERTO
+
+    relogio.agora += 2.5
+    with pytest.raises(ServicoIndisponivel) as exc:
+        cb.antes()
+    assert exc.value.status_code == 503
+    assert exc.value.headers["Retry-After"] == "8"
+    assert cb.contadores["rejeitadas"] == 1
+    assert cb.contadores["aberturas"] == 1
+
+
+def test_meio_aberto_deixa_uma_sonda_so(relogio):
+    cb = CircuitBreaker("GED", limite_falhas=1, tempo_aberto=10)
+    _abre(cb)
+    relogio.agora += 10
+
+    assert cb.antes() is True
+    assert cb.estado == CircuitBreaker.MEIO_ABERTO
+    with pytest.raises(ServicoIndisponivel) as exc:
+        cb.antes()
+    assert exc.value.headers["Retry-After"] == "1"
+
+
+def test_sonda_com_sucesso_fecha(relogio):
+    cb = CircuitBreaker("GED", limite_falhas=1, tempo_aberto=10)
+    _abre(cb)
+    relogio.agora += 10
+
+    cb.sucesso(cb.antes())
+    assert cb.estado == CircuitBreaker.FECHADO
+    assert cb.antes() is False
+
+
+def test_sonda_com_falha_reabre_por_mais_um_periodo(relogio):
+    cb = CircuitBreaker("GED", limite_falhas=5, tempo_aberto=10)
+    _abre(cb)
+    relogio.agora += 10
+
+    # no meio aberto uma falha basta, sem esperar o limite
+    cb.falha(cb.antes())
+    assert cb.estado == CircuitBreaker.ABERTO
+    assert cb.contadores["aberturas"] == 2
+    relogio.agora += 9
+    with pytest.raises(ServicoIndisponivel):
+        cb.antes()
+    relogio.agora += 1
+    assert cb.antes() is True
+
+
+def test_sonda_liberada_sem_resultado_deixa_outra_passar(relogio):
+    cb = CircuitBreaker("GED", limite_falhas=1, tempo_aberto=10)
+    _abre(cb)
+    relogio.agora += 10
+
+    cb.liberar(cb.antes())
+    assert cb.estado == CircuitBreaker.MEIO_ABERTO
+    assert cb.antes() is True
+
+
+def test_snapshot(relogio):
+    cb = CircuitBreaker("GED", limite_falhas=2, tempo_aberto=30)
+    _abre(cb)
+    relogio.agora += 12
+    dados = cb.snapshot()
+    assert dados["estado"] == CircuitBreaker.ABERTO
+    assert dados["falhas"] == 2
+    assert dados["segundos_no_estado"] == 12
+    assert dados["proxima_sonda_em"] == 18
+
+
+def test_cliente_ged_abre_o_circuito_com_5xx(fake_ged, monkeypatch):
+    busca = {"id_tipo": 1, "pagina": 1}
+
+    async def cenario():
+        cliente = GedClient(
+            settings.GED_BASE_URL, "conta", "usuario", "senha",
+            disjuntor=CircuitBreaker("GED", limite_falhas=2, tempo_aberto=30),
+        )
+        try:
+            ok = await cliente.post("/documents/search", data=busca, cache=False)
+            assert ok.status_code == 200
+
+            monkeypatch.setattr(fake_ged, "ERROR_RATE", 1.0)
+            for _ in range(2):
+                r = await cliente.post("/documents/search", data=busca, cache=False)
+                assert r.status_code == 500
+            assert cliente.disjuntor.estado == CircuitBreaker.ABERTO
+
+            with pytest.raises(ServicoIndisponivel):
+                await cliente.post("/documents/search", data=busca, cache=False)
+            assert cliente.disjuntor.contadores["rejeitadas"] == 1
+        finally:
+            await cliente.aclose()
+
+    asyncio.run(cenario())
+
@@ -0,0 +1,56 @@
+from contextlib import asynccontextmanager
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers import document, ged
+from app.utils.ged_client import fechar_ged_client
+
+
+@asynccontextmanager
+async def _ciclo(_app):
+    yield
+    await fechar_ged_client()
+
+
+@pytest.fixture
+def cliente(fake_ged):
+    app = FastAPI(lifespan=_ciclo)
+    app.include_router(document.router)
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.mark.parametrize("payload", [
+    {"id_template": 1},
+    {"id_template": 1, "campo": "matricula"},
+    {"id_template": 1, "campo": "matricula", "valor": "  "},
+    {"id_template": 1, "valor": "1000"},
+    {"id_template": 1, "campo": "inexistente", "valor": "1000"},
+])
+def test_sem_filtro_valido_nao_apaga_nada(cliente, fake_ged, payload):
+    antes = len(fake_ged._documentos[1])
+    r = cliente.post("/documents/delete", json=payload)
+    assert r.status_code == 400
+    assert len(fake_ged._documentos[1]) == antes
+
+
+def test_apaga_so_os_documentos_do_filtro(cliente, fake_ged):
+    def da_matricula(m):
+        return [d for d in fake_ged._documentos[1].values()
+                if {"name": "matricula", "value": m} in d["attributes"]]
+
+    alvo = len(da_matricula("1001"))
+    antes = len(fake_ged._documentos[1])
+    ged._disponibilidade_cache._guarda(("recibos", "1", "anomes", ("", "1001")), ["2025-01"])
+    ged._disponibilidade_cache._guarda(("informetrct", "2", "ano", ("",)), ["2024"])
+
+    r = cliente.post("/documents/delete", json={"id_template": 1, "campo": "matricula", "valor": "1001"})
+    assert r.status_code == 200
+    assert r.json() == {"total_encontrados": alvo, "total_deletados": alvo, "falhas": []}
+    assert da_matricula("1001") == []
+    assert len(fake_ged._documentos[1]) == antes - alvo
+    # só o template apagado perde os meses/anos em cache
+    assert len(ged._disponibilidade_cache) == 1
+    ged._disponibilidade_cache.clear()
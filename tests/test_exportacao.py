@@ -0,0 +1,197 @@
+import asyncio
+import csv
+import io
+import json
+import zipfile
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.routers import exportacao
+from app.utils.recibo_pdf import descartar_pool_pdf
+
+
+def _holerite(uuid: str, matricula: str = "123", tipo: str = "V"):
+    cabecalho = {
+        "empresa": "1", "filial": "1", "empresa_nome": "ACME LTDA", "empresa_cnpj": "00.000.000/0001-00",
+        "cliente": "42", "cliente_nome": "CLIENTE", "cliente_cnpj": "11.111.111/0001-11",
+        "matricula": matricula, "nome": "ANA SILVA", "funcao_nome": "ANALISTA", "admissao": "2020-03-01",
+        "competencia": "202501", "lote": "L1", "cpf": "12345678900",
+    }
+    eventos = [
+        {"evento": 1, "evento_nome": "SALARIO", "referencia": Decimal("30"), "valor": Decimal("3000.00"), "tipo": tipo},
+        {"evento": 2, "evento_nome": "INSS", "referencia": Decimal("9"), "valor": Decimal("270.00"), "tipo": "D"},
+    ]
+    rodape = {
+        "total_vencimentos": Decimal("3000.00"), "total_descontos": Decimal("270.00"), "valor_liquido": Decimal("2730.00"),
+        "salario_base": Decimal("3000.00"), "sal_contr_inss": Decimal("3000.00"), "base_calc_fgts": Decimal("3000.00"),
+        "fgts_mes": Decimal("240.00"), "base_calc_irrf": Decimal("2730.00"), "dep_sf": 0, "dep_irf": 0,
+    }
+    return cabecalho, eventos, rodape
+
+
+def _montado(uuid: str):
+    cabecalho, eventos, rodape = _holerite(uuid)
+    return {
+        "uuid": uuid, "tipo_calculo": "M", "cabecalho": cabecalho,
+        "documentos": [{"eventos": eventos}], "rodape": rodape,
+    }
+
+
+# -------------------------------------------------
+# Autorização (exportar e exportar/recibos)
+# -------------------------------------------------
+def _autoriza(monkeypatch, pessoa, cliente="42", competencia="2025-01"):
+    monkeypatch.setattr(exportacao, "exigir_rh", lambda request, db: pessoa)
+    return exportacao._autorizar_exportacao(None, None, cliente, competencia)
+
+
+@pytest.mark.parametrize("cliente_pessoa", [None, "", "  ", "43"])
+def test_rh_sem_cliente_ou_de_outro_cliente_nao_exporta(monkeypatch, cliente_pessoa):
+    with pytest.raises(HTTPException) as exc:
+        _autoriza(monkeypatch, SimpleNamespace(rh=True, interno=False, cliente=cliente_pessoa))
+    assert exc.value.status_code == 403
+
+
+def test_rh_exporta_o_proprio_cliente(monkeypatch):
+    pessoa = SimpleNamespace(rh=True, interno=False, cliente=" 42 ")
+    assert _autoriza(monkeypatch, pessoa, cliente=" 42") == ("42", 202501)
+
+
+def test_interno_exporta_qualquer_cliente(monkeypatch):
+    pessoa = SimpleNamespace(rh=False, interno=True, cliente=None)
+    assert _autoriza(monkeypatch, pessoa, cliente="77", competencia="202412") == ("77", 202412)
+
+
+def test_competencia_invalida(monkeypatch):
+    with pytest.raises(HTTPException) as exc:
+        _autoriza(monkeypatch, SimpleNamespace(interno=True), competencia="dezembro")
+    assert exc.value.status_code == 422
+
+
+# -------------------------------------------------
+# NDJSON / CSV
+# -------------------------------------------------
+def test_ndjson_uma_linha_por_holerite_sob_demanda():
+    lidos = []
+
+    def origem():
+        for i in range(3):
+            lidos.append(i)
+            yield _montado(f"u{i}")
+
+    saida = exportacao._ndjson(origem())
+    primeira = next(saida)
+    # só o primeiro holerite foi montado até aqui
+    assert lidos == [0]
+    linhas = [primeira] + list(saida)
+    assert [json.loads(l)["uuid"] for l in linhas] == ["u0", "u1", "u2"]
+    assert all(l.endswith(b"\n") and l.count(b"\n") == 1 for l in linhas)
+    assert json.loads(linhas[0])["rodape"]["valor_liquido"] == 2730.0
+
+
+def test_csv_uma_linha_por_evento():
+    corpo = b"".join(exportacao._csv(iter([_montado("u0"), _montado("u1")]))).decode("utf-8")
+    linhas = list(csv.reader(io.StringIO(corpo), delimiter=";"))
+    assert linhas[0] == exportacao.COLUNAS_CSV
+    assert len(linhas) == 1 + 2 * 2
+    uuid = exportacao.COLUNAS_CSV.index("uuid")
+    evento = exportacao.COLUNAS_CSV.index("evento_nome")
+    assert [(l[uuid], l[evento]) for l in linhas[1:]] == [
+        ("u0", "SALARIO"), ("u0", "INSS"), ("u1", "SALARIO"), ("u1", "INSS"),
+    ]
+
+
+class _Resultado:
+    def __init__(self, linhas):
+        self.linhas = linhas
+
+    def partitions(self, n):
+        for i in range(0, len(self.linhas), n):
+            yield self.linhas[i:i + n]
+
+
+class _Sessao:
+    """Responde às páginas por chave de holerites_do_cliente a partir de uma lista de uuids."""
+
+    def __init__(self, uuids, consultas):
+        self.uuids = uuids
+        self.consultas = consultas
+
+    def execute(self, sql, params, execution_options=None):
+        self.consultas.append(params.get("apos"))
+        restantes = [u for u in self.uuids if params.get("apos") is None or u > params["apos"]]
+        return _Resultado([(u,) for u in restantes[:params["limite"]]])
+
+    def close(self):
+        pass
+
+
+def test_holerites_do_cliente_pagina_por_chave(monkeypatch):
+    uuids = [f"u{i:02d}" for i in range(23)]
+    consultas = []
+    monkeypatch.setattr(exportacao, "PAGINA_EXPORTACAO", 10)
+    monkeypatch.setattr(exportacao, "LOTE_MONTAGEM", 4)
+    monkeypatch.setattr(exportacao, "sessao_leitura", lambda rota: _Sessao(uuids, consultas))
+    # u05 sem as três partes: fica de fora
+    monkeypatch.setattr(
+        exportacao, "montar_holerites_por_uuid",
+        lambda db, lote: {u: {"uuid": u} for u in lote if u != "u05"},
+    )
+
+    recebidos = [h["uuid"] for h in exportacao.holerites_do_cliente("leitura", "42", 202501)]
+    assert recebidos == [u for u in uuids if u != "u05"]
+    assert consultas == [None, "u09", "u19"]
+
+
+# -------------------------------------------------
+# ZIP de recibos
+# -------------------------------------------------
+@pytest.fixture
+def pool_pdf():
+    yield
+    descartar_pool_pdf()
+
+
+def _zip(uuids, dados):
+    async def consome():
+        return b"".join([p async for p in exportacao._zip_recibos("leitura", "42", 202501, "L1", (uuids, dados))])
+    return asyncio.run(consome())
+
+
+def test_zip_de_recibos(pool_pdf):
+    uuids = ["a1", "b2", "c3", "d4", "e5"]
+    dados = {u: _holerite(u, matricula=str(100 + i)) for i, u in enumerate(uuids)}
+    dados["c3"] = _holerite("c3", matricula="102", tipo="X")
+    del dados["d4"]
+
+    with zipfile.ZipFile(io.BytesIO(_zip(uuids, dados))) as zf:
+        assert zf.testzip() is None
+        nomes = set(zf.namelist())
+        assert nomes == {"recibo_100_a1.pdf", "recibo_101_b2.pdf", "recibo_104_e5.pdf", "erros.txt"}
+        assert all(i.compress_type == zipfile.ZIP_STORED for i in zf.infolist())
+        assert zf.read("recibo_100_a1.pdf").startswith(b"%PDF")
+        erros = zf.read("erros.txt").decode("utf-8")
+    assert "recibo_102_c3.pdf: tipo de evento inválido: X" in erros
+    assert "d4: holerite incompleto" in erros
+
+
+def test_zip_busca_as_proximas_paginas(pool_pdf, monkeypatch):
+    uuids = [f"u{i:02d}" for i in range(7)]
+    monkeypatch.setattr(exportacao, "LOTE_MONTAGEM", 3)
+    pedidas = []
+
+    def pagina(rota, cliente, competencia, lote, apos):
+        pedidas.append(apos)
+        proximos = [u for u in uuids if u > apos][:3]
+        return proximos, {u: _holerite(u, matricula=u) for u in proximos}
+
+    monkeypatch.setattr(exportacao, "_pagina_recibos", pagina)
+    primeira = uuids[:3]
+    conteudo = _zip(primeira, {u: _holerite(u, matricula=u) for u in primeira})
+
+    assert pedidas == ["u02", "u05"]
+    with zipfile.ZipFile(io.BytesIO(conteudo)) as zf:
+        assert sorted(zf.namelist()) == [f"recibo_{u}_{u}.pdf" for u in uuids]
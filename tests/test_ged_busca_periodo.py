@@ -0,0 +1,68 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.routers.ged import GedSemDocumentos, _busca_por_periodo
+from app.utils.circuit_breaker import ServicoIndisponivel
+
+
+def _busca(respostas):
+    """do_search falso: responde por padrão do cp[] do período (índice 1)."""
+    pedidos = []
+
+    async def do_search(cp):
+        pedidos.append(cp[1])
+        resposta = respostas[cp[1]]
+        if isinstance(resposta, BaseException):
+            raise resposta
+        return resposta
+
+    return do_search, pedidos
+
+
+def _executa(respostas, padroes=("%2025%01%", "%2025%02%")):
+    do_search, pedidos = _busca(respostas)
+    return asyncio.run(_busca_por_periodo(do_search, ["123", ""], 1, list(padroes))), pedidos
+
+
+def test_junta_os_periodos_sem_repetir():
+    docs, pedidos = _executa({
+        "%2025%01%": [{"id_documento": 1}, {"id_documento": 2}],
+        "%2025%02%": [{"id_documento": 2}, {"id_documento": 3}],
+    })
+    assert [d["id_documento"] for d in docs] == [1, 2, 3]
+    assert sorted(pedidos) == ["%2025%01%", "%2025%02%"]
+
+
+def test_periodo_sem_documentos_e_ignorado():
+    docs, _ = _executa({
+        "%2025%01%": GedSemDocumentos(400, "sem documentos"),
+        "%2025%02%": [{"id_documento": 3}],
+    })
+    assert [d["id_documento"] for d in docs] == [3]
+
+
+def test_nenhum_periodo_com_documentos_pede_a_busca_ampla():
+    docs, _ = _executa({
+        "%2025%01%": GedSemDocumentos(500, "sem documentos"),
+        "%2025%02%": [],
+    })
+    assert docs is None
+
+
+@pytest.mark.parametrize("erro", [
+    ServicoIndisponivel("GED", 10),
+    HTTPException(502, "GED fora"),
+    httpx.ConnectTimeout("timeout"),
+])
+def test_falha_do_ged_e_repassada(erro):
+    with pytest.raises(type(erro)):
+        _executa({"%2025%01%": [{"id_documento": 1}], "%2025%02%": erro})
+
+
+def test_campo_de_periodo_ja_preenchido_nao_filtra():
+    do_search, pedidos = _busca({})
+    assert asyncio.run(_busca_por_periodo(do_search, ["123", "202501"], 1, ["%2025%01%"])) is None
+    assert pedidos == []
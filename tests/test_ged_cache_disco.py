@@ -0,0 +1,152 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from app.utils.ged_cache_disco import CacheDocumentos
+from app.utils.ged_client import fechar_ged_client
+from app.utils.ged_download import abrir_download
+
+
+class Download:
+    """Basta para o CacheDocumentos: chunks(), tamanho, mimetype e extensão."""
+
+    def __init__(self, conteudo: bytes, tamanho=None, falha_em: int = None):
+        self.conteudo = conteudo
+        self.tamanho = len(conteudo) if tamanho is None else tamanho
+        self.mimetype = "application/pdf"
+        self.extensao = ".pdf"
+        self.falha_em = falha_em
+
+    async def chunks(self):
+        for i in range(0, len(self.conteudo), 100):
+            if self.falha_em is not None and i >= self.falha_em:
+                raise ConnectionError("GED caiu no meio")
+            yield self.conteudo[i:i + 100]
+
+
+def _grava(c: CacheDocumentos, id_documento: int, conteudo: bytes, **kwargs) -> bytes:
+    async def consome():
+        return b"".join([p async for p in c.gravando(1, id_documento, Download(conteudo, **kwargs))])
+    return asyncio.run(consome())
+
+
+def _conteudo(n: int, marca: int) -> bytes:
+    return bytes([marca]) * n
+
+
+def test_grava_e_le(tmp_path):
+    c = CacheDocumentos(str(tmp_path), max_bytes=10_000)
+    assert _grava(c, 1, _conteudo(450, 1)) == _conteudo(450, 1)
+    entrada = c.obter(1, 1)
+    assert entrada is not None and entrada.tamanho == 450
+    with open(entrada.caminho, "rb") as f:
+        assert f.read() == _conteudo(450, 1)
+    assert c.obter(1, 2) is None
+    assert c.snapshot()["hits"] == 1 and c.snapshot()["misses"] == 1
+
+
+def test_remove_o_menos_usado_ao_passar_do_limite(tmp_path):
+    c = CacheDocumentos(str(tmp_path), max_bytes=1000)
+    _grava(c, 1, _conteudo(400, 1))
+    _grava(c, 2, _conteudo(400, 2))
+    assert c.obter(1, 1) is not None      # 1 passa a ser o mais recente
+    _grava(c, 3, _conteudo(400, 3))
+
+    assert c.obter(1, 2) is None
+    assert c.obter(1, 1) is not None
+    assert c.obter(1, 3) is not None
+    assert c.total_bytes == 800
+    assert c.snapshot()["removidos"] == 1
+    objetos = [n for _, _, nomes in os.walk(tmp_path / "objetos") for n in nomes]
+    assert len(objetos) == 2
+
+
+def test_conteudo_repetido_conta_uma_vez(tmp_path):
+    c = CacheDocumentos(str(tmp_path), max_bytes=1000)
+    _grava(c, 1, _conteudo(400, 7))
+    _grava(c, 2, _conteudo(400, 7))
+    assert c.total_bytes == 400
+    assert c.snapshot()["objetos"] == 1
+
+    # o objeto só sai do disco quando a última chave que aponta para ele sai
+    c.invalidar(1, 1)
+    assert os.path.isfile(c.obter(1, 2).caminho)
+    c.invalidar(1, 2)
+    assert c.total_bytes == 0
+    assert not any(nomes for _, _, nomes in os.walk(tmp_path / "objetos"))
+
+
+def test_arquivo_maior_que_o_limite_nao_entra(tmp_path):
+    c = CacheDocumentos(str(tmp_path), max_bytes=300)
+    assert _grava(c, 1, _conteudo(400, 1)) == _conteudo(400, 1)
+    assert c.obter(1, 1) is None
+    assert c.total_bytes == 0
+    assert os.listdir(tmp_path / "tmp") == []
+
+
+def test_download_incompleto_nao_entra(tmp_path):
+    c = CacheDocumentos(str(tmp_path), max_bytes=10_000)
+    with pytest.raises(ConnectionError):
+        _grava(c, 1, _conteudo(450, 1), falha_em=200)
+    # tamanho anunciado diferente do recebido
+    _grava(c, 2, _conteudo(450, 2), tamanho=500)
+    assert c.obter(1, 1) is None
+    assert c.obter(1, 2) is None
+    assert os.listdir(tmp_path / "tmp") == []
+
+
+def test_ordem_de_uso_sobrevive_ao_restart(tmp_path):
+    c = CacheDocumentos(str(tmp_path), max_bytes=1000)
+    _grava(c, 1, _conteudo(400, 1))
+    _grava(c, 2, _conteudo(400, 2))
+    # o uso fica no mtime da chave: 2 mais antigo que 1
+    agora = time.time()
+    os.utime(tmp_path / "chaves" / "1_2.json", (agora - 60, agora - 60))
+    os.utime(tmp_path / "chaves" / "1_1.json", (agora - 30, agora - 30))
+
+    reaberto = CacheDocumentos(str(tmp_path), max_bytes=1000)
+    assert reaberto.total_bytes == 800
+    _grava(reaberto, 3, _conteudo(400, 3))
+    assert reaberto.obter(1, 2) is None
+    assert reaberto.obter(1, 1) is not None
+
+
+def test_restart_com_limite_menor_remove_o_excesso(tmp_path):
+    c = CacheDocumentos(str(tmp_path), max_bytes=1000)
+    _grava(c, 1, _conteudo(400, 1))
+    _grava(c, 2, _conteudo(400, 2))
+    reaberto = CacheDocumentos(str(tmp_path), max_bytes=500)
+    assert reaberto.total_bytes == 400
+    assert len(os.listdir(tmp_path / "chaves")) == 1
+
+
+def test_objeto_removido_por_outro_worker(tmp_path):
+    c = CacheDocumentos(str(tmp_path), max_bytes=10_000)
+    _grava(c, 1, _conteudo(400, 1))
+    outro = CacheDocumentos(str(tmp_path), max_bytes=10_000)
+    outro.invalidar(1, 1)
+    assert c.obter(1, 1) is None
+    assert c.total_bytes == 0
+
+
+def test_grava_download_do_fake_ged(fake_ged, tmp_path):
+    c = CacheDocumentos(str(tmp_path), max_bytes=10 * 1024 * 1024)
+    id_documento = int(next(iter(fake_ged._documentos[1])))
+
+    async def baixa():
+        try:
+            doc = await abrir_download(1, id_documento)
+            try:
+                return b"".join([p async for p in c.gravando(1, id_documento, doc)])
+            finally:
+                await doc.aclose()
+        finally:
+            await fechar_ged_client()
+
+    recebido = asyncio.run(baixa())
+    assert recebido == fake_ged._pdf_falso(str(id_documento))
+    entrada = c.obter(1, id_documento)
+    assert entrada.tamanho == len(recebido)
+    assert entrada.mimetype == "application/pdf"
@@ -0,0 +1,52 @@
+import asyncio
+import base64
+
+from app.utils.ged_client import GedClient
+from config.settings import settings
+
+
+def _busca(matricula: str):
+    return [("id_tipo", "1"), ("pagina", "1"), ("cp[]", ""), ("cp[]", matricula)]
+
+
+def test_upload_e_exclusao_descartam_as_buscas_em_cache(fake_ged):
+    async def cenario():
+        cliente = GedClient(settings.GED_BASE_URL, "conta", "usuario", "senha", coalesce_ttl=60)
+        try:
+            vazia = await cliente.post("/documents/search", data=_busca("99999"))
+            assert vazia.json()["documents"] == []
+            # a mesma busca logo depois vem do cache
+            await cliente.post("/documents/search", data=_busca("99999"))
+            assert cliente.estatisticas["cache"] == 1
+
+            enviado = await cliente.post("/documents/uploadbase64", data=[
+                ("id_tipo", "1"), ("formato", "pdf"), ("documento_nome", "novo.pdf"),
+                ("documento", base64.b64encode(b"%PDF-1.4 novo").decode("ascii")),
+                ("cp[]", "RECIBO"), ("cp[]", "99999"),
+            ])
+            id_documento = enviado.json()["id_documento"]
+            achados = (await cliente.post("/documents/search", data=_busca("99999"))).json()["documents"]
+            assert [d["id_documento"] for d in achados] == [id_documento]
+
+            await cliente.post("/documents/delete", data={"id_tipo": 1, "id_documento": id_documento})
+            depois = await cliente.post("/documents/search", data=_busca("99999"))
+            assert depois.json()["documents"] == []
+        finally:
+            await cliente.aclose()
+
+    asyncio.run(cenario())
+
+
+def test_busca_sem_cache_vai_ao_ged(fake_ged):
+    async def cenario():
+        cliente = GedClient(settings.GED_BASE_URL, "conta", "usuario", "senha", coalesce_ttl=60)
+        try:
+            await cliente.post("/documents/search", data=_busca("1000"))
+            antes = cliente.estatisticas["upstream"]
+            await cliente.post("/documents/search", data=_busca("1000"), cache=False)
+            assert cliente.estatisticas["upstream"] == antes + 1
+            assert cliente.estatisticas["cache"] == 0
+        finally:
+            await cliente.aclose()
+
+    asyncio.run(cenario())
@@ -0,0 +1,82 @@
+import asyncio
+import base64
+import json
+import os
+
+import pytest
+
+from app.utils.ged_client import fechar_ged_client
+from app.utils.ged_download import (
+    DecodificadorBase64,
+    _decodifica_em_arquivo,
+    _desescapado,
+    _LeitorJson,
+    abrir_download,
+)
+
+
+PDF = b"%PDF-1.4\n" + os.urandom(20_000) + b"\n%%EOF\n"
+
+
+async def _em_pedacos(dados: bytes, tamanho: int):
+    for i in range(0, len(dados), tamanho):
+        yield dados[i:i + tamanho]
+
+
+@pytest.mark.parametrize("tamanho", [1, 3, 7, 4096])
+def test_base64_em_pedacos_com_data_uri_e_quebras(tamanho):
+    texto = base64.encodebytes(PDF)  # quebra a cada 76 caracteres
+    texto = b'"data:application/pdf;base64,' + texto + b'"'
+    decodificador = DecodificadorBase64()
+    saida = b"".join(decodificador.decode(texto[i:i + tamanho]) for i in range(0, len(texto), tamanho))
+    assert saida + decodificador.final() == PDF
+
+
+@pytest.mark.parametrize("tamanho", [1, 5, 4096])
+def test_json_lido_em_pedacos_ate_o_conteudo(tamanho):
+    # o GED em PHP escapa "/" como "\/"
+    corpo = json.dumps({
+        "error": False,
+        "mimetype": "application/pdf",
+        "meta": {"paginas": [1, 2], "nome": "recibo \"jan\""},
+        "documento": base64.b64encode(PDF).decode("ascii"),
+        "depois": "ignorado",
+    }).replace("/", "\\/").encode("utf-8")
+
+    async def cenario():
+        partes = _em_pedacos(corpo, tamanho)
+        inicio = await partes.__anext__()
+        campos, conteudo = await _LeitorJson(inicio, partes).ate_o_conteudo()
+        assert campos == {
+            "error": False,
+            "mimetype": "application/pdf",
+            "meta": {"paginas": [1, 2], "nome": "recibo \"jan\""},
+        }
+        arquivo, n, primeiros = await _decodifica_em_arquivo(_desescapado(conteudo))
+        try:
+            assert n == len(PDF)
+            assert primeiros.startswith(b"%PDF")
+            assert arquivo.read() == PDF
+        finally:
+            arquivo.close()
+
+    asyncio.run(cenario())
+
+
+@pytest.mark.parametrize("modo", ["base64", "json", "binario"])
+def test_download_do_fake_ged(fake_ged, monkeypatch, modo):
+    monkeypatch.setattr(fake_ged, "DOWNLOAD_MODO", modo)
+    id_documento = next(iter(fake_ged._documentos[1]))
+
+    async def baixa():
+        try:
+            doc = await abrir_download(1, int(id_documento))
+            return doc, b"".join([c async for c in doc.chunks()])
+        finally:
+            await fechar_ged_client()
+
+    doc, conteudo = asyncio.run(baixa())
+    assert conteudo == fake_ged._pdf_falso(id_documento)
+    assert doc.mimetype == "application/pdf" and doc.extensao == ".pdf"
+    # base64 e JSON passam pelo arquivo temporário: tamanho exato para o Content-Length
+    assert doc.tamanho == len(conteudo)
@@ -0,0 +1,104 @@
+import asyncio
+import base64
+import io
+import os
+from urllib.parse import parse_qs
+
+import pytest
+from fastapi import HTTPException
+from starlette.datastructures import UploadFile
+
+from app.utils import ged_upload
+from app.utils.ged_client import fechar_ged_client, get_ged_client
+from app.utils.ged_upload import TAMANHO_BLOCO, CorpoUploadGed
+
+
+def _corpo(dados: bytes) -> CorpoUploadGed:
+    arquivo = UploadFile(io.BytesIO(dados), filename="recibo.pdf")
+    return CorpoUploadGed(
+        arquivo,
+        antes=[("id_tipo", 1), ("formato", "pdf"), ("documento_nome", "Recibo março.pdf"), ("vazio", None)],
+        depois=[("cp[]", "RECIBO"), ("cp[]", "ção"), ("cp[]", "")],
+    )
+
+
+async def _enviado(corpo: CorpoUploadGed) -> bytes:
+    return b"".join([p async for p in corpo.partes()])
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 4, TAMANHO_BLOCO, TAMANHO_BLOCO + 1, 2 * TAMANHO_BLOCO + 2])
+def test_content_length_igual_ao_corpo_enviado(n):
+    # bytes 0xfb/0xff geram muitos "+" e "/", que o escape triplica
+    dados = os.urandom(n // 2) + b"\xfb\xff" * (n - n // 2)
+    dados = dados[:n]
+
+    async def cenario():
+        corpo = _corpo(dados)
+        try:
+            tamanho = await corpo.medir()
+            enviado = await _enviado(corpo)
+            assert tamanho == len(enviado)
+            # reenvio após 401: o mesmo corpo de novo
+            assert await _enviado(corpo) == enviado
+        finally:
+            corpo.fechar()
+        form = parse_qs(enviado.decode("ascii"), keep_blank_values=True)
+        assert base64.b64decode(form["documento"][0], validate=True) == dados
+        assert form["documento_nome"] == ["Recibo março.pdf"]
+        assert form["cp[]"] == ["RECIBO", "ção", ""]
+        assert "vazio" not in form
+
+    asyncio.run(cenario())
+
+
+def test_arquivo_lido_e_codificado_uma_vez(monkeypatch):
+    chamadas = []
+    original = ged_upload._base64_urlencoded
+    monkeypatch.setattr(ged_upload, "_base64_urlencoded", lambda b: chamadas.append(len(b)) or original(b))
+    dados = os.urandom(2 * TAMANHO_BLOCO + 10)
+
+    async def cenario():
+        corpo = _corpo(dados)
+        try:
+            await corpo.medir()
+            await _enviado(corpo)
+            await _enviado(corpo)
+        finally:
+            corpo.fechar()
+
+    asyncio.run(cenario())
+    assert chamadas == [TAMANHO_BLOCO, TAMANHO_BLOCO, 10]
+
+
+def test_arquivo_vazio():
+    async def cenario():
+        with pytest.raises(HTTPException) as exc:
+            await _corpo(b"").medir()
+        assert exc.value.status_code == 400
+
+    asyncio.run(cenario())
+
+
+def test_upload_no_fake_ged(fake_ged):
+    dados = b"%PDF-1.4\n" + os.urandom(3 * 1024 * 1024)
+
+    async def envia():
+        corpo = _corpo(dados)
+        try:
+            tamanho = await corpo.medir()
+            return await get_ged_client().post_corpo("/documents/uploadbase64", corpo.partes, tamanho)
+        finally:
+            corpo.fechar()
+            await fechar_ged_client()
+
+    response = asyncio.run(envia())
+    assert response.status_code == 200
+    resposta = response.json()
+    assert resposta["error"] is False
+    assert resposta["tamanho"] == len(dados)
+    documento = fake_ged._documentos[1][resposta["id_documento"]]
+    assert documento["nomearquivo"] == "Recibo março.pdf"
+    assert documento["attributes"][:2] == [
+        {"name": "tipodedoc", "value": "RECIBO"},
+        {"name": "matricula", "value": "ção"},
+    ]
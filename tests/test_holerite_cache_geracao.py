@@ -0,0 +1,118 @@
+from decimal import Decimal
+
+import pytest
+
+from app.routers import ged
+from app.utils import holerite_cache
+from app.utils.holerite_cache import CacheHolerites
+
+
+UUID = "00000000-0000-0000-0000-000000000001"
+
+CABECALHO = {
+    "empresa": "1", "filial": "1", "empresa_nome": "ACME LTDA", "empresa_cnpj": "00.000.000/0001-00",
+    "cliente": "42", "cliente_nome": "CLIENTE", "cliente_cnpj": "11.111.111/0001-11",
+    "matricula": "123", "nome": "ANA SILVA", "funcao_nome": "ANALISTA", "admissao": "2020-03-01",
+    "competencia": "202501", "lote": "L1", "uuid": UUID,
+}
+EVENTO = {"evento": 1, "evento_nome": "SALARIO", "referencia": Decimal("30"), "valor": Decimal("3000.00"), "tipo": "V"}
+RODAPE = {
+    "total_vencimentos": Decimal("3000.00"), "total_descontos": Decimal("0"), "valor_liquido": Decimal("3000.00"),
+    "salario_base": Decimal("3000.00"), "sal_contr_inss": Decimal("3000.00"), "base_calc_fgts": Decimal("3000.00"),
+    "fgts_mes": Decimal("240.00"), "base_calc_irrf": Decimal("3000.00"), "dep_sf": 0, "dep_irf": 0,
+}
+
+
+class _Resultado:
+    def __init__(self, linhas, chaves=()):
+        self.linhas = linhas
+        self.chaves = list(chaves)
+
+    def fetchall(self):
+        return self.linhas
+
+    def first(self):
+        return self.linhas[0] if self.linhas else None
+
+    def keys(self):
+        return self.chaves
+
+
+class _Sessao:
+    """Responde às consultas de montar_holerite pela tabela; `geracao` é a do lote nesta base."""
+
+    def __init__(self, geracao, replica):
+        self.geracao = geracao
+        self.info = {"replica": replica}
+        self.tabelas = []
+
+    def execute(self, sql, params=None):
+        texto = str(sql)
+        tabela = next(t for t in (
+            "tb_holerite_cache_geracao", "tb_holerite_competencias", "tb_holerite_cabecalhos",
+            "tb_holerite_eventos", "tb_holerite_rodapes",
+        ) if t in texto)
+        self.tabelas.append(tabela)
+        if tabela == "tb_holerite_cache_geracao":
+            return _Resultado([("L1", self.geracao)])
+        if tabela == "tb_holerite_competencias":
+            return _Resultado([(UUID,)])
+        linha = {"tb_holerite_cabecalhos": CABECALHO, "tb_holerite_eventos": EVENTO,
+                 "tb_holerite_rodapes": RODAPE}[tabela]
+        return _Resultado([tuple(linha.values())], linha.keys())
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    c = CacheHolerites(10 * 1024 * 1024, str(tmp_path), 3600)
+    monkeypatch.setattr(holerite_cache, "_cache", c)
+    return c
+
+
+def _monta(leitura, primario):
+    payload = ged.MontarHolerite(matricula="123", competencia="202501", lote="L1", cpf="12345678900")
+    return ged.montar_holerite(payload, db=leitura, primario=primario)
+
+
+def test_geracao_vem_do_primario_e_so_o_que_e_do_banco_vai_a_replica(cache):
+    replica = _Sessao(geracao=3, replica=True)
+    primario = _Sessao(geracao=3, replica=False)
+    _monta(replica, primario)
+
+    assert primario.tabelas == ["tb_holerite_cache_geracao"]
+    assert "tb_holerite_cabecalhos" in replica.tabelas
+    assert cache.obter("montar", UUID, "L1", 3) is not None
+
+
+def test_replica_atrasada_nao_serve_nem_grava_a_versao_invalidada(cache):
+    antigo = _monta(_Sessao(3, True), _Sessao(3, False))
+    assert cache.obter("montar", UUID, "L1", 3) is not None
+
+    # lote reprocessado e invalidado no primário (geração 4); a réplica ainda está na 3
+    replica = _Sessao(geracao=3, replica=True)
+    resultado = _monta(replica, _Sessao(4, False))
+    # não veio do cache: os holerites foram relidos
+    assert "tb_holerite_cabecalhos" in replica.tabelas
+    assert resultado["uuid"] == antigo["uuid"]
+    assert cache.obter("montar", UUID, "L1", 4) is None
+
+    # réplica em dia: grava com a geração nova
+    _monta(_Sessao(4, True), _Sessao(4, False))
+    assert cache.obter("montar", UUID, "L1", 4) is not None
+
+
+def test_sem_replica_le_a_geracao_uma_vez(cache):
+    leitura = _Sessao(geracao=2, replica=False)
+    primario = _Sessao(geracao=2, replica=False)
+    _monta(leitura, primario)
+    assert primario.tabelas == []
+    assert leitura.tabelas.count("tb_holerite_cache_geracao") == 1
+
+
+def test_grava_holerites_so_com_a_replica_em_dia(cache):
+    novos = {"u1": {"uuid": "u1", "x": 1}, "u2": {"uuid": "u2", "x": 2}}
+    lotes = {"u1": "L1", "u2": "L2"}
+    devolvidos = ged._grava_holerites(novos, lotes, {"L1": 5, "L2": 7}, {"L1": 5, "L2": 6})
+    assert set(devolvidos) == {"u1", "u2"}
+    assert cache.obter("buscar", "u1", "L1", 5) is not None
+    assert cache.obter("buscar", "u2", "L2", 7) is None